@@ -5,6 +5,7 @@ import struct
 import urandom
 from time import ticks_ms, ticks_diff
 from pins import *   # fg.current_average(), display
+from ble_advertising import advertising_payload, extract_manufacturer_data
 
 # === Initialisation BLE ===
 ble = bluetooth.BLE()
@@ -38,28 +39,6 @@ def measure_average(n=N_MEASURES, action_before=None, action_after=None):
 
     return sum(values) / len(values) if values else 0
 
-# --- Fonctions auxiliaires BLE ---
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0:
-            break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
-
 # --- Affichage texte centré ---
 def draw_text(display, text, y_start, screen_width=128, char_width=8):
     x = (screen_width - len(text) * char_width) // 2
@@ -2,8 +2,9 @@ import bluetooth
 import uasyncio as asyncio
 import aioble
 import struct
-from time import ticks_ms, ticks_diff
 from pins import *  # Assure-toi que DISTANCE et display sont bien définis ici
+from ble_advertising import AdvParser, AdvPayload
+from neighbor_table import NeighborTable
 
 # === Initialisation BLE ===
 ble = bluetooth.BLE()
@@ -20,30 +21,16 @@ ADV_TIMEOUT = 200  # Durée de l'annonce en ms
 
 # === Données locales et des autres appareils ===
 local_distance = 0
-devices_distances = {}  # {device_name: (distance, last_seen_ms)}
+devices_distances = NeighborTable(capacity=16, max_age_ms=30000)  # Voisins récents : nom -> distance
 
-# === Fonctions auxiliaires ===
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0:
-            break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
+# === Trames BLE (buffers réutilisés à chaque cycle) ===
+device_name_bytes = device_name.encode()
+adv_parser = AdvParser()
+adv_payload = AdvPayload()
+adv_payload.add_name(device_name_bytes)
+DISTANCE_OFFSET = adv_payload.add_manufacturer_data(bytes(2))
 
+# === Fonctions auxiliaires ===
 def text_x_center(text):
     return max((128 - len(text) * 8) // 2, 0)
 
@@ -54,24 +41,27 @@ async def ble_task():
         async with aioble.scan(SCAN_DURATION, interval_us=30000, window_us=30000, active=True) as scanner:
             print("BLE Task: Scanning...")
             async for result in scanner:
-                name = result.name()
-                if name and name.startswith("STeaMi") and name != device_name:
-                    man_data = extract_manufacturer_data(result.adv_data)
-                    if man_data and len(man_data) == 2:
-                        distance, = struct.unpack("h", man_data)
-                        devices_distances[name] = (distance, ticks_ms())
-                        print(f"Received from {name}: {distance} cm")
-
-        # purge_old_devices()
+                # Filtrage sur les octets bruts : le nom n'est décodé que
+                # pour les trames STeaMi valides
+                if not adv_parser.parse(result.adv_data):
+                    continue
+                if not adv_parser.name_startswith(b"STeaMi") or adv_parser.name_equals(device_name_bytes):
+                    continue
+                man_data = adv_parser.manufacturer_data()
+                if man_data and len(man_data) == 2:
+                    name = adv_parser.name()
+                    distance, = struct.unpack("h", man_data)
+                    devices_distances.update(name, distance)
+                    print(f"Received from {name}: {distance} cm")
+
         await asyncio.sleep_ms(SCAN_DURATION+50)
 
         print("BLE Task: Advertising...")
-        man_data = struct.pack("h", local_distance)
-        adv_payload = advertising_payload(name=device_name, manufacturer_data=man_data)
+        struct.pack_into("h", adv_payload.buf, DISTANCE_OFFSET, local_distance)
         try:
             await aioble.advertise(
                 interval_us=150_000,
-                adv_data=adv_payload,
+                adv_data=adv_payload.view(),
                 connectable=False,
                 timeout_ms=ADV_TIMEOUT
             )
@@ -96,14 +86,8 @@ async def display_task():
         display.text(f"Me: {local_distance}", text_x_center("Me: XXX"), 30, 255)
 
         # Affichage des appareils les plus récemment vus
-        recent_devices = sorted(
-            devices_distances.items(),
-            key=lambda item: item[1][1],  # tri par last_seen_ms
-            reverse=True
-        )[:4]
-
         y = 50
-        for name, (dist, _) in recent_devices:
+        for name, dist in devices_distances.recent(4):
             display.text(f"{name[-4:]}: {dist}", text_x_center("XXXX: XXX"), y, 255)
             y += 10
 
@@ -5,11 +5,16 @@ import bluetooth
 import struct
 
 from pins import *
+from scan_aggregator import ScanAggregator
+from sample_batch import iter_batch
+from connection_pool import ConnectionPool
 
 # UUIDs
 _ENV_SENSE_UUID = bluetooth.UUID(0x181A)
 _ENV_SENSE_TEMP_UUID = bluetooth.UUID(0x2A6E)
 _DEVICE_NAME_UUID = bluetooth.UUID("12345678-1234-5678-1234-56789abcdef0")
+_DISTANCE_BATCH_UUID = bluetooth.UUID("12345678-1234-5678-1234-56789abcdef1")
+_MAX_PEERS = const(8)
 
 # Identité du central basée sur son MAC
 ble = bluetooth.BLE()
@@ -19,119 +24,139 @@ mac_suffix = ''.join(f'{b:02X}' for b in mac_bytes[-2:])
 device_name = f"Client-{mac_suffix}"
 print("Central device name:", device_name)
 
+# Connexion + envoi du nom, à chaque (re)connexion
+async def on_connect(peer, characteristics):
+    name_char = characteristics.get(_DEVICE_NAME_UUID)
+    if name_char is not None:
+        # 🔽 Écrire notre nom dans la caractéristique
+        await name_char.write(device_name.encode())
+        print("Nom envoyé à", peer.name)
+    print(f"{peer.name}: streaming", "batched" if peer.stream_index == 0 else "single samples")
+
 # Globales
-discovered_devices = []
+discovered_devices = ScanAggregator(capacity=16)  # Résultats du dernier scan complet
+scanning_devices = ScanAggregator(capacity=16)    # Scan en cours
 selected_index = 0
-scan_active = True
-active_connection = None
+pool = ConnectionPool(
+    _ENV_SENSE_UUID,
+    (_DISTANCE_BATCH_UUID, _ENV_SENSE_TEMP_UUID),  # lots si disponibles
+    extra_uuids=(_DEVICE_NAME_UUID,),
+    max_peers=_MAX_PEERS,
+    on_connect=on_connect,
+    cache_path="gatt_cache.json",  # handles GATT gardés d'un redémarrage à l'autre
+)
+last_distance = {}  # nom -> dernière distance reçue (mm)
+
+# Entrées du menu : périphériques du pool (ils n'annoncent plus une fois
+# connectés), puis appareils découverts hors du pool
+def menu_entries():
+    entries = [(peer.device, peer.name) for peer in pool.peers if peer is not None]
+    for result in discovered_devices:
+        if result.device.addr not in pool:
+            entries.append((result.device, result.name()))
+    return entries
 
 # Affichage
 async def display_task():
-    global selected_index, discovered_devices
     while True:
-        if scan_active:
-            display.fill(0)
-            display.text(device_name, text_x_center_position(device_name), 25, 255)
-            display_menu(discovered_devices, selected_index)
-            display.show()
+        entries = menu_entries()
+        display.fill(0)
+        display.text(device_name, text_x_center_position(device_name), 25, 255)
+        if not entries:
+            display.text("No device", text_x_center_position("No device"), 50, 255)
+        for i, (device, name) in enumerate(entries):
+            peer = pool.get(device.addr)
+            if peer is None:
+                label = name
+            elif peer.connected() and name in last_distance:
+                label = f"{name[-4:]} {last_distance[name]}mm"
+            else:
+                label = f"{name[-4:]} ..."
+            text = f"> {label}" if i == selected_index else f"  {label}"
+            display.text(text, 5, 40 + 10 * i, 255)
+        display.show()
         await asyncio.sleep(0.1)
 
-# Boutons
+# Boutons : MENU ajoute l'appareil sélectionné au pool ou l'en retire
 async def button_task():
-    global selected_index, discovered_devices, scan_active, active_connection
+    global selected_index
     while True:
         button = await wait_for_button()
-        if button == "A" and discovered_devices:
-            selected_index = (selected_index + 1) % len(discovered_devices)
-        elif button == "B" and discovered_devices:
-            selected_index = (selected_index - 1) % len(discovered_devices)
+        entries = menu_entries()
+        if button == "A" and entries:
+            selected_index = (selected_index + 1) % len(entries)
+        elif button == "B" and entries:
+            selected_index = (selected_index - 1) % len(entries)
         elif button == "MENU":
-            if scan_active:
-                if not discovered_devices:
-                    print("No devices found.")
-                    continue
-                scan_active = False
-                selected = discovered_devices[selected_index]
-                print(f"Connecting to {selected.name()} @ {selected.device.addr_hex()}")
-                asyncio.create_task(connect_to_device(selected.device, selected.name()))
+            if not entries:
+                print("No devices found.")
+                continue
+            device, name = entries[selected_index % len(entries)]
+            if device.addr in pool:
+                print(f"Disconnecting {name}...")
+                await pool.remove(device.addr)
+                last_distance.pop(name, None)
+            elif pool.add(device, name) is not None:
+                print(f"Connecting to {name} @ {device.addr_hex()}")
             else:
-                if active_connection:
-                    print("Disconnecting...")
-                    await active_connection.disconnect()
-                    active_connection = None
-                scan_active = True
+                print("Connection pool full")
         await asyncio.sleep(0.1)
 
-# Connexion + envoi du nom
-async def connect_to_device(device, name):
-    global active_connection, scan_active
-
-    try:
-        connection = await device.connect(timeout_ms=5000)
-        active_connection = connection
-    except asyncio.TimeoutError:
-        print("Connection timeout")
-        scan_active = True
-        return
-
-    async with connection:
+# Notifications de tous les périphériques connectés
+async def stream_task():
+    while True:
+        peer, raw = await pool.receive()
+        if peer is None:
+            continue
         try:
-            service = await connection.service(_ENV_SENSE_UUID)
-            temp_char = await service.characteristic(_ENV_SENSE_TEMP_UUID)
-            name_char = await service.characteristic(_DEVICE_NAME_UUID)
-
-            # 🔽 Écrire notre nom dans la caractéristique
-            await name_char.write(device_name.encode())
-            print("Nom envoyé :", device_name)
-
-        except Exception as e:
-            print("Service discovery failed:", e)
-            scan_active = True
-            return
-
-        while connection.is_connected() and not scan_active:
-            try:
-                raw = await temp_char.read()
+            if peer.stream_index == 0:
+                for timestamp_ms, distance_mm in iter_batch(raw):
+                    last_distance[peer.name] = distance_mm
+                    print(peer.name, "Distance:", distance_mm, "@", timestamp_ms)
+            else:
                 distance_mm = struct.unpack("<h", raw)[0]
-                print("Distance:", distance_mm)
-
-                display.fill(0)
-                display.text(name, text_x_center_position(name), 25, 255)
-                display.text(f"{distance_mm} mm", text_x_center_position(f"{distance_mm} mm"), 60, 255)
-                display.show()
-            except Exception as e:
-                print("Read error:", e)
-                break
-
-            await asyncio.sleep(1)
+                last_distance[peer.name] = distance_mm
+                print(peer.name, "Distance:", distance_mm)
+        except ValueError as e:
+            print(peer.name, "Invalid notification:", e)
 
-        print("Disconnected")
-        active_connection = None
-        scan_active = True
-
-# Scan
+# Scan (alterne avec les connexions du pool, avec une fenêtre réduite)
 async def scan_task():
-    global discovered_devices
+    global discovered_devices, scanning_devices
     while True:
-        if scan_active:
-            print("--- Scanning ---")
-            devices = []
-            async with aioble.scan(1000, interval_us=30000, window_us=30000, active=True) as scanner:
-                async for result in scanner:
-                    name = result.name()
-                    if name and name.startswith("STeaMi"):
-                        if result.device not in [d.device for d in devices]:
+        print("--- Scanning ---")
+        devices = scanning_devices
+        devices.clear()
+        window_us = 10000 if len(pool) else 30000
+        try:
+            # Le contrôleur ne scanne pas pendant une connexion en cours :
+            # le scan attend son tour, et les connexions attendent la fin du scan
+            async with pool.radio_lock():
+                async with aioble.scan(1000, interval_us=30000, window_us=window_us, active=True) as scanner:
+                    async for result in scanner:
+                        # Appareil déjà retenu : seule la mise à jour du RSSI est utile
+                        if result.device.addr not in devices:
+                            name = result.name()
+                            if not (name and name.startswith("STeaMi")):
+                                continue
                             print(f"Found: {name}")
-                            devices.append(result)
-            discovered_devices = devices
+                        devices.add(result)
+        except OSError as e:
+            print("Scan failed:", e)
+            await asyncio.sleep(1)
+            continue
+        # Échange des deux agrégateurs : aucune allocation d'un scan à l'autre
+        scanning_devices = discovered_devices
+        discovered_devices = devices
         await asyncio.sleep(0.1)
 
 # Main
 async def main():
     await asyncio.gather(
         scan_task(),
+        stream_task(),
         display_task(),
         button_task()
     )
 
-asyncio.run(main())
\ No newline at end of file
+asyncio.run(main())
@@ -4,13 +4,16 @@ import aioble
 import bluetooth
 import struct
 from pins import *
+from sample_batch import SampleBatch, batch_capacity
 
 # UUIDs
 _ENV_SENSE_UUID = bluetooth.UUID(0x181A)
 _ENV_SENSE_TEMP_UUID = bluetooth.UUID(0x2A6E)
 _DEVICE_NAME_UUID = bluetooth.UUID("12345678-1234-5678-1234-56789abcdef0")
+_DISTANCE_BATCH_UUID = bluetooth.UUID("12345678-1234-5678-1234-56789abcdef1")
 _ADV_APPEARANCE_GENERIC_THERMOMETER = const(768)
 _ADV_INTERVAL_MS = 250_000
+_SAMPLE_PERIOD_MS = const(250)
 
 # BLE setup
 ble = bluetooth.BLE()
@@ -34,19 +37,29 @@ temp_characteristic = aioble.Characteristic(
 device_name_char = aioble.Characteristic(
     temp_service, _DEVICE_NAME_UUID, write=True, capture=True
 )
+# Lots de mesures horodatées (format sample_batch) : une notification
+# pour plusieurs mesures
+batch_characteristic = aioble.Characteristic(
+    temp_service, _DISTANCE_BATCH_UUID, read=True, notify=True
+)
 aioble.register_services(temp_service)
 
 # Encode distance as little-endian signed short
 def _encode_distance(distance_mm):
     return struct.pack("<h", int(distance_mm))
 
-# Task to read distance and update characteristic
+# Task to read distance and update characteristics
 async def sensor_task():
     global distance
+    batch = SampleBatch(batch_capacity())  # Lot qui tient dans le MTU par défaut
     while True:
         distance = DISTANCE.read()
+        # Les notifications ne partent que vers les clients abonnés
         temp_characteristic.write(_encode_distance(distance), send_update=True)
-        await asyncio.sleep_ms(1000)
+        if batch.add(distance):
+            batch_characteristic.write(batch.view(), send_update=True)
+            batch.clear()
+        await asyncio.sleep_ms(_SAMPLE_PERIOD_MS)
 
 # Task to handle BLE peripheral functionality
 async def peripheral_task():
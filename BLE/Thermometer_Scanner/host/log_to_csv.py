@@ -0,0 +1,110 @@
+"""
+Conversion des journaux binaires de Thermometer_Scanner en CSV (sur PC)
+
+Récupérer les fichiers de la carte puis les convertir :
+
+    mpremote connect auto fs cp :thermo0.bin :thermo1.bin :thermo2.bin :thermo3.bin .
+    python3 BLE/Thermometer_Scanner/host/log_to_csv.py thermo*.bin -o mesures.csv
+
+Les fichiers sont triés par numéro de séquence (ordre d'écriture) ; le
+format des enregistrements est lu dans l'en-tête de chaque fichier (voir
+lib/flash_log.py). Le journal compte LOG_FILES fichiers (4 par défaut).
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import struct
+import sys
+
+LOG_MAGIC = b"SLOG"
+LOG_VERSION = 1
+PREAMBLE = "<4sBH"
+PREAMBLE_SIZE = struct.calcsize(PREAMBLE)
+
+
+def read_log(path):
+    """
+    Lit un fichier journal
+
+    Returns:
+        (en-tête, contenu brut des enregistrements)
+
+    Raises:
+        ValueError: Le fichier n'est pas un journal
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < PREAMBLE_SIZE:
+        raise ValueError(f"{path}: file too short")
+    magic, version, length = struct.unpack_from(PREAMBLE, data)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"{path}: not a log file (version {version})")
+    header = json.loads(data[PREAMBLE_SIZE:PREAMBLE_SIZE + length])
+    return header, data[PREAMBLE_SIZE + length:]
+
+
+def decode_records(header, body):
+    """
+    Décode les enregistrements d'un fichier
+
+    Yields:
+        Liste des valeurs de chaque enregistrement, mises à l'échelle ; le
+        champ "time" est converti en date ISO 8601
+    """
+    record = struct.Struct(header["format"])
+    fields = header["fields"]
+    scales = header["scales"]
+    labels = header.get("labels", {})
+    epoch = datetime.datetime(header.get("epoch_year", 1970), 1, 1)
+    # Un enregistrement incomplet en fin de fichier (coupure) est ignoré
+    usable = len(body) - len(body) % record.size
+    for values in record.iter_unpack(body[:usable]):
+        row = []
+        for field, scale, value in zip(fields, scales, values):
+            if field == "time":
+                row.append((epoch + datetime.timedelta(seconds=value)).isoformat())
+            elif field in labels:
+                names = labels[field]
+                row.append(names[value] if value < len(names) else value)
+            elif scale != 1:
+                row.append(value / scale)
+            else:
+                row.append(value)
+        yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="+", help="Fichiers journaux (.bin)")
+    parser.add_argument("-o", "--output", help="Fichier CSV (sortie standard par défaut)")
+    args = parser.parse_args(argv)
+
+    logs = []
+    for path in args.files:
+        try:
+            logs.append(read_log(path))
+        except ValueError as e:
+            print(e, file=sys.stderr)
+    if not logs:
+        return 1
+    logs.sort(key=lambda log: log[0].get("seq", 0))
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        fields = None
+        for header, body in logs:
+            if header["fields"] != fields:
+                fields = header["fields"]
+                writer.writerow(fields)
+            writer.writerows(decode_records(header, body))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
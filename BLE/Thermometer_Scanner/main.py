@@ -2,6 +2,10 @@ import aioble
 import asyncio
 import struct
 import time
+from time_series import TimeSeries
+from ble_advertising import AD_TYPE_SERVICE_DATA_16, AdvParser
+from stream_plot import StreamPlot
+from flash_log import FlashLog
 
 #  Buttons and Screen gestion
 from machine import SPI, Pin
@@ -21,74 +25,133 @@ scan_interval = 30000  # in us
 scan_window = 30000  # in us
 scan_pause = 0.1  # in seconds
 
+# Affiche le détail de chaque trame reçue ; à laisser désactivé en
+# fonctionnement normal (l'affichage sur l'UART limite le débit du scan)
+DEBUG = False
+
+# Journal des mesures en flash : écritures par blocs de LOG_BLOCK_SIZE
+# octets dans LOG_FILES fichiers de LOG_FILE_SIZE octets au plus (anneau)
+LOG_BLOCK_SIZE = 512
+LOG_FILE_SIZE = 16384
+LOG_FILES = 4
+LOG_MAX_DELAY_MS = 60000  # mesures perdues au plus en cas de coupure
+
 # Paramètre : nombre maximum de mesures stockées par capteur
-MAX_DATA_PER_SENSOR = 100
+MAX_DATA_PER_SENSOR = 1000  # 12 octets par mesure
 
 #constants
 measurement = ["temperature", "humidity", "batteryLevel", "batteryPercentage"]
+# Les mesures sont stockées en entiers : valeur réelle = valeur stockée / échelle
+measurement_scale = [100, 100, 100, 1]
 allowed_devices = ["Nord", "Sud", "Est", "Ouest", "Maison"]
 
+# Formats de la structure Service Data, à partir de l'UUID 0x181A
+# (little-endian dans la trame)
+_ENV_SENSING_UUID_LSB = 0x1A
+_ENV_SENSING_UUID_MSB = 0x18
+# pvvx "custom" : UUID, MAC, température (int16, 0.01 °C), humidité
+# (uint16, 0.01 %), batterie (uint16, mV), batterie (uint8, %), compteur, flags
+_PVVX_FORMAT = "<8xhHHB"
+_PVVX_LENGTH = 17
+# ATC1441 : UUID, MAC, température (int16 big-endian, 0.1 °C), humidité
+# (uint8, %), batterie (uint8, %), batterie (uint16 big-endian, mV), compteur
+_ATC_FORMAT = ">8xhBBH"
+_ATC_LENGTH = 15
+
 # variables
-collected_data = {}
+parser = AdvParser()
+sensor_ids = {name: i for i, name in enumerate(allowed_devices)}
+data_log = FlashLog(
+    "thermo", "<IBhHHB",
+    ("time", "sensor", "temperature", "humidity", "batteryLevel", "batteryPercentage"),
+    scales=(1, 1, 100, 100, 100, 1), labels={"sensor": allowed_devices},
+    block_size=LOG_BLOCK_SIZE, file_size=LOG_FILE_SIZE, files=LOG_FILES,
+    max_delay_ms=LOG_MAX_DELAY_MS,
+)
+decoded_frames = 0
+invalid_frames = 0
+collected_data = {}  # nom du capteur -> TimeSeries (une voie par mesure)
 captured_devices = 0
 device_index = 0
 measurement_index = 0
 
 # Function to decode the advertising data received from the sensors
+# Formats "custom" pvvx et ATC1441 lus directement dans la trame ; retourne
+# False si la trame n'a pas le format attendu
 def decode_data(data, sensor_name):
-    print(f"Raw data {data}")
-
-    for i in range(len(data)):
-        print(f"Raw data [{i}]: {data[i]}")
-        if i < len(data)-1:
-            print(f"Raw data [{i}:{i+2}] in hex : {struct.unpack("<h", data[i:i+2])[0]}")
-
-    temperature = struct.unpack("<h", data[13:15])[0] / 100 # in °C
-    humidity = struct.unpack("<h", data[16:18])[0] / 100 # in %
-    batteryLevel = struct.unpack("<h", data[0:2])[0] / 100 # in Volts (A revoir car données incohérentes)
-    batteryPercentage = data[11] # in %
-
-     # Get the current time
-    current_time = time.strftime("%H:%M:%S", time.localtime())
-
-    if sensor_name not in collected_data:
-        collected_data[sensor_name] = []
-
-    collected_data[sensor_name].append({
-        "time": current_time,
-        "temperature": temperature,
-        "humidity": humidity,
-        "batteryLevel": batteryLevel,
-        "batteryPercentage": batteryPercentage
-    })
-
-    if len(collected_data[sensor_name]) > MAX_DATA_PER_SENSOR:
-        collected_data[sensor_name].pop(0)
-
-    print(f"-> Sensor: {sensor_name} - Temperature:{temperature:.2f} C, Humidity: {humidity:.2f} %, Battery Level: {batteryLevel:.2f} V, Battery Percentage: {batteryPercentage:.2f} %, at {current_time}")
-
-
-# Function to scan for BLE devices and receive their data tend to fill the memory in 10 min
+    global decoded_frames, invalid_frames
+    if DEBUG:
+        dump_data(data)
+
+    offset = -1
+    if parser.parse(data):
+        offset = parser.field_offset(AD_TYPE_SERVICE_DATA_16)
+    length = parser.field_length(AD_TYPE_SERVICE_DATA_16) if offset >= 0 else -1
+    if length < 2 or data[offset] != _ENV_SENSING_UUID_LSB or data[offset + 1] != _ENV_SENSING_UUID_MSB:
+        invalid_frames += 1
+        if DEBUG:
+            print("==> no environmental sensing service data")
+        return False
+
+    if length >= _PVVX_LENGTH:
+        temperature, humidity, battery_mv, batteryPercentage = struct.unpack_from(_PVVX_FORMAT, data, offset)
+    elif length == _ATC_LENGTH:
+        temperature, humidity, batteryPercentage, battery_mv = struct.unpack_from(_ATC_FORMAT, data, offset)
+        temperature *= 10  # 0.1 °C -> 0.01 °C
+        humidity *= 100    # % -> 0.01 %
+    else:
+        invalid_frames += 1
+        if DEBUG:
+            print(f"==> Invalid service data length: {length}")
+        return False
+    decoded_frames += 1
+
+    # Historique circulaire alloué à la première mesure du capteur
+    history = collected_data.get(sensor_name)
+    if history is None:
+        history = TimeSeries(MAX_DATA_PER_SENSOR, channels=len(measurement))
+        collected_data[sensor_name] = history
+        print(f"New sensor: {sensor_name}")
+    # temperature et humidity en centièmes, batterie en centièmes de volt
+    history.append((temperature, humidity, battery_mv // 10, batteryPercentage))
+    data_log.append((time.time(), sensor_ids[sensor_name], temperature, humidity,
+                     battery_mv // 10, batteryPercentage))
+
+    if DEBUG:
+        current_time = "%02d:%02d:%02d" % time.localtime()[3:6]
+        print(f"-> Sensor: {sensor_name} - Temperature:{temperature / 100:.2f} C, Humidity: {humidity / 100:.2f} %, Battery Level: {battery_mv / 1000:.2f} V, Battery Percentage: {batteryPercentage} %, at {current_time}")
+    return True
+
+# Function to print the raw advertising data (DEBUG only)
+def dump_data(data):
+    print("Raw data", bytes(data))
+    for i in range(len(data) - 1):
+        print("Raw data [%d]: %d, [%d:%d] as int16: %d" % (i, data[i], i, i + 2, struct.unpack_from("<h", data, i)[0]))
+
+
+# Function to scan for BLE devices and receive their data
 async def scan_loop():
     print(f"---Starting Scan---")
     while True:
         async with aioble.scan(scan_duration, interval_us=scan_interval, window_us=scan_window, active=True) as scanner:
             async for result in scanner:
                 if result.name() in allowed_devices:
-                    print(f"======> Found sensor : {result.name()}")
+                    if DEBUG:
+                        print(f"======> Found sensor : {result.name()}")
                     if result.adv_data:
-                        if (len(result.adv_data) > 17):  # Check if received complete data
-                            decode_data(result.adv_data, result.name())
-                        else:
-                            print(f"==> Invalid data length")
-                    else:
+                        decode_data(result.adv_data, result.name())
+                    elif DEBUG:
                         print("==> no adv_data")
-            asyncio.sleep(scan_pause)  # Pause between scans
+        await asyncio.sleep(scan_pause)  # Pause between scans
 
 # Function to display the data on the screen
 async def display_loop():
     global captured_devices
     start_time = time.time()
+    # Courbe incrémentale : seules les nouvelles mesures sont tracées
+    plot = StreamPlot(128, 46)
+    plot_source = None  # (capteur, mesure) affichés dans plot
+    plot_total = 0      # history.total lors de la dernière mise à jour
 
     while True:
         display.fill(0)
@@ -111,21 +174,22 @@ async def display_loop():
         display.framebuf.line(0, 30, 128, 30, 100)
 
         # Display measurement
-        measure = [entry[measurement[measurement_index]] for entry in collected_data[name]] # Get the selected measurement data
-        max_measure = max(measure) if measure else 0
-        min_measure = min(measure) if measure else 0
-        # Draw the graph
-        if max_measure != min_measure and len(measure) > 1:
-            length = len(measure)
-            for i in range(1, length):
-                x1 = int((i - 1) * 127 / (length - 1))
-                y1 = 80 - int((measure[i - 1] - min_measure) / (max_measure - min_measure) * 45)
-                x2 = int(i * 127 / (length - 1))
-                y2 = 80 - int((measure[i] - min_measure) / (max_measure - min_measure) * 45)
-
-                display.framebuf.line(x1, y1, x2, y2, 255)
+        history = collected_data[name]
+        scale = measurement_scale[measurement_index]
+        new_samples = history.total - plot_total
+        if (name, measurement_index) != plot_source or new_samples > plot.points:
+            # Changement de capteur ou de mesure : dernières mesures de l'historique
+            count = min(len(history), plot.points)
+            plot.load(history.get(measurement_index, i) for i in range(-count, 0))
+            plot_source = (name, measurement_index)
         else:
-            display.framebuf.line(0, 60, 127, 60, 255) # Draw a horizontal line if no data
+            for i in range(-new_samples, 0):
+                plot.push(history.get(measurement_index, i))
+        plot_total = history.total
+        max_measure = plot.max() / scale if len(plot) else 0
+        min_measure = plot.min() / scale if len(plot) else 0
+        # Draw the graph
+        plot.blit(display.framebuf, 0, 35)
 
         # Display the min and max values
         display.framebuf.line(0, 80, 128, 80, 100)
@@ -133,14 +197,14 @@ async def display_loop():
         display.text(f"> {max_measure:.2f}", 65, 85, 255)
 
         # Display the last value received
-        if collected_data[name]:
+        if len(history):
             if measurement[measurement_index] == "temperature":
                 unit = "C"
             elif measurement[measurement_index] == "batteryLevel":
                 unit = "V"
             else:
                 unit = "%"
-            last_measure = f"{measurement[measurement_index][0].upper()}: {collected_data[name][-1][measurement[measurement_index]]:.2f}{unit}"
+            last_measure = f"{measurement[measurement_index][0].upper()}: {history.get(measurement_index, -1) / scale:.2f}{unit}"
             display.text(last_measure, text_x_center_position(last_measure), 100, 255)
 
         # Display the time since the start of the program
@@ -168,12 +232,19 @@ async def button_pressed():
             if measurement_index >= len(measurement): measurement_index = 0
         await asyncio.sleep(0.1)
 
+# Function to write buffered log records even when no sensor is heard
+async def log_loop():
+    while True:
+        await asyncio.sleep_ms(LOG_MAX_DELAY_MS // 10)
+        data_log.poll()
+
 # Main function to run the scan and display loops concurrently
 async def main():
     data_task = asyncio.create_task(scan_loop())
     display_task = asyncio.create_task(display_loop())
     button_task = asyncio.create_task(button_pressed())
-    await asyncio.gather(data_task, display_task, button_task)
+    log_task = asyncio.create_task(log_loop())
+    await asyncio.gather(data_task, display_task, button_task, log_task)
 
 
 asyncio.run(main())
\ No newline at end of file
@@ -2,8 +2,9 @@ import bluetooth
 import uasyncio as asyncio
 import aioble
 import struct
-from time import ticks_ms, ticks_diff
 from pins import *  # Assure-toi que DISTANCE et display sont bien définis ici
+from ble_advertising import advertising_payload, extract_manufacturer_data
+from neighbor_table import NeighborTable
 
 # === Initialisation BLE ===
 ble = bluetooth.BLE()
@@ -20,30 +21,9 @@ ADV_TIMEOUT = 200  # Durée de l'annonce en ms
 
 # === Données locales et des autres appareils ===
 local_distance = 0
-devices_distances = {}  # {device_name: (distance, last_seen_ms)}
+devices_distances = NeighborTable(capacity=16, max_age_ms=30000)  # Voisins récents : nom -> distance
 
 # === Fonctions auxiliaires ===
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0:
-            break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
-
 def text_x_center(text):
     return max((128 - len(text) * 8) // 2, 0)
 
@@ -70,7 +50,7 @@ async def ble_task():
                         man_data = extract_manufacturer_data(result.adv_data)
                         if man_data and len(man_data) == 2:
                             distance, = struct.unpack("h", man_data)
-                            devices_distances[name] = (distance, ticks_ms())
+                            devices_distances.update(name, distance)
                             print(f"Received from {name}: {distance} cm")
 
             await asyncio.sleep_ms(SCAN_DURATION + 50)
@@ -99,9 +79,8 @@ async def display_task():
             display.fill(0)
             display.text(device_name, text_x_center(device_name), 20, 255)
             display.text(f"Me: {local_distance}", text_x_center("Me: XXX"), 30, 255)
-            recent_devices = sorted(devices_distances.items(), key=lambda item: item[1][1], reverse=True)[:4]
             y = 50
-            for name, (dist, _) in recent_devices:
+            for name, dist in devices_distances.recent(4):
                 display.text(f"{name[-4:]}: {dist}", text_x_center("XXXX: XXX"), y, 255)
                 y += 10
             display.show()
@@ -5,6 +5,7 @@ from aioble import peripheral
 
 from pins import *
 from advertizing import *
+from scan_aggregator import ScanAggregator
 
 ble = bluetooth.BLE()
 ble.active(True)
@@ -49,29 +50,26 @@ async def ble_menu():
 
 async def ble_receive():
     print("START BLE SCAN")
-    results = []
+    # Les résultats d'une même adresse MAC sont fusionnés pendant le scan
+    results = ScanAggregator(capacity=64)
     async with aioble.scan(1000, interval_us=30000, window_us=30000) as scanner:
         async for result in scanner:
-            results.append(result)
-    
+            results.add(result)
+
     print("END BLE SCAN")
-    # Remove duplicate MAC addresses
-    unique_results = []
-    seen_addresses = set()
-    for result in results:
-        mac_address = tuple(result.device.addr)
-        if mac_address not in seen_addresses:
-            seen_addresses.add(mac_address)
-            unique_results.append(result)
-    results = unique_results
+    if results.dropped:
+        print(f"{results.dropped} devices ignored (table full)")
     return results
-    
+
 async def display_receive(results):
     print("BLE SCAN RESULTS")
     
     result_index = 0
     while True:
-        print(f"{result_index+1}/{len(results)}: {results[result_index]}")
+        if results:
+            print(f"{result_index+1}/{len(results)}: {results[result_index]} "
+                  f"RSSI min/avg/max: {results.rssi_min(result_index)}/"
+                  f"{results.rssi_avg(result_index)}/{results.rssi_max(result_index)}")
 
         display.fill(0)
         display.text("RESULTS", 35, 20, 255)
@@ -84,7 +82,7 @@ async def display_receive(results):
             mac_address = ''.join(['%02x' % b for b in results[result_index].device.addr]).upper()
             display.text("MAC address:", 20, 50, 255)
             display.text(f"{mac_address}", 15, 60, 255)
-            display.text(f"RSSI : {results[result_index].rssi}", 20, 80, 255)
+            display.text(f"RSSI : {results.rssi_avg(result_index)}", 20, 80, 255)
             display.text(f"Name : {results[result_index].name()}", 20, 100, 255)
        
         display.show()
@@ -90,6 +90,7 @@ def test_leds(robot):
 def test_servo(robot):
     """Test du servo moteur"""
     print("\nTest du servo...")
+    robot.init_servo(verbose=True)
 
     angles = [-90, -45, 0, 45, 90, 0]
 
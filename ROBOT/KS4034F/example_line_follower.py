@@ -3,7 +3,7 @@ Exemple de suivi de ligne
 Le robot suit une ligne noire sur fond blanc
 """
 
-from ks4034f import KS4034F, LineTrackingSensor, LedCount, LedState
+from ks4034f import KS4034F, LineAction, LedCount, LedState, line_decision
 from time import sleep
 
 # Initialiser le robot
@@ -13,6 +13,22 @@ robot = KS4034F()
 FORWARD_SPEED = 30
 TURN_SPEED = 25
 
+# Pour chaque décision : message, mouvement, vitesse, LED gauche, LED droite
+ACTIONS = {
+    LineAction.FORWARD: ("Tout droit", robot.move_forward, FORWARD_SPEED,
+                         LedState.OFF, LedState.OFF),
+    LineAction.LEFT: ("Correction à gauche", robot.turn_left, TURN_SPEED,
+                      LedState.ON, LedState.OFF),
+    LineAction.RIGHT: ("Correction à droite", robot.turn_right, TURN_SPEED,
+                       LedState.OFF, LedState.ON),
+    LineAction.SHARP_LEFT: ("Virage à gauche", robot.turn_left, TURN_SPEED + 5,
+                            LedState.ON, LedState.OFF),
+    LineAction.SHARP_RIGHT: ("Virage à droite", robot.turn_right, TURN_SPEED + 5,
+                             LedState.OFF, LedState.ON),
+    LineAction.INTERSECTION: ("Intersection ou fin", robot.move_forward, FORWARD_SPEED,
+                              LedState.ON, LedState.ON),
+}
+
 print("Démonstration suivi de ligne")
 print("Le robot suit une ligne noire")
 print("Appuyez sur Ctrl+C pour arrêter\n")
@@ -26,60 +42,14 @@ try:
     robot.set_led(LedCount.RIGHT, LedState.OFF)
 
     while True:
-        # Lire les trois capteurs
-        left = robot.read_line_sensor(LineTrackingSensor.LEFT)
-        center = robot.read_line_sensor(LineTrackingSensor.CENTER)
-        right = robot.read_line_sensor(LineTrackingSensor.RIGHT)
+        # Lire les trois capteurs en une fois (bit à 1 = ligne noire)
+        mask = robot.read_line_sensors()
+        action = line_decision(mask)
 
         # Afficher l'état des capteurs (0 = noir, 1 = blanc)
-        print(f"L:{left} C:{center} R:{right}", end=" -> ")
-
-        # Logique de suivi de ligne
-        # 0 = ligne noire détectée, 1 = blanc
-
-        if center == 0:
-            # Ligne au centre - aller tout droit
-            print("Tout droit")
-            robot.move_forward(FORWARD_SPEED)
-            robot.set_led(LedCount.LEFT, LedState.OFF)
-            robot.set_led(LedCount.RIGHT, LedState.OFF)
-
-        elif left == 0 and center == 1 and right == 1:
-            # Ligne à gauche - corriger à gauche
-            print("Correction à gauche")
-            robot.turn_left(TURN_SPEED)
-            robot.set_led(LedCount.LEFT, LedState.ON)
-            robot.set_led(LedCount.RIGHT, LedState.OFF)
-
-        elif right == 0 and center == 1 and left == 1:
-            # Ligne à droite - corriger à droite
-            print("Correction à droite")
-            robot.turn_right(TURN_SPEED)
-            robot.set_led(LedCount.LEFT, LedState.OFF)
-            robot.set_led(LedCount.RIGHT, LedState.ON)
+        print(f"L:{(~mask) & 1} C:{(~mask >> 1) & 1} R:{(~mask >> 2) & 1}", end=" -> ")
 
-        elif left == 0 and center == 0:
-            # Ligne à gauche et au centre - virage serré à gauche
-            print("Virage à gauche")
-            robot.turn_left(TURN_SPEED + 5)
-            robot.set_led(LedCount.LEFT, LedState.ON)
-            robot.set_led(LedCount.RIGHT, LedState.OFF)
-
-        elif right == 0 and center == 0:
-            # Ligne à droite et au centre - virage serré à droite
-            print("Virage à droite")
-            robot.turn_right(TURN_SPEED + 5)
-            robot.set_led(LedCount.LEFT, LedState.OFF)
-            robot.set_led(LedCount.RIGHT, LedState.ON)
-
-        elif left == 0 and right == 0:
-            # Ligne des deux côtés - peut être un croisement ou une fin
-            print("Intersection ou fin")
-            robot.move_forward(FORWARD_SPEED)
-            robot.set_led(LedCount.LEFT, LedState.ON)
-            robot.set_led(LedCount.RIGHT, LedState.ON)
-
-        else:
+        if action == LineAction.LOST:
             # Aucune ligne détectée - arrêter
             print("Ligne perdue - Arrêt")
             robot.stop()
@@ -89,6 +59,12 @@ try:
             robot.set_led(LedCount.LEFT, LedState.OFF)
             robot.set_led(LedCount.RIGHT, LedState.OFF)
             sleep(0.5)
+        else:
+            message, move, speed, left_led, right_led = ACTIONS[action]
+            print(message)
+            move(speed)
+            robot.set_led(LedCount.LEFT, left_led)
+            robot.set_led(LedCount.RIGHT, right_led)
 
         sleep(0.05)  # Petit délai pour la stabilité
 
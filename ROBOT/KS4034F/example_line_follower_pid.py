@@ -0,0 +1,54 @@
+"""
+Exemple de suivi de ligne avec correcteur PID
+La boucle de contrôle tourne à fréquence fixe (timer) pendant que le
+programme principal affiche les statistiques de cadencement
+"""
+
+from ks4034f import KS4034F, LedCount, LedState
+from line_follower import LineFollower
+from time import sleep
+
+# Initialiser le robot
+robot = KS4034F()
+
+# Paramètres du contrôleur
+RATE_HZ = 200
+BASE_SPEED = 40
+KP = 25.0
+KI = 0.0
+KD = 1.5
+
+follower = LineFollower(robot, rate_hz=RATE_HZ, base_speed=BASE_SPEED,
+                        kp=KP, ki=KI, kd=KD)
+
+print("Démonstration suivi de ligne PID")
+print(f"Boucle de contrôle à {follower.rate_hz:.0f} Hz")
+print("Appuyez sur Ctrl+C pour arrêter\n")
+
+try:
+    # Allumer les LEDs pour indiquer que le programme est actif
+    robot.set_led(LedCount.LEFT, LedState.ON)
+    robot.set_led(LedCount.RIGHT, LedState.ON)
+    sleep(0.5)
+    robot.set_led(LedCount.LEFT, LedState.OFF)
+    robot.set_led(LedCount.RIGHT, LedState.OFF)
+
+    follower.start()
+
+    while True:
+        # Les affichages restent hors de la boucle de contrôle
+        sleep(1)
+        stats = follower.stats()
+        print(f"{stats['hz']:.1f} Hz, gigue max {stats['max_jitter_us']} us, "
+              f"itération max {stats['max_step_us']} us, "
+              f"dépassements {stats['overruns']}, erreur {follower.error:+.2f}")
+
+except KeyboardInterrupt:
+    print("\n\nArrêt demandé par l'utilisateur")
+
+finally:
+    follower.stop()
+    robot.set_led(LedCount.LEFT, LedState.OFF)
+    robot.set_led(LedCount.RIGHT, LedState.OFF)
+    robot.cleanup()
+    print("Robot arrêté proprement")
@@ -0,0 +1,92 @@
+"""
+Exemple de scanner asynchrone
+Le servo balaye en continu pendant que le robot avance et se dirige vers
+la direction la plus dégagée
+"""
+
+import asyncio
+from ks4034f import KS4034F, LedCount, LedState
+from scanner import ServoScanner
+
+# Initialiser le robot
+robot = KS4034F()
+scanner = ServoScanner(robot, sweep_dps=180, ping_period_ms=60)
+
+# Paramètres de navigation
+MIN_SAFE_DISTANCE = 30  # cm
+CRUISE_SPEED = 40
+STEER_GAIN = 0.3        # % de vitesse par degré d'écart
+
+
+def show_map():
+    """Visualisation simple de la carte polaire"""
+    for i in range(scanner.bin_count):
+        distance = scanner.distances[i]
+        bars = "=" * min(distance // 2, 50)
+        print(f"  {scanner.bin_angle(i):4d}°: {distance:3d}cm {bars}")
+
+
+async def navigation_task():
+    """Pilote le robot à partir de la carte, sans attendre le servo"""
+    # Attendre un premier passage complet pour remplir la carte
+    await scanner.wait_scan()
+
+    while True:
+        front = scanner.min_distance(-20, 20)
+        best_angle, best_distance = scanner.best_direction()
+
+        if best_distance < MIN_SAFE_DISTANCE:
+            # Tout est bloqué - reculer en continuant de scanner
+            robot.set_led(LedCount.LEFT, LedState.ON)
+            robot.set_led(LedCount.RIGHT, LedState.ON)
+            robot.move_backward(40)
+            await asyncio.sleep_ms(500)
+            robot.turn_right(50)
+            await asyncio.sleep_ms(500)
+        elif 0 < front < MIN_SAFE_DISTANCE:
+            # Obstacle devant - tourner sur place vers la meilleure direction
+            if best_angle < 0:
+                robot.turn_left(50)
+            else:
+                robot.turn_right(50)
+        else:
+            # Avancer en corrigeant la trajectoire vers la zone dégagée
+            steer = STEER_GAIN * best_angle
+            robot.drive(CRUISE_SPEED + steer, CRUISE_SPEED - steer)
+            robot.set_led(LedCount.LEFT, LedState.ON if best_angle < -10 else LedState.OFF)
+            robot.set_led(LedCount.RIGHT, LedState.ON if best_angle > 10 else LedState.OFF)
+
+        await asyncio.sleep_ms(50)
+
+
+async def display_task():
+    """Affiche la carte après chaque passage du servo"""
+    while True:
+        await scanner.wait_scan()
+        print(f"\n--- Passage {scanner.scan_count} ---")
+        show_map()
+
+
+async def main():
+    asyncio.create_task(scanner.run())
+    asyncio.create_task(display_task())
+    await navigation_task()
+
+
+print("Démonstration scanner asynchrone")
+print("Le robot scanne en roulant et évite les obstacles")
+print("Appuyez sur Ctrl+C pour arrêter\n")
+
+try:
+    asyncio.run(main())
+
+except KeyboardInterrupt:
+    print("\n\nArrêt demandé par l'utilisateur")
+
+finally:
+    # Retourner le servo au centre et tout éteindre
+    robot.set_servo_angle(0)
+    robot.set_led(LedCount.LEFT, LedState.OFF)
+    robot.set_led(LedCount.RIGHT, LedState.OFF)
+    robot.cleanup()
+    print("Robot arrêté proprement")
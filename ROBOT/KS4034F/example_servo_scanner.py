@@ -4,14 +4,18 @@ Le robot scanne son environnement et trouve le chemin le plus dégagé
 """
 
 from ks4034f import KS4034F, LedCount, LedState
-from time import sleep
+from odometry import Odometry
+from time import sleep, sleep_ms, ticks_ms, ticks_diff
 
 # Initialiser le robot
 robot = KS4034F()
+# Estimation du cap pour tourner d'un angle donné
+odometry = Odometry(robot)
 
 # Paramètres de scan
 SCAN_ANGLES = [-90, -60, -30, 0, 30, 60, 90]
 MIN_SAFE_DISTANCE = 30  # cm
+TURN_TIMEOUT_MS = 3000  # Sécurité si la rotation n'aboutit pas
 
 print("Démonstration scanner ultrason")
 print("Le robot scanne son environnement et évite les obstacles")
@@ -60,30 +64,39 @@ def find_best_direction(distances):
 
 def turn_to_angle(target_angle):
     """
-    Tourne le robot vers l'angle cible
+    Tourne le robot vers l'angle cible en suivant le cap estimé
     """
-    if target_angle < -10:
-        # Tourner à gauche
+    if -10 <= target_angle <= 10:
+        # Continuer tout droit
+        print("Continuer tout droit")
+        return
+
+    odometry.update()
+    start_heading = odometry.heading_deg()
+
+    if target_angle < 0:
         print(f"Tourner à gauche vers {target_angle}°")
-        turn_time = abs(target_angle) / 90  # Proportion de 90°
         robot.turn_left(50)
-        sleep(turn_time)
-        robot.stop()
-
-    elif target_angle > 10:
-        # Tourner à droite
+    else:
         print(f"Tourner à droite vers {target_angle}°")
-        turn_time = abs(target_angle) / 90
         robot.turn_right(50)
-        sleep(turn_time)
-        robot.stop()
 
-    else:
-        # Continuer tout droit
-        print("Continuer tout droit")
+    start = ticks_ms()
+    while ticks_diff(ticks_ms(), start) < TURN_TIMEOUT_MS:
+        sleep_ms(10)
+        odometry.update()
+        turned = (odometry.heading_deg() - start_heading + 180) % 360 - 180
+        if abs(turned) >= abs(target_angle):
+            break
+
+    robot.stop()
+    odometry.update()
 
 
 try:
+    # Initialiser le servo avant la boucle (configuration PWM en cache)
+    robot.init_servo()
+
     # Clignoter les LEDs pour indiquer le démarrage
     for _ in range(3):
         robot.set_led(LedCount.LEFT, LedState.ON)
@@ -115,11 +128,11 @@ try:
             robot.set_led(LedCount.LEFT, LedState.ON)
             robot.set_led(LedCount.RIGHT, LedState.ON)
 
+            odometry.update()
             robot.move_backward(40)
             sleep(1)
-            robot.turn_right(50)
-            sleep(1)
-            robot.stop()
+            odometry.update()
+            turn_to_angle(90)
 
             robot.set_led(LedCount.LEFT, LedState.OFF)
             robot.set_led(LedCount.RIGHT, LedState.OFF)
@@ -144,9 +157,13 @@ try:
 
             # Avancer
             print("Action: Avancer")
+            odometry.update()
             robot.move_forward(40)
             sleep(2)
+            odometry.update()
             robot.stop()
+            x, y, heading = odometry.pose()
+            print(f"Pose estimée: x={x}mm y={y}mm cap={heading:.0f}°")
 
             robot.set_led(LedCount.LEFT, LedState.OFF)
             robot.set_led(LedCount.RIGHT, LedState.OFF)
@@ -0,0 +1,39 @@
+"""
+Exemple de trajectoire en file d'attente
+Les mouvements sont exécutés en arrière-plan avec des rampes
+d'accélération pendant que la boucle principale reste libre
+"""
+
+from ks4034f import KS4034F
+from trajectory import TrajectoryEngine
+from time import sleep
+
+# Initialiser le robot
+robot = KS4034F()
+
+# Mise à jour des vitesses toutes les 20 ms, accélération de 150 %/s
+engine = TrajectoryEngine(robot, period_ms=20, accel=150)
+
+print("Démonstration trajectoire avec rampes")
+
+try:
+    # Un carré : les appels retournent immédiatement
+    for _ in range(4):
+        engine.forward(50, 1500)
+        engine.turn_right(40, 700)
+    engine.pause(500)
+    engine.backward(40, 1000, accel=80)
+
+    # La boucle principale reste disponible pendant le mouvement
+    while engine.busy():
+        print(f"Gauche: {engine.left:5.1f}%  Droite: {engine.right:5.1f}%")
+        sleep(0.25)
+
+    print("Trajectoire terminée!")
+
+except KeyboardInterrupt:
+    print("\nInterruption par l'utilisateur")
+
+finally:
+    engine.stop()
+    robot.cleanup()
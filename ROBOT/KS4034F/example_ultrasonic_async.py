@@ -0,0 +1,77 @@
+"""
+Exemple d'évitement d'obstacles non bloquant
+La distance est mesurée en tâche de fond par interruptions pendant que
+la boucle de pilotage continue de tourner
+"""
+
+import asyncio
+from ks4034f import KS4034F, LedCount, LedState
+
+# Initialiser le robot
+robot = KS4034F()
+
+# Distance de sécurité en cm
+SAFE_DISTANCE = 20
+# Intervalle entre deux mesures ultrason (ms)
+RANGING_PERIOD_MS = 60
+# Période de la boucle de pilotage (ms)
+CONTROL_PERIOD_MS = 20
+
+
+def on_distance(distance):
+    """Appelé après chaque écho (hors interruption)"""
+    if 0 < distance < SAFE_DISTANCE:
+        robot.set_led(LedCount.LEFT, LedState.ON)
+        robot.set_led(LedCount.RIGHT, LedState.ON)
+    else:
+        robot.set_led(LedCount.LEFT, LedState.OFF)
+        robot.set_led(LedCount.RIGHT, LedState.OFF)
+
+
+async def control_task():
+    """Boucle de pilotage : ne bloque jamais sur le capteur"""
+    while True:
+        distance = robot.last_distance
+
+        if 0 < distance < SAFE_DISTANCE:
+            # Obstacle proche - reculer puis tourner sans bloquer la mesure
+            robot.move_backward(40)
+            await asyncio.sleep_ms(500)
+            robot.turn_right(50)
+            await asyncio.sleep_ms(700)
+        else:
+            # Voie libre - avancer (rien n'est renvoyé si déjà en marche)
+            robot.move_forward(35)
+
+        await asyncio.sleep_ms(CONTROL_PERIOD_MS)
+
+
+async def display_task():
+    """Affiche la dernière distance mesurée"""
+    while True:
+        print(f"Distance: {robot.last_distance} cm")
+        await asyncio.sleep_ms(500)
+
+
+async def main():
+    asyncio.create_task(robot.ranging_task(RANGING_PERIOD_MS, on_distance))
+    asyncio.create_task(display_task())
+    await control_task()
+
+
+print("Démonstration évitement d'obstacles (non bloquant)")
+print(f"Distance de sécurité: {SAFE_DISTANCE} cm")
+print("Appuyez sur Ctrl+C pour arrêter\n")
+
+try:
+    asyncio.run(main())
+
+except KeyboardInterrupt:
+    print("\n\nArrêt demandé par l'utilisateur")
+
+finally:
+    # Éteindre les LEDs et arrêter le robot
+    robot.set_led(LedCount.LEFT, LedState.OFF)
+    robot.set_led(LedCount.RIGHT, LedState.OFF)
+    robot.cleanup()
+    print("Robot arrêté proprement")
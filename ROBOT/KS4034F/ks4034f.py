@@ -3,10 +3,19 @@ Bibliothèque MicroPython pour le robot Keyestudio KS4034F
 Portage de la bibliothèque MakeCode originale
 """
 
+import asyncio
+import json
+import micropython
 from machine import I2C
 from pyb import Pin, Timer
 from time import sleep_us, sleep_ms, ticks_us, ticks_diff
 
+try:
+    import stm
+except ImportError:
+    # Pas d'accès direct aux registres (autre port, simulateur)
+    stm = None
+
 
 class MotorPosition:
     """Position des moteurs sur le robot"""
@@ -29,6 +38,50 @@ class LineTrackingSensor:
     RIGHT = 2
 
 
+class LineMask:
+    """Bits du masque retourné par read_line_sensors (1 = ligne noire)"""
+    LEFT = 0x01
+    CENTER = 0x02
+    RIGHT = 0x04
+
+
+class LineAction:
+    """Décisions de suivi de ligne retournées par line_decision()"""
+    LOST = 0
+    FORWARD = 1
+    LEFT = 2
+    RIGHT = 3
+    SHARP_LEFT = 4
+    SHARP_RIGHT = 5
+    INTERSECTION = 6
+
+
+# Table de décision indexée par le masque des capteurs de ligne
+LINE_DECISIONS = (
+    LineAction.LOST,          # 0b000 : aucune ligne
+    LineAction.LEFT,          # 0b001 : ligne à gauche
+    LineAction.FORWARD,       # 0b010 : ligne au centre
+    LineAction.SHARP_LEFT,    # 0b011 : gauche + centre
+    LineAction.RIGHT,         # 0b100 : ligne à droite
+    LineAction.INTERSECTION,  # 0b101 : gauche + droite
+    LineAction.SHARP_RIGHT,   # 0b110 : centre + droite
+    LineAction.INTERSECTION,  # 0b111 : les trois capteurs
+)
+
+
+def line_decision(mask):
+    """
+    Décision de suivi de ligne pour un masque de capteurs
+
+    Args:
+        mask: Masque retourné par KS4034F.read_line_sensors()
+
+    Returns:
+        Constante LineAction
+    """
+    return LINE_DECISIONS[mask & 0x07]
+
+
 class LedCount:
     """Identifiants des LEDs colorées"""
     LEFT = 0x09
@@ -70,8 +123,33 @@ class KS4034F:
         MotorPosition.LOWER_LEFT: (0x07, 0x08)     # M4A, M4B
     }
 
+    # Premier registre de la trame moteur (M1A), suivi de M1B, M2A ... M4B
+    MOTOR_FRAME_START = 0x01
+    MOTOR_FRAME_SIZE = 8
+
+    # Nombre de registres suivis dans la copie locale (0x00 à 0x0A)
+    REGISTER_COUNT = 0x0B
+
+    # Capteur ultrason : timeout de l'écho (~6m) et conversion en cm
+    ULTRASONIC_TIMEOUT_US = 35000
+    ULTRASONIC_US_PER_CM = 58
+    # Intervalle minimal entre deux impulsions pour éviter les échos parasites
+    ULTRASONIC_MIN_PERIOD_MS = 60
+
+    # Configurations PWM connues (timer, canal) par pin de la carte
+    SERVO_PWM_TABLE = {
+        "P0": (2, 1),    # PA_0 - TIM2_CH1
+        "P1": (2, 2),    # PA_1 - TIM2_CH2
+        "P2": (2, 3),    # PA_2 - TIM2_CH3
+        "P11": (1, 1),   # PA_8 - TIM1_CH1
+    }
+    # Timers et canaux essayés si la pin n'est ni en cache ni dans la table
+    SERVO_TIMERS = (1, 2, 3, 4, 5, 8, 12, 15, 16, 17)
+    SERVO_CHANNELS = (1, 2, 3, 4)
+
     def __init__(self, i2c_bus=3, servo_pin="P0", trig_pin="P15", echo_pin="P16",
-                 line_left_pin="P3", line_center_pin="P4", line_right_pin="P10"):
+                 line_left_pin="P3", line_center_pin="P4", line_right_pin="P10",
+                 i2c_burst=False, servo_cache_file="servo_pwm.json"):
         """
         Initialise le robot KS4034F
 
@@ -83,9 +161,27 @@ class KS4034F:
             line_left_pin: Pin du capteur de ligne gauche (par défaut 3)
             line_center_pin: Pin du capteur de ligne central (par défaut 4)
             line_right_pin: Pin du capteur de ligne droit (par défaut 10)
+            i2c_burst: Écrire les 8 registres moteurs en une seule transaction
+                I2C (auto-incrément du STC15, non vérifié sur le robot). Par
+                défaut, écriture registre par registre.
+            servo_cache_file: Fichier où mémoriser le timer/canal PWM trouvé
+                pour la pin du servo (None pour désactiver le cache)
         """
         # Initialisation I2C
         self.i2c = I2C(i2c_bus)
+        self.i2c_burst = i2c_burst
+
+        # Buffers préalloués pour éviter toute allocation à chaque commande
+        self._reg_buf = bytearray(1)
+        # Image des registres demandés par l'application
+        self._regs = bytearray(self.REGISTER_COUNT)
+        self._regs_view = memoryview(self._regs)
+        self._motor_frame = self._regs_view[
+            self.MOTOR_FRAME_START:self.MOTOR_FRAME_START + self.MOTOR_FRAME_SIZE]
+        # Copie des registres tels qu'envoyés au STC15 (registres fantômes)
+        # et masque des registres dont la valeur est connue
+        self._shadow = bytearray(self.REGISTER_COUNT)
+        self._shadow_known = 0
 
         # Initialisation du servo avec Timer (pour STM32)
         self.servo_pin = servo_pin
@@ -94,18 +190,33 @@ class KS4034F:
         # Sur STM32, on utilise pyb.Timer pour PWM
         self.servo_timer = None
         self.servo_channel = None
+        self.servo_cache_file = servo_cache_file
 
         # Initialisation capteur ultrason
         self.trig = Pin(trig_pin, Pin.OUT_PP)
         self.echo = Pin(echo_pin, Pin.IN)
         self.last_ultrasonic_time = 0
 
+        # Mesure ultrason par interruptions (voir start_ranging)
+        self.last_distance = 0
+        self._echo_start = 0
+        self._echo_ready = False
+        self._ranging_active = False
+        self._ranging_callback = None
+        # Références préallouées : aucune allocation dans l'interruption
+        self._echo_irq_ref = self._echo_irq
+        self._ranging_done_ref = self._ranging_done
+
         # Initialisation capteurs de ligne
         self.line_sensors = {
             LineTrackingSensor.LEFT: Pin(line_left_pin, Pin.IN),
             LineTrackingSensor.CENTER: Pin(line_center_pin, Pin.IN),
             LineTrackingSensor.RIGHT: Pin(line_right_pin, Pin.IN)
         }
+        self._line_left = self.line_sensors[LineTrackingSensor.LEFT]
+        self._line_center = self.line_sensors[LineTrackingSensor.CENTER]
+        self._line_right = self.line_sensors[LineTrackingSensor.RIGHT]
+        self._init_line_port()
 
     def _i2c_write(self, reg, value):
         """
@@ -115,8 +226,133 @@ class KS4034F:
             reg: Registre à écrire
             value: Valeur à écrire (0-255)
         """
-        buf = bytearray([reg, value])
-        self.i2c.writeto(self.STC15_ADDRESS, buf)
+        self._reg_buf[0] = value & 0xFF
+        self.i2c.writeto_mem(self.STC15_ADDRESS, reg, self._reg_buf)
+
+    def _sync(self, first, last):
+        """
+        Envoie au contrôleur les registres first à last qui ont changé
+
+        Les registres dont la valeur est identique à la copie fantôme ne
+        sont pas retransmis. En mode burst, la plage modifiée est envoyée
+        en une seule transaction I2C.
+
+        Args:
+            first: Premier registre de la plage
+            last: Dernier registre de la plage (inclus)
+        """
+        regs = self._regs
+        shadow = self._shadow
+        known = self._shadow_known
+
+        # Réduire la plage aux registres réellement modifiés
+        while first <= last and known & (1 << first) and regs[first] == shadow[first]:
+            first += 1
+        while last >= first and known & (1 << last) and regs[last] == shadow[last]:
+            last -= 1
+        if first > last:
+            return
+
+        try:
+            if self.i2c_burst:
+                self.i2c.writeto_mem(self.STC15_ADDRESS, first, self._regs_view[first:last + 1])
+            else:
+                for reg in range(first, last + 1):
+                    if not known & (1 << reg) or regs[reg] != shadow[reg]:
+                        self._i2c_write(reg, regs[reg])
+        except OSError:
+            # État du contrôleur inconnu : tout renvoyer à la prochaine commande
+            self.invalidate()
+            raise
+
+        for reg in range(first, last + 1):
+            shadow[reg] = regs[reg]
+            known |= 1 << reg
+        self._shadow_known = known
+
+    def invalidate(self):
+        """
+        Oublie l'état supposé des registres du contrôleur
+
+        La prochaine commande de chaque registre sera toujours transmise.
+        A utiliser par exemple après une erreur de bus ou un reset du STC15.
+        """
+        self._shadow_known = 0
+
+    def flush(self):
+        """Renvoie au contrôleur l'état complet des moteurs et des LEDs"""
+        self.invalidate()
+        self._sync(self.MOTOR_FRAME_START, LedCount.RIGHT)
+
+    @staticmethod
+    def _speed_to_value(speed):
+        """Convertit une vitesse en pourcentage (0-100) en valeur 0-255"""
+        speed_value = int((speed / 100) * 255)
+        return max(0, min(255, speed_value))  # Limiter entre 0 et 255
+
+    def _motor_values(self, position, direction, speed_value):
+        """
+        Calcule les valeurs des registres A et B d'un moteur
+
+        Returns:
+            Tuple (valeur A, valeur B)
+        """
+        right = position == MotorPosition.UPPER_RIGHT or position == MotorPosition.LOWER_RIGHT
+        # Les moteurs droits (M1, M3) et gauches (M2, M4) sont montés en miroir
+        if (direction == MotorDirection.FORWARD) == right:
+            return speed_value, 0
+        return 0, speed_value
+
+    def _set_frame_motor(self, position, speed):
+        """
+        Place la commande d'un moteur dans la trame sans l'envoyer
+
+        Args:
+            position: Position du moteur
+            speed: Vitesse signée en pourcentage (-100 à 100, négatif = arrière)
+        """
+        if speed < 0:
+            direction = MotorDirection.BACK
+            speed = -speed
+        else:
+            direction = MotorDirection.FORWARD
+        value_a, value_b = self._motor_values(position, direction, self._speed_to_value(speed))
+        index = self.MOTOR_REGISTERS[position][0] - self.MOTOR_FRAME_START
+        self._motor_frame[index] = value_a
+        self._motor_frame[index + 1] = value_b
+
+    def set_motors(self, upper_left, lower_left, upper_right, lower_right):
+        """
+        Commande les quatre moteurs
+
+        Seuls les registres modifiés sont envoyés : une transaction I2C
+        avec i2c_burst=True, sinon une transaction par registre modifié
+        (jusqu'à 8, mode par défaut tant que la rafale n'est pas vérifiée
+        sur le STC15).
+
+        Args:
+            upper_left: Vitesse du moteur avant-gauche (-100 à 100)
+            lower_left: Vitesse du moteur arrière-gauche (-100 à 100)
+            upper_right: Vitesse du moteur avant-droit (-100 à 100)
+            lower_right: Vitesse du moteur arrière-droit (-100 à 100)
+
+        Une vitesse négative fait tourner le moteur en arrière.
+        """
+        self._set_frame_motor(MotorPosition.UPPER_LEFT, upper_left)
+        self._set_frame_motor(MotorPosition.LOWER_LEFT, lower_left)
+        self._set_frame_motor(MotorPosition.UPPER_RIGHT, upper_right)
+        self._set_frame_motor(MotorPosition.LOWER_RIGHT, lower_right)
+        self._sync(self.MOTOR_FRAME_START, self.MOTOR_FRAME_START + self.MOTOR_FRAME_SIZE - 1)
+
+    def drive(self, left_speed, right_speed):
+        """
+        Commande différentielle : même vitesse pour les deux moteurs d'un côté
+
+        Args:
+            left_speed: Vitesse des moteurs gauches (-100 à 100)
+            right_speed: Vitesse des moteurs droits (-100 à 100)
+        """
+        self.set_motors(left_speed, left_speed, right_speed, right_speed)
 
     def motor(self, position, direction, speed):
         """
@@ -127,38 +363,32 @@ class KS4034F:
             direction: Direction (MotorDirection.FORWARD ou BACK)
             speed: Vitesse en pourcentage (0-100)
         """
-        # Convertir le pourcentage en valeur 0-255
-        speed_value = int((speed / 100) * 255)
-        speed_value = max(0, min(255, speed_value))  # Limiter entre 0 et 255
-
         # Récupérer les registres du moteur
         reg_a, reg_b = self.MOTOR_REGISTERS[position]
+        value_a, value_b = self._motor_values(position, direction, self._speed_to_value(speed))
 
-        # Définir la direction
-        if direction == MotorDirection.FORWARD:
-            if position in [MotorPosition.UPPER_RIGHT, MotorPosition.LOWER_RIGHT]:
-                # Moteurs droits (M1 et M3)
-                self._i2c_write(reg_a, speed_value)
-                self._i2c_write(reg_b, 0)
-            else:
-                # Moteurs gauches (M2 et M4)
-                self._i2c_write(reg_a, 0)
-                self._i2c_write(reg_b, speed_value)
-        else:  # BACK
-            if position in [MotorPosition.UPPER_RIGHT, MotorPosition.LOWER_RIGHT]:
-                # Moteurs droits (M1 et M3)
-                self._i2c_write(reg_a, 0)
-                self._i2c_write(reg_b, speed_value)
-            else:
-                # Moteurs gauches (M2 et M4)
-                self._i2c_write(reg_a, speed_value)
-                self._i2c_write(reg_b, 0)
+        self._regs[reg_a] = value_a
+        self._regs[reg_b] = value_b
+        self._sync(reg_a, reg_b)
+
+    def motor_value(self, position):
+        """
+        Commande actuelle d'un moteur, lue dans l'image des registres
+
+        Args:
+            position: Position du moteur
+
+        Returns:
+            Valeur signée de -255 (arrière) à 255 (avant)
+        """
+        reg_a, reg_b = self.MOTOR_REGISTERS[position]
+        if position == MotorPosition.UPPER_RIGHT or position == MotorPosition.LOWER_RIGHT:
+            return self._regs[reg_a] - self._regs[reg_b]
+        return self._regs[reg_b] - self._regs[reg_a]
 
     def stop(self):
         """Arrête tous les moteurs"""
-        for reg_a, reg_b in self.MOTOR_REGISTERS.values():
-            self._i2c_write(reg_a, 0)
-            self._i2c_write(reg_b, 0)
+        self.set_motors(0, 0, 0, 0)
 
     def move_forward(self, speed):
         """
@@ -167,10 +397,7 @@ class KS4034F:
         Args:
             speed: Vitesse en pourcentage (0-100)
         """
-        self.motor(MotorPosition.UPPER_LEFT, MotorDirection.FORWARD, speed)
-        self.motor(MotorPosition.LOWER_LEFT, MotorDirection.FORWARD, speed)
-        self.motor(MotorPosition.UPPER_RIGHT, MotorDirection.FORWARD, speed)
-        self.motor(MotorPosition.LOWER_RIGHT, MotorDirection.FORWARD, speed)
+        self.set_motors(speed, speed, speed, speed)
 
     def move_backward(self, speed):
         """
@@ -179,10 +406,7 @@ class KS4034F:
         Args:
             speed: Vitesse en pourcentage (0-100)
         """
-        self.motor(MotorPosition.UPPER_LEFT, MotorDirection.BACK, speed)
-        self.motor(MotorPosition.LOWER_LEFT, MotorDirection.BACK, speed)
-        self.motor(MotorPosition.UPPER_RIGHT, MotorDirection.BACK, speed)
-        self.motor(MotorPosition.LOWER_RIGHT, MotorDirection.BACK, speed)
+        self.set_motors(-speed, -speed, -speed, -speed)
 
     def turn_left(self, speed):
         """
@@ -191,10 +415,7 @@ class KS4034F:
         Args:
             speed: Vitesse en pourcentage (0-100)
         """
-        self.motor(MotorPosition.UPPER_LEFT, MotorDirection.BACK, speed)
-        self.motor(MotorPosition.LOWER_LEFT, MotorDirection.BACK, speed)
-        self.motor(MotorPosition.UPPER_RIGHT, MotorDirection.FORWARD, speed)
-        self.motor(MotorPosition.LOWER_RIGHT, MotorDirection.FORWARD, speed)
+        self.set_motors(-speed, -speed, speed, speed)
 
     def turn_right(self, speed):
         """
@@ -203,10 +424,7 @@ class KS4034F:
         Args:
             speed: Vitesse en pourcentage (0-100)
         """
-        self.motor(MotorPosition.UPPER_LEFT, MotorDirection.FORWARD, speed)
-        self.motor(MotorPosition.LOWER_LEFT, MotorDirection.FORWARD, speed)
-        self.motor(MotorPosition.UPPER_RIGHT, MotorDirection.BACK, speed)
-        self.motor(MotorPosition.LOWER_RIGHT, MotorDirection.BACK, speed)
+        self.set_motors(speed, speed, -speed, -speed)
 
     def set_led(self, led, state):
         """
@@ -216,7 +434,146 @@ class KS4034F:
             led: LED à contrôler (LedCount.LEFT ou RIGHT)
             state: État de la LED (LedState.ON ou OFF)
         """
-        self._i2c_write(led, state)
+        self._regs[led] = state & 0xFF
+        self._sync(led, led)
+
+    def _load_servo_cache(self):
+        """
+        Lit la configuration PWM mémorisée pour la pin du servo
+
+        Returns:
+            (timer, canal), False si la pin est connue comme sans PWM,
+            None si aucune entrée n'existe
+        """
+        if not self.servo_cache_file:
+            return None
+        try:
+            with open(self.servo_cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry = cache.get(self.servo_pin)
+        if entry is False:
+            return False
+        if entry:
+            return entry[0], entry[1]
+        return None
+
+    def _save_servo_cache(self, config):
+        """
+        Mémorise la configuration PWM de la pin du servo en flash
+
+        Args:
+            config: (timer, canal) ou False si la pin ne supporte pas le PWM
+        """
+        if not self.servo_cache_file:
+            return
+        try:
+            with open(self.servo_cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        entry = list(config) if config else False
+        if cache.get(self.servo_pin) == entry:
+            return
+        cache[self.servo_pin] = entry
+        try:
+            with open(self.servo_cache_file, "w") as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"Impossible d'écrire {self.servo_cache_file}: {e}")
+
+    def _try_servo_config(self, timer_id, channel_id):
+        """
+        Essaie d'attacher le servo à un timer et un canal donnés
+
+        Returns:
+            True si le canal PWM a pu être créé
+        """
+        try:
+            timer = Timer(timer_id, freq=50)
+        except Exception:
+            return False
+        try:
+            channel = timer.channel(channel_id, Timer.PWM, pin=self.servo_pin_obj)
+        except Exception:
+            timer.deinit()
+            return False
+        self.servo_timer = timer
+        self.servo_channel = channel
+        return True
+
+    def _discover_servo_config(self, verbose):
+        """
+        Cherche un timer/canal PWM pour la pin du servo par essais successifs
+
+        Returns:
+            (timer, canal) trouvé, ou None
+        """
+        for timer_id in self.SERVO_TIMERS:
+            if verbose:
+                print(f"  Essai Timer {timer_id}...")
+            for channel_id in self.SERVO_CHANNELS:
+                if self._try_servo_config(timer_id, channel_id):
+                    return timer_id, channel_id
+        return None
+
+    def init_servo(self, verbose=False):
+        """
+        Initialise le PWM du servo
+
+        La configuration (timer, canal) est prise, dans l'ordre, dans le
+        fichier de cache, dans la table SERVO_PWM_TABLE, ou trouvée par
+        essais successifs puis mémorisée pour les démarrages suivants.
+        Appeler cette méthode au démarrage évite de payer ce coût lors du
+        premier set_servo_angle().
+
+        Args:
+            verbose: Afficher le détail de la recherche
+
+        Returns:
+            True si le servo est utilisable
+        """
+        if self.servo_timer is not None:
+            return self.servo_timer is not False
+
+        cached = self._load_servo_cache()
+        if cached is False:
+            # Pin déjà connue comme sans PWM : ne pas refaire la recherche
+            self.servo_timer = False
+            self.servo_channel = False
+            print(f"✗ Servo désactivé: pas de PWM sur {self.servo_pin} "
+                  f"(supprimer {self.servo_cache_file} pour relancer la recherche)")
+            return False
+
+        config = None
+        if cached and self._try_servo_config(*cached):
+            config = cached
+        else:
+            known = self.SERVO_PWM_TABLE.get(self.servo_pin)
+            if known and self._try_servo_config(*known):
+                config = known
+            else:
+                if verbose:
+                    print(f"Tentative d'initialisation du servo sur {self.servo_pin}...")
+                config = self._discover_servo_config(verbose)
+
+        if config is None:
+            # Marquer comme indisponible (utiliser False au lieu de None)
+            self.servo_timer = False
+            self.servo_channel = False
+            self._save_servo_cache(False)
+            print(f"✗ ATTENTION: La pin {self.servo_pin} ne supporte pas le PWM")
+            print("  Le servo moteur ne sera pas fonctionnel.")
+            print("  Si vous avez besoin du servo, reconnectez-le sur une pin PWM")
+            print("  (PA_0/P0, PA_1/P1, PA_2/P2, PA_8/P11 selon la carte)")
+            return False
+
+        if config != cached:
+            self._save_servo_cache(config)
+        if verbose:
+            print(f"✓ Servo initialisé: Timer {config[0]}, Canal {config[1]}")
+        return True
 
     def set_servo_angle(self, angle):
         """
@@ -228,59 +585,11 @@ class KS4034F:
         Note:
             Sur certaines cartes comme la STEAMI, la pin P14 (PB14) ne supporte pas le PWM.
             Le servo ne sera pas fonctionnel dans ce cas.
+            Appeler init_servo() au démarrage pour sortir l'initialisation
+            du chemin de contrôle.
         """
-        # Marquer comme tenté si c'est la première fois
-        if self.servo_timer is None and self.servo_channel is None:
-            print(f"Tentative d'initialisation du servo sur {self.servo_pin}...")
-
-            # Essayer différents timers jusqu'à en trouver un qui fonctionne
-            success = False
-            for timer_id in [1, 2, 3, 4, 5, 8, 12, 15, 16, 17]:
-                if success:
-                    break
-
-                try:
-                    print(f"  Essai Timer {timer_id}...")
-                    test_timer = Timer(timer_id, freq=50)
-
-                    # Essayer différents canaux
-                    for channel_id in [1, 2, 3, 4]:
-                        try:
-                            print(f"    Essai Canal {channel_id}...", end=" ")
-                            test_channel = test_timer.channel(
-                                channel_id,
-                                Timer.PWM,
-                                pin=self.servo_pin_obj
-                            )
-                            # Succès !
-                            self.servo_timer = test_timer
-                            self.servo_channel = test_channel
-                            print(f"OK!")
-                            print(f"✓ Servo initialisé: Timer {timer_id}, Canal {channel_id}")
-                            success = True
-                            break
-                        except Exception as e:
-                            # Ce canal ne fonctionne pas, continuer
-                            print(f"Échec ({type(e).__name__}: {e})")
-
-                    if not success:
-                        # Aucun canal n'a fonctionné, libérer le timer
-                        test_timer.deinit()
-
-                except Exception as e:
-                    # Ce timer n'existe pas ou n'est pas disponible
-                    print(f"  Timer {timer_id} non disponible ({type(e).__name__})")
-                    continue
-
-            if not success:
-                # Marquer comme indisponible (utiliser False au lieu de None)
-                self.servo_timer = False
-                self.servo_channel = False
-                print(f"✗ ATTENTION: La pin {self.servo_pin} ne supporte pas le PWM")
-                print("  Le servo moteur ne sera pas fonctionnel.")
-                print("  Si vous avez besoin du servo, reconnectez-le sur une pin PWM")
-                print("  (PA_0/P0, PA_1/P1, PA_2/P2, PA_8/P11 selon la carte)")
-                return
+        if self.servo_timer is None:
+            self.init_servo()
 
         # Si le servo n'est pas disponible, ne rien faire
         if self.servo_channel is False:
@@ -295,7 +604,7 @@ class KS4034F:
 
         # Appliquer le duty cycle
         try:
-            self.servo_channel.pulse_width_percent(int(duty_percent))
+            self.servo_channel.pulse_width_percent(duty_percent)
         except Exception as e:
             print(f"Erreur lors du contrôle du servo: {e}")
 
@@ -311,6 +620,47 @@ class KS4034F:
         """
         return self.line_sensors[sensor].value()
 
+    def _init_line_port(self):
+        """
+        Prépare la lecture des trois capteurs de ligne en un seul accès
+
+        Si les trois pins sont sur le même port GPIO, leur état est lu d'un
+        coup dans le registre IDR du port : les trois échantillons sont pris
+        au même instant.
+        """
+        self._line_idr = None
+        if stm is None:
+            return
+        pins = (self._line_left, self._line_center, self._line_right)
+        try:
+            port = pins[0].port()
+            if pins[1].port() != port or pins[2].port() != port:
+                return
+            base = getattr(stm, "GPIO" + "ABCDEFGH"[port])
+            self._line_idr = base + stm.GPIO_IDR
+            self._line_bits = (pins[0].pin(), pins[1].pin(), pins[2].pin())
+        except (AttributeError, IndexError):
+            self._line_idr = None
+
+    def read_line_sensors(self):
+        """
+        Lit les trois capteurs de suivi de ligne en une fois
+
+        Returns:
+            Masque LineMask : bit à 1 quand le capteur voit la ligne noire
+            (LEFT = 0x01, CENTER = 0x02, RIGHT = 0x04)
+        """
+        if self._line_idr is not None:
+            idr = stm.mem32[self._line_idr]
+            left_bit, center_bit, right_bit = self._line_bits
+            # Capteur à 0 sur la ligne noire : inverser les bits
+            return ((~idr >> left_bit) & 1
+                    | ((~idr >> center_bit) & 1) << 1
+                    | ((~idr >> right_bit) & 1) << 2)
+        return ((not self._line_left.value())
+                | (not self._line_center.value()) << 1
+                | (not self._line_right.value()) << 2)
+
     def read_ultrasonic(self):
         """
         Lit la distance du capteur ultrason
@@ -360,8 +710,122 @@ class KS4034F:
 
         return distance
 
+    def _echo_irq(self, pin):
+        """
+        Interruption sur les fronts de la pin echo
+
+        Le front montant horodate le début de l'écho, le front descendant
+        calcule la durée et met la distance en cache.
+        """
+        now = ticks_us()
+        if pin.value():
+            self._echo_start = now
+            return
+        if not self._echo_start:
+            return
+        duration = ticks_diff(now, self._echo_start)
+        self._echo_start = 0
+        if duration <= 0 or duration > self.ULTRASONIC_TIMEOUT_US:
+            return
+        self.last_ultrasonic_time = duration
+        # Arrondi entier : pas de flottant dans l'interruption
+        self.last_distance = (duration + self.ULTRASONIC_US_PER_CM // 2) // self.ULTRASONIC_US_PER_CM
+        self._echo_ready = True
+        if self._ranging_callback is not None:
+            micropython.schedule(self._ranging_done_ref, self.last_distance)
+
+    def _ranging_done(self, distance):
+        """Appelle le callback utilisateur hors interruption"""
+        callback = self._ranging_callback
+        if callback is not None:
+            callback(distance)
+
+    def start_ranging(self, callback=None):
+        """
+        Active la mesure ultrason par interruptions
+
+        Les fronts de la pin echo sont horodatés par interruption : aucune
+        attente active. La dernière distance est disponible dans
+        last_distance.
+
+        Args:
+            callback: Fonction appelée avec la distance en cm après chaque
+                écho (optionnel, exécutée hors interruption)
+        """
+        self._ranging_callback = callback
+        self._echo_start = 0
+        self._echo_ready = False
+        # Interruption matérielle : horodatage sans la latence d'une
+        # interruption logicielle (le handler n'alloue pas de mémoire)
+        self.echo.irq(handler=self._echo_irq_ref, trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING,
+                      hard=True)
+        self._ranging_active = True
+
+    def stop_ranging(self):
+        """Désactive la mesure ultrason par interruptions"""
+        if self._ranging_active:
+            self.echo.irq(handler=None)
+            self._ranging_active = False
+        self._ranging_callback = None
+
+    def ping(self):
+        """
+        Envoie une impulsion ultrason sans attendre l'écho
+
+        Le résultat arrive par interruption (voir start_ranging).
+        """
+        if not self._ranging_active:
+            self.start_ranging(self._ranging_callback)
+        self._echo_ready = False
+        self._echo_start = 0
+        self.trig.value(0)
+        sleep_us(2)
+        self.trig.value(1)
+        sleep_us(10)
+        self.trig.value(0)
+
+    async def read_ultrasonic_async(self):
+        """
+        Mesure une distance sans bloquer les autres tâches asyncio
+
+        Returns:
+            Distance en centimètres (dernière valeur valide si pas d'écho,
+            0 si aucune mesure n'a encore réussi)
+        """
+        self.ping()
+        start = ticks_us()
+        while not self._echo_ready:
+            # Timeout : aller-retour maximal + temps de réponse du capteur
+            if ticks_diff(ticks_us(), start) > 2 * self.ULTRASONIC_TIMEOUT_US:
+                break
+            await asyncio.sleep_ms(1)
+        return self.last_distance
+
+    async def ranging_task(self, period_ms=100, callback=None):
+        """
+        Tâche de fond : mesure la distance en continu
+
+        A lancer avec asyncio.create_task(robot.ranging_task(...)). La
+        dernière distance est mise en cache dans last_distance.
+
+        Args:
+            period_ms: Intervalle entre deux mesures en ms (minimum 60)
+            callback: Fonction appelée avec chaque nouvelle distance (optionnel)
+        """
+        period_ms = max(self.ULTRASONIC_MIN_PERIOD_MS, period_ms)
+        self.start_ranging(callback)
+        try:
+            while True:
+                self.ping()
+                await asyncio.sleep_ms(period_ms)
+        finally:
+            self.stop_ranging()
+
     def cleanup(self):
         """Nettoie les ressources (arrête les moteurs et le servo)"""
+        self.stop_ranging()
+        # Forcer l'envoi de l'arrêt même si les moteurs semblent déjà arrêtés
+        self.invalidate()
         self.stop()
         if self.servo_timer is not None and self.servo_timer is not False:
             try:
@@ -0,0 +1,232 @@
+"""
+Contrôleur de suivi de ligne à fréquence fixe pour le robot KS4034F
+Boucle cadencée par un timer, correction PID sur l'erreur pondérée des
+capteurs et statistiques de cadencement
+"""
+
+from machine import Timer
+from time import ticks_us, ticks_diff
+from ks4034f import LineMask
+
+
+class LineFollower:
+    """
+    Suiveur de ligne PID cadencé par timer
+
+    A chaque itération, les trois capteurs sont lus d'un coup, convertis en une erreur
+    de position (-1 = ligne à gauche, +1 = ligne à droite) et un correcteur
+    PID calcule une commande différentielle envoyée via KS4034F.drive().
+    Une itération dont la commande change coûte jusqu'à 8 transactions I2C
+    (une par registre moteur modifié), ou une seule si le robot est créé
+    avec i2c_burst=True.
+    """
+
+    # Poids des capteurs dans le calcul de l'erreur de position
+    WEIGHT_LEFT = -1.0
+    WEIGHT_CENTER = 0.0
+    WEIGHT_RIGHT = 1.0
+
+    # Erreur utilisée quand la ligne est perdue (du côté où elle a été vue)
+    LOST_ERROR = 2.0
+
+    def __init__(self, robot, rate_hz=200, base_speed=40,
+                 kp=25.0, ki=0.0, kd=1.5, max_speed=100, integral_limit=10.0):
+        """
+        Initialise le contrôleur
+
+        Args:
+            robot: Instance KS4034F
+            rate_hz: Fréquence de la boucle de contrôle en Hz (par défaut 200,
+                arrondie à une période entière en millisecondes)
+            base_speed: Vitesse de croisière en pourcentage (0-100)
+            kp: Gain proportionnel
+            ki: Gain intégral
+            kd: Gain dérivé
+            max_speed: Vitesse maximale d'un côté en pourcentage
+            integral_limit: Borne de l'intégrale (anti-emballement)
+        """
+        self.robot = robot
+        # Le timer logiciel a une résolution d'une milliseconde
+        self.period_ms = max(1, round(1000 / rate_hz))
+        self.period_us = self.period_ms * 1000
+        self.rate_hz = 1000 / self.period_ms
+        self.base_speed = base_speed
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.max_speed = max_speed
+        self.integral_limit = integral_limit
+
+        self._timer = None
+        self._running = False
+
+        # Erreur de position précalculée pour chacun des 8 masques capteurs
+        self._errors = [self._mask_error(mask) for mask in range(8)]
+
+        self.reset()
+
+    def reset(self):
+        """Remet à zéro l'état du PID et les statistiques"""
+        self._integral = 0.0
+        self._last_error = 0.0
+        self._has_last_error = False  # pas de dérivée à la première itération
+        self._lost = False            # ligne perdue à la dernière lecture
+        self._was_lost = False        # ... et à l'itération précédente
+        self.error = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Remet à zéro les statistiques de cadencement"""
+        self._first_tick = 0
+        self._last_tick = 0
+        self.iterations = 0
+        self.max_jitter_us = 0
+        self.max_step_us = 0
+        self.overruns = 0
+
+    def _mask_error(self, mask):
+        """Moyenne des poids des capteurs qui voient la ligne (None si aucun)"""
+        total = 0.0
+        count = 0
+        for bit, weight in ((LineMask.LEFT, self.WEIGHT_LEFT),
+                            (LineMask.CENTER, self.WEIGHT_CENTER),
+                            (LineMask.RIGHT, self.WEIGHT_RIGHT)):
+            if mask & bit:
+                total += weight
+                count += 1
+        if count == 0:
+            return None
+        return total / count
+
+    def _read_error(self):
+        """
+        Calcule l'erreur de position de la ligne
+
+        Returns:
+            Erreur entre -1 (ligne à gauche) et 1 (ligne à droite), ou
+            +/-LOST_ERROR si la ligne est perdue
+        """
+        error = self._errors[self.robot.read_line_sensors()]
+        self._lost = error is None
+        if error is None:
+            # Ligne perdue : continuer à tourner du côté où elle a été vue
+            if self._last_error < 0:
+                return -self.LOST_ERROR
+            if self._last_error > 0:
+                return self.LOST_ERROR
+            return 0.0
+        return error
+
+    def step(self, dt_us=None):
+        """
+        Exécute une itération de la boucle de contrôle
+
+        Args:
+            dt_us: Durée depuis l'itération précédente en µs (par défaut la
+                période nominale)
+        """
+        if dt_us is None or dt_us <= 0:
+            dt_us = self.period_us
+        dt = dt_us / 1000000
+
+        error = self._read_error()
+
+        self._integral += error * dt
+        if self._integral > self.integral_limit:
+            self._integral = self.integral_limit
+        elif self._integral < -self.integral_limit:
+            self._integral = -self.integral_limit
+
+        # Pas de dérivée sans erreur précédente (démarrage) ni quand la
+        # ligne est perdue ou retrouvée : le saut d'erreur donnerait un
+        # à-coup de kd * erreur / dt
+        if self._has_last_error and self._lost == self._was_lost:
+            derivative = (error - self._last_error) / dt
+        else:
+            derivative = 0.0
+        self._last_error = error
+        self._has_last_error = True
+        self._was_lost = self._lost
+        self.error = error
+
+        correction = self.kp * error + self.ki * self._integral + self.kd * derivative
+
+        # Erreur positive = ligne à droite : accélérer la gauche
+        max_speed = self.max_speed
+        left = self.base_speed + correction
+        right = self.base_speed - correction
+        left = max(-max_speed, min(max_speed, left))
+        right = max(-max_speed, min(max_speed, right))
+        self.robot.drive(left, right)
+
+    def _timer_callback(self, timer):
+        """
+        Itération déclenchée par le timer, avec mesure du cadencement
+
+        Le timer logiciel exécute ce callback hors interruption : les
+        écritures I2C y sont autorisées.
+        """
+        if not self._running:
+            return
+        now = ticks_us()
+        if self.iterations:
+            dt_us = ticks_diff(now, self._last_tick)
+            jitter = abs(dt_us - self.period_us)
+            if jitter > self.max_jitter_us:
+                self.max_jitter_us = jitter
+            if dt_us > 2 * self.period_us:
+                self.overruns += 1
+        else:
+            self._first_tick = now
+            dt_us = self.period_us
+        self._last_tick = now
+        self.iterations += 1
+
+        self.step(dt_us)
+
+        step_us = ticks_diff(ticks_us(), now)
+        if step_us > self.max_step_us:
+            self.max_step_us = step_us
+
+    def start(self):
+        """Démarre la boucle de contrôle cadencée par timer"""
+        if self._running:
+            return
+        self.reset()
+        self._running = True
+        self._timer = Timer(-1, mode=Timer.PERIODIC, period=self.period_ms,
+                            callback=self._timer_callback)
+
+    def stop(self):
+        """Arrête la boucle de contrôle et les moteurs"""
+        self._running = False
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        self.robot.stop()
+
+    def achieved_hz(self):
+        """Fréquence réellement atteinte depuis le démarrage (Hz)"""
+        if self.iterations < 2:
+            return 0
+        elapsed = ticks_diff(self._last_tick, self._first_tick)
+        if elapsed <= 0:
+            return 0
+        return (self.iterations - 1) * 1000000 / elapsed
+
+    def stats(self):
+        """
+        Statistiques de cadencement
+
+        Returns:
+            dict avec la fréquence atteinte (Hz), le nombre d'itérations, la
+            gigue maximale (µs), la durée maximale d'une itération (µs) et
+            le nombre de dépassements (période > 2x la période nominale)
+        """
+        return {
+            "hz": self.achieved_hz(),
+            "iterations": self.iterations,
+            "max_jitter_us": self.max_jitter_us,
+            "max_step_us": self.max_step_us,
+            "overruns": self.overruns,
+        }
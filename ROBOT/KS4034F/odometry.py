@@ -0,0 +1,190 @@
+"""
+Odométrie à l'estime pour le robot KS4034F
+La pose (x, y, cap) est intégrée à partir des vitesses commandées aux
+moteurs, en arithmétique entière (virgule fixe) pour ne pas allouer de
+flottants dans la boucle de contrôle
+"""
+
+import math
+from array import array
+from time import ticks_us, ticks_diff
+from ks4034f import MotorPosition
+
+
+# Cap en unités de 2^-20 tour (angle binaire)
+HEADING_BITS = 20
+HEADING_TURN = 1 << HEADING_BITS
+HEADING_MASK = HEADING_TURN - 1
+
+# Table de sinus sur un tour complet, en Q14
+SINE_BITS = 10
+SINE_Q = 14
+SINE_TABLE = array("h", [round(math.sin(2 * math.pi * i / (1 << SINE_BITS)) * (1 << SINE_Q))
+                         for i in range(1 << SINE_BITS)])
+SINE_SHIFT = HEADING_BITS - SINE_BITS
+QUARTER_TURN = 1 << (SINE_BITS - 2)
+SINE_INDEX_MASK = (1 << SINE_BITS) - 1
+
+
+class Odometry:
+    """
+    Estimation de la pose par intégration des vitesses commandées
+
+    Le repère est celui du robot au démarrage : y vers l'avant, x vers la
+    droite, cap 0 vers l'avant et croissant dans le sens horaire. Les
+    positions sont en micromètres et le cap en 2^-20 tour.
+    """
+
+    # Pas d'intégration maximal : garde les calculs dans les petits entiers
+    MAX_STEP_US = 50000
+
+    def __init__(self, robot, full_speed_mm_s=600, track_mm=150):
+        """
+        Initialise l'estimateur
+
+        Args:
+            robot: Instance KS4034F
+            full_speed_mm_s: Vitesse d'une roue à 100 % en mm/s (calibrable
+                ensuite moteur par moteur avec calibrate())
+            track_mm: Voie du robot (distance entre roues gauches et droites)
+        """
+        self.robot = robot
+        # Vitesse à 100 % de chaque moteur, indexée par MotorPosition
+        self.full_speed = array("h", [full_speed_mm_s] * 4)
+        self.set_track(track_mm)
+
+        # Fusion ultrason : gain Q8 et écart maximal accepté (µm)
+        self.range_gain = 64
+        self.range_gate_um = 100000
+
+        self.reset()
+
+    def reset(self, x_mm=0, y_mm=0, heading_deg=0):
+        """Réinitialise la pose"""
+        self.x_um = x_mm * 1000
+        self.y_um = y_mm * 1000
+        self.heading = round(heading_deg * HEADING_TURN / 360) & HEADING_MASK
+        self.travel_um = 0
+        self._last_tick = ticks_us()
+        self._range_um = 0
+        self._range_travel_um = 0
+
+    def calibrate(self, position, full_speed_mm_s):
+        """
+        Calibre la vitesse à 100 % d'un moteur
+
+        Args:
+            position: Position du moteur (MotorPosition)
+            full_speed_mm_s: Vitesse mesurée de la roue à 100 % en mm/s
+        """
+        self.full_speed[position] = full_speed_mm_s
+
+    def set_track(self, track_mm):
+        """
+        Règle la voie du robot (calibration des rotations)
+
+        Args:
+            track_mm: Voie effective en mm
+        """
+        self.track_mm = track_mm
+        # dcap = (v_droite - v_gauche) * dt / voie, converti en 2^-20 tour
+        self._turn_div = round(2 * math.pi * 1000000 * track_mm / HEADING_TURN)
+
+    def _wheel_speed(self, position):
+        """Vitesse commandée d'une roue en mm/s"""
+        return self.robot.motor_value(position) * self.full_speed[position] // 255
+
+    def update(self):
+        """
+        Intègre la pose depuis l'appel précédent
+
+        A appeler régulièrement depuis la boucle de contrôle, et avant tout
+        changement de commande des moteurs pour une meilleure précision.
+        """
+        now = ticks_us()
+        dt_us = ticks_diff(now, self._last_tick)
+        self._last_tick = now
+        if dt_us <= 0:
+            return
+
+        v_left = (self._wheel_speed(MotorPosition.UPPER_LEFT)
+                  + self._wheel_speed(MotorPosition.LOWER_LEFT)) >> 1
+        v_right = (self._wheel_speed(MotorPosition.UPPER_RIGHT)
+                   + self._wheel_speed(MotorPosition.LOWER_RIGHT)) >> 1
+        if v_left == 0 and v_right == 0:
+            return
+
+        while dt_us > 0:
+            step = min(dt_us, self.MAX_STEP_US)
+            dt_us -= step
+            self._integrate(v_left, v_right, step)
+
+    def _integrate(self, v_left, v_right, dt_us):
+        # Rotation : moitié avant, moitié après le déplacement (point milieu)
+        turn = _div_round((v_left - v_right) * dt_us, self._turn_div)
+        heading = (self.heading + (turn >> 1)) & HEADING_MASK
+
+        # Distance parcourue en µm : mm/s * µs / 1000
+        distance = _div_round((v_left + v_right) * dt_us, 2000)
+        self._move(distance, heading)
+        self.travel_um += distance
+        self.heading = (self.heading + turn) & HEADING_MASK
+
+    def _move(self, distance_um, heading):
+        index = heading >> SINE_SHIFT
+        sin = SINE_TABLE[index]
+        cos = SINE_TABLE[(index + QUARTER_TURN) & SINE_INDEX_MASK]
+        self.x_um += (distance_um * sin) >> SINE_Q
+        self.y_um += (distance_um * cos) >> SINE_Q
+
+    def fuse_ultrasonic(self, distance_cm):
+        """
+        Recale la distance parcourue sur le capteur ultrason
+
+        Quand le robot avance vers un obstacle fixe (servo au centre), la
+        diminution de la distance mesurée doit égaler la distance parcourue
+        par odométrie. L'écart corrige la position le long du cap. Les
+        écarts trop grands (obstacle qui change, rotation) sont ignorés et
+        la mesure sert de nouvelle référence.
+
+        Args:
+            distance_cm: Distance mesurée en cm (0 = pas d'écho)
+        """
+        if not distance_cm:
+            self._range_um = 0
+            return
+        range_um = distance_cm * 10000
+        if self._range_um:
+            measured = self._range_um - range_um
+            estimated = self.travel_um - self._range_travel_um
+            error = measured - estimated
+            if -self.range_gate_um <= error <= self.range_gate_um:
+                self._move((error * self.range_gain) >> 8, self.heading)
+        self._range_um = range_um
+        self._range_travel_um = self.travel_um
+
+    def x_mm(self):
+        """Position x en mm (vers la droite)"""
+        return self.x_um // 1000
+
+    def y_mm(self):
+        """Position y en mm (vers l'avant)"""
+        return self.y_um // 1000
+
+    def heading_deg(self):
+        """Cap en degrés, de -180 à 180 (positif vers la droite)"""
+        heading = self.heading
+        if heading >= HEADING_TURN >> 1:
+            heading -= HEADING_TURN
+        return heading * 360 / HEADING_TURN
+
+    def pose(self):
+        """Pose (x en mm, y en mm, cap en degrés)"""
+        return self.x_mm(), self.y_mm(), self.heading_deg()
+
+
+def _div_round(numerator, denominator):
+    """Division entière arrondie au plus proche (symétrique autour de 0)"""
+    if numerator < 0:
+        return -((-numerator + (denominator >> 1)) // denominator)
+    return (numerator + (denominator >> 1)) // denominator
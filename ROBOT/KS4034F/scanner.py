@@ -0,0 +1,202 @@
+"""
+Scanner ultrason asynchrone pour le robot KS4034F
+Le servo balaye en continu pendant que le capteur ultrason mesure par
+interruptions : la carte polaire des distances est mise à jour au fil de
+l'eau, sans arrêter le robot
+"""
+
+import asyncio
+from array import array
+from time import ticks_ms, ticks_diff
+
+
+class ServoScanner:
+    """
+    Balayage continu servo + ultrason
+
+    Le servo est commandé par petits pas (vitesse de balayage sweep_dps) et
+    sa position réelle est estimée par un modèle de vitesse maximale
+    (servo_dps). Chaque impulsion ultrason est associée à l'angle estimé au
+    moment de l'envoi, et la distance mesurée met à jour le secteur
+    correspondant de la carte polaire. Une impulsion sans écho (rien à
+    portée) enregistre la portée maximale : le secteur est dégagé.
+    """
+
+    # Période de mise à jour de la commande du servo (période PWM 50 Hz)
+    TICK_MS = 20
+
+    def __init__(self, robot, min_angle=-90, max_angle=90, bin_deg=10,
+                 sweep_dps=180, servo_dps=500, ping_period_ms=60, max_age_ms=2000):
+        """
+        Initialise le scanner
+
+        Args:
+            robot: Instance KS4034F
+            min_angle: Angle minimal du balayage en degrés
+            max_angle: Angle maximal du balayage en degrés
+            bin_deg: Largeur d'un secteur de la carte polaire en degrés
+            sweep_dps: Vitesse de balayage commandée en degrés/s
+            servo_dps: Vitesse maximale du servo en degrés/s (modèle)
+            ping_period_ms: Intervalle entre deux impulsions ultrason (min 60)
+            max_age_ms: Age au-delà duquel une mesure est considérée périmée
+        """
+        self.robot = robot
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.bin_deg = bin_deg
+        self.sweep_dps = sweep_dps
+        self.servo_dps = servo_dps
+        self.ping_period_ms = max(robot.ULTRASONIC_MIN_PERIOD_MS, ping_period_ms)
+        self.max_age_ms = max_age_ms
+        # Distance enregistrée quand aucun écho ne revient
+        self.max_range_cm = robot.ULTRASONIC_TIMEOUT_US // robot.ULTRASONIC_US_PER_CM
+
+        # Carte polaire : une distance (cm) et un horodatage par secteur
+        self.bin_count = (max_angle - min_angle) // bin_deg + 1
+        self.distances = array("H", [0] * self.bin_count)
+        self.timestamps = array("i", [0] * self.bin_count)
+
+        self.scan_count = 0
+        # Démarrer le balayage à une extrémité (servo supposé centré)
+        self._command = float(min_angle)
+        self._angle = 0.0
+        self._direction = 1
+        self._ping_bin = -1
+        self._echo_seen = True
+        self._scan_done = asyncio.Event()
+        self._running = False
+
+    def bin_angle(self, index):
+        """Angle central d'un secteur de la carte polaire"""
+        return self.min_angle + index * self.bin_deg
+
+    def _angle_bin(self, angle):
+        """Secteur correspondant à un angle"""
+        index = int((angle - self.min_angle) / self.bin_deg + 0.5)
+        return max(0, min(self.bin_count - 1, index))
+
+    def _on_distance(self, distance):
+        """Callback ultrason : met à jour le secteur visé lors de l'impulsion"""
+        index = self._ping_bin
+        if index < 0:
+            return
+        self._echo_seen = True
+        self.distances[index] = min(distance, 0xFFFF)
+        self.timestamps[index] = ticks_ms()
+
+    def _update_servo(self, dt_ms):
+        """
+        Avance la commande du servo et le modèle de position
+
+        Returns:
+            True quand une extrémité du balayage vient d'être atteinte
+        """
+        step = self.sweep_dps * dt_ms / 1000
+        command = self._command + self._direction * step
+        reached = False
+        if command >= self.max_angle:
+            command = self.max_angle
+            self._direction = -1
+            reached = True
+        elif command <= self.min_angle:
+            command = self.min_angle
+            self._direction = 1
+            reached = True
+        self._command = command
+        self.robot.set_servo_angle(int(command))
+
+        # Modèle : le servo rejoint la commande à sa vitesse maximale
+        max_step = self.servo_dps * dt_ms / 1000
+        error = command - self._angle
+        if error > max_step:
+            error = max_step
+        elif error < -max_step:
+            error = -max_step
+        self._angle += error
+        return reached
+
+    @property
+    def angle(self):
+        """Angle estimé du servo en degrés"""
+        return self._angle
+
+    async def run(self):
+        """
+        Tâche de balayage continu
+
+        A lancer avec asyncio.create_task(scanner.run()).
+        """
+        robot = self.robot
+        robot.init_servo()
+        robot.start_ranging(self._on_distance)
+        self._running = True
+        last_tick = ticks_ms()
+        last_ping = last_tick
+        try:
+            while self._running:
+                await asyncio.sleep_ms(self.TICK_MS)
+                now = ticks_ms()
+                if self._update_servo(ticks_diff(now, last_tick)):
+                    # Un passage complet vient de se terminer
+                    self.scan_count += 1
+                    self._scan_done.set()
+                last_tick = now
+
+                if ticks_diff(now, last_ping) >= self.ping_period_ms:
+                    if not self._echo_seen and self._ping_bin >= 0:
+                        # Pas d'écho pour l'impulsion précédente : rien à portée
+                        self.distances[self._ping_bin] = self.max_range_cm
+                        self.timestamps[self._ping_bin] = now
+                    self._echo_seen = False
+                    self._ping_bin = self._angle_bin(self._angle)
+                    robot.ping()
+                    last_ping = now
+        finally:
+            robot.stop_ranging()
+            self._running = False
+
+    def stop(self):
+        """Arrête le balayage à la fin de l'itération en cours"""
+        self._running = False
+
+    async def wait_scan(self):
+        """Attend la fin du prochain passage complet du servo"""
+        self._scan_done.clear()
+        await self._scan_done.wait()
+
+    def is_fresh(self, index):
+        """Indique si la mesure d'un secteur est récente"""
+        return (self.timestamps[index] != 0
+                and ticks_diff(ticks_ms(), self.timestamps[index]) <= self.max_age_ms)
+
+    def best_direction(self):
+        """
+        Direction la plus dégagée parmi les mesures récentes
+
+        Returns:
+            (angle, distance), ou (0, max_range_cm) si aucune mesure n'est
+            récente : sans information, la voie est considérée dégagée
+        """
+        best_index = -1
+        best_distance = 0
+        for i in range(self.bin_count):
+            if self.is_fresh(i) and self.distances[i] > best_distance:
+                best_distance = self.distances[i]
+                best_index = i
+        if best_index < 0:
+            return 0, self.max_range_cm
+        return self.bin_angle(best_index), best_distance
+
+    def min_distance(self, from_angle, to_angle):
+        """
+        Distance minimale mesurée récemment dans un secteur angulaire
+
+        Returns:
+            Distance en cm, ou 0 si aucune mesure récente dans ce secteur
+        """
+        result = 0
+        for i in range(self._angle_bin(from_angle), self._angle_bin(to_angle) + 1):
+            distance = self.distances[i]
+            if distance and self.is_fresh(i) and (result == 0 or distance < result):
+                result = distance
+        return result
@@ -0,0 +1,151 @@
+"""
+Mesures de performance de ks4034f.py sur le simulateur
+
+Compte les transactions I2C, les octets et le temps de bus par itération
+de boucle de contrôle, ainsi que le temps CPU bloqué par le capteur
+ultrason. Avec --check, le script échoue (code de sortie 1) si un budget
+est dépassé : utilisable en intégration continue.
+
+    python3 ROBOT/KS4034F/sim/bench.py [--check]
+"""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.dirname(HERE))
+
+import simulator  # noqa: E402  (doit précéder ks4034f)
+from simulator import SIM  # noqa: E402
+from time import sleep_ms, ticks_us, ticks_diff  # noqa: E402
+from ks4034f import KS4034F, LedCount, LedState, LineTrackingSensor  # noqa: E402
+from line_follower import LineFollower  # noqa: E402
+
+ITERATIONS = 200
+
+# Budgets vérifiés avec --check : (mesure, maximum)
+BUDGETS = {
+    "steady_forward": ("tx_per_iter", 0.05),
+    "line_follower_pid": ("tx_per_iter", 1.0),
+    "ultrasonic_ping": ("blocked_us", 100),
+}
+
+
+def line_loop_body(robot):
+    """Corps de boucle de example_line_follower.py (cas « tout droit »)"""
+    robot.read_line_sensor(LineTrackingSensor.LEFT)
+    robot.read_line_sensor(LineTrackingSensor.CENTER)
+    robot.read_line_sensor(LineTrackingSensor.RIGHT)
+    robot.move_forward(30)
+    robot.set_led(LedCount.LEFT, LedState.OFF)
+    robot.set_led(LedCount.RIGHT, LedState.OFF)
+
+
+def bench_legacy_forward():
+    """Boucle tout droit sans cache ni rafale (comportement d'origine)"""
+    SIM.reset()
+    robot = KS4034F(i2c_burst=False)
+    for _ in range(ITERATIONS):
+        robot.invalidate()
+        line_loop_body(robot)
+    return loop_result(ITERATIONS)
+
+
+def bench_steady_forward():
+    """Boucle tout droit avec trame groupée et registres fantômes"""
+    SIM.reset()
+    robot = KS4034F(i2c_burst=True)
+    for _ in range(ITERATIONS):
+        line_loop_body(robot)
+    return loop_result(ITERATIONS)
+
+
+def bench_line_follower_pid():
+    """Suivi de ligne PID à 200 Hz sur une ligne qui ondule"""
+    SIM.reset()
+
+    def wavy_line(sim):
+        # La ligne passe d'un capteur à l'autre toutes les 150 ms
+        phase = (sim.clock_us // 150000) % 4
+        return ((1, 0, 1), (0, 1, 1), (1, 0, 1), (1, 1, 0))[phase]
+
+    SIM.line_fn = wavy_line
+    robot = KS4034F(i2c_burst=True)
+    follower = LineFollower(robot, rate_hz=200)
+    follower.start()
+    sleep_ms(2000)
+    follower.stop()
+    result = loop_result(follower.iterations)
+    stats = follower.stats()
+    result["hz"] = round(stats["hz"], 1)
+    result["max_jitter_us"] = stats["max_jitter_us"]
+    return result
+
+
+def bench_ultrasonic_blocking():
+    """Temps CPU bloqué par read_ultrasonic() à 100 cm"""
+    SIM.reset()
+    SIM.distance_cm = 100
+    robot = KS4034F()
+    start = SIM.clock_us
+    distance = robot.read_ultrasonic()
+    return {"blocked_us": SIM.clock_us - start, "distance": distance}
+
+
+def bench_ultrasonic_ping():
+    """Temps CPU bloqué par ping() en mode interruptions à 100 cm"""
+    SIM.reset()
+    SIM.distance_cm = 100
+    robot = KS4034F()
+    robot.start_ranging()
+    start = ticks_us()
+    robot.ping()
+    blocked = ticks_diff(ticks_us(), start)
+    sleep_ms(20)
+    return {"blocked_us": blocked, "distance": robot.last_distance}
+
+
+def loop_result(iterations):
+    count, nbytes, bus_us = SIM.bus_stats()
+    iterations = max(1, iterations)
+    return {
+        "iterations": iterations,
+        "tx_per_iter": round(count / iterations, 3),
+        "bytes_per_iter": round(nbytes / iterations, 2),
+        "bus_us_per_iter": round(bus_us / iterations, 1),
+    }
+
+
+BENCHMARKS = (
+    ("legacy_forward", bench_legacy_forward),
+    ("steady_forward", bench_steady_forward),
+    ("line_follower_pid", bench_line_follower_pid),
+    ("ultrasonic_blocking", bench_ultrasonic_blocking),
+    ("ultrasonic_ping", bench_ultrasonic_ping),
+)
+
+
+def main(argv):
+    check = "--check" in argv
+    failures = []
+    for name, bench in BENCHMARKS:
+        result = bench()
+        details = ", ".join(f"{key}={value}" for key, value in result.items())
+        print(f"{name:20s} {details}")
+        if name in BUDGETS:
+            key, limit = BUDGETS[name]
+            if result[key] > limit:
+                failures.append(f"{name}: {key}={result[key]} > {limit}")
+
+    if failures:
+        print("\nBudgets dépassés :")
+        for failure in failures:
+            print(f"  {failure}")
+        if check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,525 @@
+"""
+Simulateur du robot KS4034F pour PC (CPython 3)
+
+Importer ce module AVANT ks4034f : il installe des remplaçants des modules
+machine, pyb et micropython, ajoute à time les fonctions MicroPython
+(sleep_us, ticks_us, ...) et fait tourner tout le code sur une horloge
+virtuelle. Chaque transaction I2C est enregistrée avec son horodatage, et
+le contrôleur STC15, les moteurs, le servo, le capteur ultrason et les
+capteurs de ligne sont modélisés.
+
+    import simulator
+    from ks4034f import KS4034F
+
+    sim = simulator.SIM
+    robot = KS4034F()
+    robot.move_forward(50)
+    print(sim.transactions, sim.motor_speeds())
+"""
+
+import asyncio as _asyncio
+import math
+import sys
+import time as _time
+
+
+class Transaction:
+    """Transaction I2C enregistrée"""
+
+    __slots__ = ("t_us", "addr", "kind", "reg", "data", "duration_us")
+
+    def __init__(self, t_us, addr, kind, reg, data, duration_us):
+        self.t_us = t_us
+        self.addr = addr
+        self.kind = kind        # "write" ou "read"
+        self.reg = reg          # None pour writeto()
+        self.data = data
+        self.duration_us = duration_us
+
+    def __repr__(self):
+        reg = "--" if self.reg is None else f"{self.reg:02X}"
+        return (f"<{self.t_us:>10}us {self.kind} @{self.addr:02X} reg {reg} "
+                f"{bytes(self.data).hex()} ({self.duration_us}us)>")
+
+
+class STC15:
+    """Contrôleur moteurs/LEDs du KS4034F : registres avec auto-incrément"""
+
+    def __init__(self):
+        self.regs = bytearray(256)
+
+    def write(self, reg, data):
+        for i, value in enumerate(data):
+            self.regs[(reg + i) & 0xFF] = value
+
+    def read(self, reg, count):
+        return bytes(self.regs[(reg + i) & 0xFF] for i in range(count))
+
+
+class Simulator:
+    """
+    Horloge virtuelle et modèle du robot
+
+    Attributs modifiables par les scénarios :
+        distance_cm: Distance vue par le capteur ultrason (0 = pas d'écho)
+        distance_fn: Fonction (sim) -> distance, prioritaire si définie
+        line: Etat des capteurs (gauche, centre, droite), 0 = ligne noire
+        line_fn: Fonction (sim) -> (gauche, centre, droite), prioritaire
+        call_cost_us: Temps CPU simulé par appel à ticks_us()/Pin.value()
+    """
+
+    # Pins par défaut du KS4034F
+    TRIG_PIN = "P15"
+    ECHO_PIN = "P16"
+    LINE_PINS = ("P3", "P4", "P10")
+
+    # Pins PWM disponibles : pin -> {(timer, canal)}
+    PWM_PINS = {
+        "P0": {(2, 1)},
+        "P1": {(2, 2)},
+        "P2": {(2, 3)},
+        "P11": {(1, 1)},
+    }
+    # Timers matériels du STM32WB55
+    HW_TIMERS = (1, 2, 16, 17)
+
+    # Délai entre la fin du trigger et le début de l'écho (HC-SR04)
+    ECHO_DELAY_US = 450
+    # Surcoût d'une transaction I2C (start, stop, traitement)
+    I2C_OVERHEAD_US = 10
+
+    # Modèle cinématique : vitesse d'une roue à 100 % et voie du robot
+    WHEEL_SPEED_CM_S = 60.0
+    TRACK_WIDTH_CM = 15.0
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Remet le simulateur dans son état initial"""
+        self.clock_us = 0
+        self.call_cost_us = 1
+        self.transactions = []
+        self.devices = {0x30: STC15()}
+        self.fail_next_i2c = 0
+
+        self.pins = {}
+        self.distance_cm = 100
+        self.distance_fn = None
+        self.line = [1, 1, 1]
+        self.line_fn = None
+        self.servo_angle = 0.0
+
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+
+        self._echo_rise = None
+        self._echo_fall = None
+        self._events = []
+        self._soft_timers = []
+        self._scheduled = []
+        self._wakeups = []
+        self._advancing = False
+
+    # Horloge virtuelle
+
+    def now_us(self):
+        return self.clock_us
+
+    def advance(self, us):
+        """Fait avancer l'horloge virtuelle de us microsecondes"""
+        self.advance_to(self.clock_us + max(0, int(us)))
+
+    def advance_to(self, target_us):
+        """
+        Fait avancer l'horloge jusqu'à target_us en déclenchant, dans
+        l'ordre, les fronts d'écho et les timers logiciels échus
+        """
+        if self._advancing:
+            # Appel imbriqué (depuis un callback) : avancer sans redéclencher
+            self._move_clock(target_us)
+            return
+        self._advancing = True
+        try:
+            while True:
+                due = self._next_due(target_us)
+                if due is None:
+                    break
+                self._move_clock(due)
+                self._fire_due()
+            self._move_clock(target_us)
+            self._run_scheduled()
+        finally:
+            self._advancing = False
+
+    def _move_clock(self, target_us):
+        if target_us > self.clock_us:
+            self._integrate_pose(target_us - self.clock_us)
+            self.clock_us = target_us
+
+    def _next_due(self, limit_us):
+        due = None
+        for t, _, _ in self._events:
+            if t <= limit_us and (due is None or t < due):
+                due = t
+        for entry in self._soft_timers:
+            t = entry[0]
+            if t <= limit_us and (due is None or t < due):
+                due = t
+        return due
+
+    def _fire_due(self):
+        now = self.clock_us
+        events = [e for e in self._events if e[0] <= now]
+        self._events = [e for e in self._events if e[0] > now]
+        for _, pin, value in events:
+            pin._edge(value)
+        self._run_scheduled()
+        for entry in list(self._soft_timers):
+            if entry[0] <= now and entry in self._soft_timers:
+                timer = entry[2]
+                if timer._periodic:
+                    entry[0] += timer._period_us
+                else:
+                    self._soft_timers.remove(entry)
+                timer._callback(timer)
+                self._run_scheduled()
+
+    def _run_scheduled(self):
+        while self._scheduled:
+            func, arg = self._scheduled.pop(0)
+            func(arg)
+
+    def cpu(self):
+        """Temps CPU simulé d'un appel (évite les boucles infinies)"""
+        if self.call_cost_us:
+            self.advance(self.call_cost_us)
+
+    # Bus I2C
+
+    def i2c_transfer(self, freq, addr, kind, reg, data):
+        nbytes = 1 + (0 if reg is None else 1) + len(data)
+        duration = int(nbytes * 9 * 1000000 / freq) + self.I2C_OVERHEAD_US
+        start = self.clock_us
+        self.advance(duration)
+        if self.fail_next_i2c:
+            self.fail_next_i2c -= 1
+            raise OSError(5)  # EIO
+        device = self.devices.get(addr)
+        if device is None:
+            raise OSError(19)  # ENODEV
+        self.transactions.append(Transaction(start, addr, kind, reg, bytes(data), duration))
+        if kind == "write":
+            device.write(0 if reg is None else reg, data)
+
+    def bus_stats(self, since=0):
+        """
+        Statistiques des transactions enregistrées depuis l'indice since
+
+        Returns:
+            (nombre de transactions, octets de données, temps de bus en µs)
+        """
+        txs = self.transactions[since:]
+        return len(txs), sum(len(t.data) for t in txs), sum(t.duration_us for t in txs)
+
+    # Modèle des moteurs
+
+    def motor_speeds(self):
+        """
+        Vitesses signées des moteurs en % d'après les registres du STC15
+
+        Returns:
+            (avant-gauche, arrière-gauche, avant-droit, arrière-droit)
+        """
+        regs = self.devices[0x30].regs
+
+        def right(reg_a):
+            return (regs[reg_a] - regs[reg_a + 1]) * 100 / 255
+
+        def left(reg_a):
+            return (regs[reg_a + 1] - regs[reg_a]) * 100 / 255
+
+        return left(0x03), left(0x07), right(0x01), right(0x05)
+
+    def leds(self):
+        """Etat des LEDs (gauche, droite) d'après les registres du STC15"""
+        regs = self.devices[0x30].regs
+        return regs[0x09] != 0, regs[0x0A] != 0
+
+    def _integrate_pose(self, dt_us):
+        ul, ll, ur, lr = self.motor_speeds()
+        v_left = (ul + ll) / 200 * self.WHEEL_SPEED_CM_S
+        v_right = (ur + lr) / 200 * self.WHEEL_SPEED_CM_S
+        if v_left == 0 and v_right == 0:
+            return
+        dt = dt_us / 1000000
+        v = (v_left + v_right) / 2
+        self.heading += (v_left - v_right) / self.TRACK_WIDTH_CM * dt
+        self.x += v * math.sin(self.heading) * dt
+        self.y += v * math.cos(self.heading) * dt
+
+    # Capteurs
+
+    def current_distance(self):
+        if self.distance_fn is not None:
+            return self.distance_fn(self)
+        return self.distance_cm
+
+    def line_value(self, index):
+        values = self.line_fn(self) if self.line_fn is not None else self.line
+        return values[index]
+
+    def trigger(self):
+        """Front descendant du trigger : programmer l'écho"""
+        distance = self.current_distance()
+        if not distance or distance > 400:
+            self._echo_rise = None
+            self._echo_fall = None
+            return
+        rise = self.clock_us + self.ECHO_DELAY_US
+        fall = rise + int(distance * 58)
+        self._echo_rise = rise
+        self._echo_fall = fall
+        echo = self.pins.get(self.ECHO_PIN)
+        if echo is not None and echo._handler is not None:
+            self._events.append((rise, echo, 1))
+            self._events.append((fall, echo, 0))
+
+    def echo_value(self):
+        now = self.clock_us
+        if self._echo_rise is None or now < self._echo_rise or now >= self._echo_fall:
+            return 0
+        return 1
+
+
+SIM = Simulator()
+
+
+# Remplaçants des modules MicroPython
+
+class Pin:
+    """Remplaçant de pyb.Pin / machine.Pin"""
+
+    IN = 0
+    OUT = 1
+    OUT_PP = 1
+    OUT_OD = 2
+    AF_PP = 3
+    PULL_NONE = None
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, name, mode=IN, pull=None, value=None):
+        self.name = name
+        self.mode = mode
+        self._value = 0 if value is None else value
+        self._handler = None
+        self._trigger = 0
+        SIM.pins[name] = self
+
+    def value(self, v=None):
+        if v is None:
+            SIM.cpu()
+            if self.name == SIM.ECHO_PIN:
+                return SIM.echo_value()
+            if self.name in SIM.LINE_PINS:
+                return SIM.line_value(SIM.LINE_PINS.index(self.name))
+            return self._value
+        previous = self._value
+        self._value = 1 if v else 0
+        if self.name == SIM.TRIG_PIN and previous and not self._value:
+            SIM.trigger()
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    def _edge(self, value):
+        if self._handler is None:
+            return
+        if (value and self._trigger & self.IRQ_RISING) or (not value and self._trigger & self.IRQ_FALLING):
+            self._handler(self)
+
+
+class I2C:
+    """Remplaçant de machine.I2C : enregistre chaque transaction"""
+
+    def __init__(self, id=None, freq=400000, **kwargs):
+        self.id = id
+        self.freq = freq
+
+    def writeto(self, addr, buf, stop=True):
+        SIM.i2c_transfer(self.freq, addr, "write", None, buf)
+        return len(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        SIM.i2c_transfer(self.freq, addr, "write", memaddr, buf)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        data = SIM.devices[addr].read(memaddr, nbytes) if addr in SIM.devices else b""
+        SIM.i2c_transfer(self.freq, addr, "read", memaddr, data)
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf))
+
+    def scan(self):
+        return sorted(SIM.devices)
+
+
+class _PWMChannel:
+    def __init__(self, pin):
+        self.pin = pin
+        self.percent = 0
+
+    def pulse_width_percent(self, percent=None):
+        if percent is None:
+            return self.percent
+        self.percent = percent
+        # 50 Hz : 1 ms (-90°) à 2 ms (+90°)
+        pulse_ms = percent / 100 * 20
+        SIM.servo_angle = (pulse_ms - 1.5) / 0.5 * 90
+
+
+class PybTimer:
+    """Remplaçant de pyb.Timer (PWM uniquement)"""
+
+    PWM = 0
+
+    def __init__(self, id, freq=None, **kwargs):
+        if id not in SIM.HW_TIMERS:
+            raise ValueError(f"Timer({id}) doesn't exist")
+        self.id = id
+        self.freq = freq
+
+    def channel(self, channel, mode=None, pin=None, **kwargs):
+        name = pin.name if pin is not None else None
+        if (self.id, channel) not in SIM.PWM_PINS.get(name, ()):
+            raise ValueError("pin has no timer function")
+        return _PWMChannel(pin)
+
+    def deinit(self):
+        pass
+
+
+class MachineTimer:
+    """Remplaçant de machine.Timer (timer logiciel, callback hors IRQ)"""
+
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._entry = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=None, freq=None, callback=None):
+        self.deinit()
+        if freq is not None:
+            period_us = int(1000000 / freq)
+        else:
+            period_us = int(period * 1000)
+        self._period_us = max(1, period_us)
+        self._periodic = mode == self.PERIODIC
+        self._callback = callback
+        self._entry = [SIM.clock_us + self._period_us, self._period_us, self]
+        SIM._soft_timers.append(self._entry)
+
+    def deinit(self):
+        if self._entry is not None and self._entry in SIM._soft_timers:
+            SIM._soft_timers.remove(self._entry)
+        self._entry = None
+
+
+def _schedule(func, arg):
+    SIM._scheduled.append((func, arg))
+
+
+def _const(value):
+    return value
+
+
+def _make_module(name, **attrs):
+    module = type(sys)(name)
+    for key, value in attrs.items():
+        setattr(module, key, value)
+    return module
+
+
+# Fonctions de time façon MicroPython, sur l'horloge virtuelle
+
+def ticks_us():
+    SIM.cpu()
+    return SIM.clock_us
+
+
+def ticks_ms():
+    SIM.cpu()
+    return SIM.clock_us // 1000
+
+
+def ticks_diff(end, start):
+    return end - start
+
+
+def ticks_add(ticks, delta):
+    return ticks + delta
+
+
+def sleep_us(us):
+    SIM.advance(us)
+
+
+def sleep_ms(ms):
+    SIM.advance(ms * 1000)
+
+
+def sleep(seconds):
+    SIM.advance(seconds * 1000000)
+
+
+async def async_sleep_ms(ms):
+    """
+    asyncio.sleep_ms sur l'horloge virtuelle
+
+    Chaque tâche cède la main ; quand toutes attendent, l'horloge saute
+    directement au réveil le plus proche.
+    """
+    target = SIM.clock_us + int(ms * 1000)
+    SIM._wakeups.append(target)
+    try:
+        await _asyncio.sleep(0)
+        while SIM.clock_us < target:
+            if target <= min(SIM._wakeups):
+                SIM.advance_to(target)
+            else:
+                await _asyncio.sleep(0)
+    finally:
+        SIM._wakeups.remove(target)
+
+
+def install():
+    """Installe les remplaçants (appelé automatiquement à l'import)"""
+    sys.modules["machine"] = _make_module(
+        "machine", I2C=I2C, Pin=Pin, Timer=MachineTimer)
+    sys.modules["pyb"] = _make_module("pyb", Pin=Pin, Timer=PybTimer)
+    sys.modules["micropython"] = _make_module(
+        "micropython", schedule=_schedule, const=_const)
+    for name, func in (("ticks_us", ticks_us), ("ticks_ms", ticks_ms),
+                       ("ticks_diff", ticks_diff), ("ticks_add", ticks_add),
+                       ("sleep_us", sleep_us), ("sleep_ms", sleep_ms),
+                       ("sleep", sleep)):
+        setattr(_time, name, func)
+    _asyncio.sleep_ms = async_sleep_ms
+
+
+install()
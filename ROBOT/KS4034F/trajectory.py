@@ -0,0 +1,152 @@
+"""
+Moteur de trajectoires pour le robot KS4034F
+Les mouvements sont mis en file d'attente et exécutés depuis un timer avec
+des rampes d'accélération : l'appelant n'est jamais bloqué
+"""
+
+import asyncio
+from machine import Timer
+from time import ticks_ms, ticks_diff
+
+
+class TrajectoryEngine:
+    """
+    Exécute une file de segments de mouvement avec rampes
+
+    Un segment est défini par les vitesses cibles des côtés gauche et droit
+    (-100 à 100), une durée et une accélération. A chaque période du timer,
+    les vitesses se rapprochent de la cible à l'accélération demandée. Quand
+    la file est vide, le robot décélère jusqu'à l'arrêt.
+    """
+
+    def __init__(self, robot, period_ms=20, accel=200):
+        """
+        Initialise le moteur de trajectoires
+
+        Args:
+            robot: Instance KS4034F
+            period_ms: Période de mise à jour des vitesses en ms
+            accel: Accélération par défaut en %/s (vitesse gagnée par seconde)
+        """
+        self.robot = robot
+        self.period_ms = period_ms
+        self.accel = accel
+
+        self.left = 0.0
+        self.right = 0.0
+        self._segments = []
+        self._current = None
+        self._segment_start = 0
+        self._last_tick = 0
+        self._timer = None
+
+    def queue(self, left, right, duration_ms, accel=None):
+        """
+        Ajoute un segment à la file et retourne immédiatement
+
+        Args:
+            left: Vitesse cible des moteurs gauches (-100 à 100)
+            right: Vitesse cible des moteurs droits (-100 à 100)
+            duration_ms: Durée du segment en ms, rampe comprise
+            accel: Accélération en %/s (par défaut celle du moteur)
+        """
+        if accel is None:
+            accel = self.accel
+        self._segments.append((left, right, duration_ms, accel))
+        self.start()
+
+    def forward(self, speed, duration_ms, accel=None):
+        """Avance à la vitesse donnée pendant duration_ms"""
+        self.queue(speed, speed, duration_ms, accel)
+
+    def backward(self, speed, duration_ms, accel=None):
+        """Recule à la vitesse donnée pendant duration_ms"""
+        self.queue(-speed, -speed, duration_ms, accel)
+
+    def turn_left(self, speed, duration_ms, accel=None):
+        """Tourne à gauche sur place pendant duration_ms"""
+        self.queue(-speed, speed, duration_ms, accel)
+
+    def turn_right(self, speed, duration_ms, accel=None):
+        """Tourne à droite sur place pendant duration_ms"""
+        self.queue(speed, -speed, duration_ms, accel)
+
+    def pause(self, duration_ms, accel=None):
+        """Décélère jusqu'à l'arrêt et reste arrêté pendant duration_ms"""
+        self.queue(0, 0, duration_ms, accel)
+
+    def busy(self):
+        """Indique si des segments sont en cours, en attente ou en décélération"""
+        return self._timer is not None
+
+    async def wait(self):
+        """Attend la fin de tous les segments en file et l'arrêt du robot"""
+        while self.busy():
+            await asyncio.sleep_ms(self.period_ms)
+
+    def clear(self):
+        """Vide la file : le robot décélère jusqu'à l'arrêt"""
+        self._segments.clear()
+        self._current = None
+
+    def start(self):
+        """Démarre le timer d'exécution (appelé automatiquement par queue)"""
+        if self._timer is not None:
+            return
+        self._last_tick = ticks_ms()
+        self._timer = Timer(-1, mode=Timer.PERIODIC, period=self.period_ms,
+                            callback=self._timer_callback)
+
+    def stop(self):
+        """Arrêt immédiat : vide la file, arrête le timer et les moteurs"""
+        self.clear()
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        self.left = 0.0
+        self.right = 0.0
+        self.robot.stop()
+
+    @staticmethod
+    def _ramp(current, target, max_step):
+        """Rapproche current de target d'au plus max_step"""
+        if target > current + max_step:
+            return current + max_step
+        if target < current - max_step:
+            return current - max_step
+        return target
+
+    def _timer_callback(self, timer):
+        """
+        Mise à jour périodique des vitesses
+
+        Le timer logiciel exécute ce callback hors interruption : les
+        écritures I2C y sont autorisées.
+        """
+        now = ticks_ms()
+        dt_ms = ticks_diff(now, self._last_tick)
+        self._last_tick = now
+
+        # Passer au segment suivant quand le segment courant est terminé
+        current = self._current
+        if current is not None and ticks_diff(now, self._segment_start) >= current[2]:
+            current = None
+        if current is None and self._segments:
+            current = self._segments.pop(0)
+            self._segment_start = now
+        self._current = current
+
+        if current is None:
+            target_left, target_right, accel = 0, 0, self.accel
+        else:
+            target_left, target_right, _, accel = current
+
+        max_step = accel * dt_ms / 1000
+        self.left = self._ramp(self.left, target_left, max_step)
+        self.right = self._ramp(self.right, target_right, max_step)
+        self.robot.drive(self.left, self.right)
+
+        # File vide et robot arrêté : libérer le timer
+        if current is None and self.left == 0 and self.right == 0:
+            timer.deinit()
+            self._timer = None
@@ -2,8 +2,9 @@ import bluetooth
 import uasyncio as asyncio
 import aioble
 import struct
-from time import ticks_ms
 from pins import *
+from ble_advertising import extract_manufacturer_data
+from neighbor_table import NeighborTable
 
 ble = bluetooth.BLE()
 ble.active(True)
@@ -14,31 +15,10 @@ print("Device name:", device_name)
 SCAN_DURATION = 500
 ADV_TIMEOUT = 500
 
-devices_distances = {}
+devices_distances = NeighborTable(capacity=16, max_age_ms=30000)  # Voisins récents : nom -> distance
 forwarded_presence = None
 energy_current = 0  # en mA
 
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0:
-            break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
-
 def text_x_center(text):
     return max((128 - len(text) * 8) // 2, 0)
 
@@ -54,7 +34,7 @@ async def ble_task():
                     man_data = extract_manufacturer_data(result.adv_data)
                     if man_data and len(man_data) == 2:
                         distance, = struct.unpack("h", man_data)
-                        devices_distances[name] = (distance, ticks_ms())
+                        devices_distances.update(name, distance)
                         print(f"Received from {name}: {distance} cm")
                     if man_data and len(man_data) == 1 and name.startswith("STeaMi-R"):
                         forwarded_presence = man_data
@@ -85,14 +65,8 @@ async def display_task():
         display.fill(0)
         display.text(device_name, text_x_center(device_name), 10, 255)
 
-        recent_devices = sorted(
-            devices_distances.items(),
-            key=lambda item: item[1][1],
-            reverse=True
-        )[:3]
-
         y = 30
-        for name, (dist, _) in recent_devices:
+        for name, dist in devices_distances.recent(3):
             display.text(f"{name[-4:]}: {dist}", text_x_center("XXXX: XXX"), y, 255)
             y += 10
 
@@ -1,91 +1,65 @@
-import bluetooth
 import uasyncio as asyncio
-import aioble
 import struct
-from time import ticks_ms
 from pins import *
-
-ble = bluetooth.BLE()
-ble.active(True)
+from ble_advertising import AdvParser, advertising_payload
+from radio_scheduler import RadioScheduler
+from neighbor_table import NeighborTable
 
 device_name = f"STeaMi-R"
 print("Device name:", device_name)
 
-SCAN_DURATION = 500
-ADV_TIMEOUT = 500
+ADV_TIMEOUT = 500     # Durée d'allumage de la LED après un relais (ms)
+FORWARD_CYCLES = 2    # Nombre de cycles radio d'annonce de la commande
 
-devices_distances = {}
+devices_distances = NeighborTable(capacity=16, max_age_ms=30000)  # Voisins récents : nom -> distance
 energy_current = 0
 forwarded_distance = None
+forward_event = asyncio.Event()
 
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0:
-            break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
+# La radio scanne en continu et annonce pendant le scan
+radio = RadioScheduler(name_prefix=b"STeaMi")
 
 def text_x_center(text):
     return max((128 - len(text) * 8) // 2, 0)
 
 async def ble_task():
     global forwarded_distance
+    parser = AdvParser()
+    own_name = device_name.encode()
     while True:
-        print("BLE Task: Starting scan...")
-        async with aioble.scan(SCAN_DURATION, interval_us=30000, window_us=30000, active=True) as scanner:
-            print("BLE Task: Scanning...")
-            async for result in scanner:
-                name = result.name()
-                if name and name.startswith("STeaMi") and name != device_name:
-                    man_data = extract_manufacturer_data(result.adv_data)
-                    if man_data and len(man_data) == 2:
-                        distance, = struct.unpack("h", man_data)
-                        devices_distances[name] = (distance, ticks_ms())
-                        print(f"Received from {name}: {distance} cm")
-                        if name.startswith("STeaMi-S"):
-                            forwarded_distance = distance
-
-        await asyncio.sleep_ms(SCAN_DURATION + 50)
-
-        print("BLE Task: Advertising...")
-        if forwarded_distance is not None:
-            if forwarded_distance > 300:
-                man_data = struct.pack("b", 0)
-                LED_RED.on()
-            else:
-                man_data = struct.pack("b", 1)
-                LED_GREEN.on()
-            adv_payload = advertising_payload(name=device_name, manufacturer_data=man_data)
-            try:
-                await aioble.advertise(
-                    interval_us=150_000,
-                    adv_data=adv_payload,
-                    connectable=False,
-                    timeout_ms=ADV_TIMEOUT
-                )
-                print("Advertisement done.")
-            except asyncio.TimeoutError:
-                print("Advertisement timeout (non-connectable).")
-                pass
-            finally:
-                LED_RED.off()
-                LED_GREEN.off()
-                forwarded_distance = None
-            await asyncio.sleep_ms(200)
+        adv_data = await radio.receive()
+        if not parser.parse(adv_data) or parser.name_equals(own_name):
+            continue
+        man_data = parser.manufacturer_data()
+        if man_data and len(man_data) == 2:
+            name = parser.name()
+            distance, = struct.unpack("h", man_data)
+            devices_distances.update(name, distance)
+            print(f"Received from {name}: {distance} cm")
+            if name.startswith("STeaMi-S"):
+                forwarded_distance = distance
+                forward_event.set()
+
+async def forward_task():
+    global forwarded_distance
+    while True:
+        await forward_event.wait()
+        forward_event.clear()
+        if forwarded_distance is None:
+            continue
+        if forwarded_distance > 300:
+            man_data = struct.pack("b", 0)
+            LED_RED.on()
+        else:
+            man_data = struct.pack("b", 1)
+            LED_GREEN.on()
+        forwarded_distance = None
+        # Annonce immédiate : le scan continue pendant l'émission, et la
+        # nouvelle commande remplace celle encore en attente
+        radio.send(advertising_payload(name=device_name, manufacturer_data=man_data), FORWARD_CYCLES, replace=True)
+        await asyncio.sleep_ms(ADV_TIMEOUT)
+        LED_RED.off()
+        LED_GREEN.off()
 
 async def energy_task():
     global energy_current
@@ -98,14 +72,8 @@ async def display_task():
         display.fill(0)
         display.text(device_name, text_x_center(device_name), 10, 255)
 
-        recent_devices = sorted(
-            devices_distances.items(),
-            key=lambda item: item[1][1],
-            reverse=True
-        )[:3]
-
         y = 30
-        for name, (dist, _) in recent_devices:
+        for name, dist in devices_distances.recent(3):
             display.text(f"{name[-4:]}: {dist}", text_x_center("XXXX: XXX"), y, 255)
             y += 10
 
@@ -115,7 +83,9 @@ async def display_task():
 
 async def main():
     await asyncio.gather(
+        radio.run(),
         ble_task(),
+        forward_task(),
         display_task(),
         energy_task()
     )
@@ -4,6 +4,7 @@ import aioble
 import struct
 from time import ticks_ms, ticks_diff
 from pins import *  # Assure-toi que DISTANCE, display et fg sont définis ici
+from ble_advertising import advertising_payload
 
 ble = bluetooth.BLE()
 ble.active(True)
@@ -19,15 +20,6 @@ local_distance = 0
 devices_distances = {}
 energy_current = 0  # courant moyen en mA
 
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
 def text_x_center(text):
     return max((128 - len(text) * 8) // 2, 0)
 
@@ -2,8 +2,9 @@ import bluetooth
 import uasyncio as asyncio
 import aioble
 import struct
-from time import ticks_ms
 from pins import *
+from ble_advertising import extract_manufacturer_data
+from neighbor_table import NeighborTable
 
 ble = bluetooth.BLE()
 ble.active(True)
@@ -14,30 +15,10 @@ print("Device name:", device_name)
 SCAN_DURATION = 500
 ADV_TIMEOUT = 500
 
-devices_distances = {}
+devices_distances = NeighborTable(capacity=16, max_age_ms=30000)  # Voisins récents : nom -> distance
 forwarded_presence = None
 energy_current = 0
 
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0:
-            break
-        if adv_bytes[i + 1] == 0xFF:
-            return adv_bytes[i + 2:i + 1 + length]
-        i += 1 + length
-    return None
-
 def text_x_center(text):
     return max((128 - len(text) * 8) // 2, 0)
 
@@ -53,11 +34,11 @@ async def ble_task():
                     man_data = extract_manufacturer_data(result.adv_data)
                     if man_data and len(man_data) == 2:
                         distance, = struct.unpack("h", man_data)
-                        devices_distances[name] = (distance, ticks_ms())
+                        devices_distances.update(name, distance)
                         print(f"Received from {name}: {distance} cm")
                     elif man_data and len(man_data) == 1 and name.startswith("STeaMi-R2"):
                         forwarded_presence, = struct.unpack("b", man_data)
-                        devices_distances[name] = (forwarded_presence, ticks_ms())
+                        devices_distances.update(name, forwarded_presence)
 
         await asyncio.sleep_ms(SCAN_DURATION + 50)
 
@@ -90,9 +71,8 @@ async def display_task():
     while True:
         display.fill(0)
         display.text(device_name, text_x_center(device_name), 10, 255)
-        recent_devices = sorted(devices_distances.items(), key=lambda x: x[1][1], reverse=True)[:4]
         y = 40
-        for name, (dist, _) in recent_devices:
+        for name, dist in devices_distances.recent(4):
             display.text(f"{name[-4:]}: {dist}", text_x_center("XXXX: XXX"), y, 255)
             y += 10
         display.text(f"I: {energy_current:.1f} mA", text_x_center("I: XXXXX"), y+5, 255)
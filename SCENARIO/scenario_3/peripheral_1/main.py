@@ -4,6 +4,7 @@ import aioble
 import struct
 from time import ticks_ms, ticks_diff
 from pins import *  # Assure-toi que DISTANCE et display sont bien définis ici
+from ble_advertising import advertising_payload
 
 # === Initialisation BLE ===
 ble = bluetooth.BLE()
@@ -21,27 +22,6 @@ local_distance = 0
 devices_distances = {}  # {device_name: (distance, last_seen_ms)}
 
 # === Fonctions auxiliaires ===
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0:
-            break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
-
 def text_x_center(text):
     return max((128 - len(text) * 8) // 2, 0)
 
@@ -1,3 +1,4 @@
+import uasyncio as asyncio
 from peripheral_base import run
 from pins import *
-run("STeaMi-P2", "STeaMi-R2", LED_RED)
\ No newline at end of file
+asyncio.run(run("STeaMi-P2", "STeaMi-R2", LED_RED))
\ No newline at end of file
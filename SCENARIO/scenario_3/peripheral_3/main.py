@@ -1,3 +1,4 @@
+import uasyncio as asyncio
 from peripheral_base import run
 from pins import *
-run("STeaMi-P3", "STeaMi-R3", LED_BLUE)
+asyncio.run(run("STeaMi-P3", "STeaMi-R3", LED_BLUE))
@@ -1,75 +1,54 @@
-import bluetooth, uasyncio as asyncio, aioble, struct, json
-from time import ticks_ms
+import uasyncio as asyncio, urandom
 from pins import *
+from ble_advertising import AdvParser, advertising_payload
+from mesh_frame import MeshCodec, node_id
+from radio_scheduler import RadioScheduler
+from power_policy import PowerPolicy
 
-KEY = 0x5A
+MESH_KEY = b"STeaMi-scenario-3"  # Clé partagée (authentification des trames)
+MESH_TTL = 3  # Nombre de relais autorisés pour nos trames
+SENSOR_PERIOD_MS = 1000  # Période de mesure et d'émission de la distance
+POWER_PERIOD_MS = 5000   # Période de réévaluation de la politique d'énergie
 
-ble = bluetooth.BLE()
-ble.active(True)
 local_distance = 0
 
-def xor_encrypt(data: bytes) -> bytes:
-    return bytes([b ^ KEY for b in data])
-
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0: break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
-
-async def ble_task(device_name, relay_name, led):
-    print(f"Peripheral {device_name} active, linked to {relay_name}")
+async def sensor_task(radio, device_name, relay_name):
+    global local_distance
+    me = node_id(device_name)
+    relay = node_id(relay_name)
+    codec = MeshCodec(MESH_KEY)
+    # Départ aléatoire : après un redémarrage, les relais ne prennent pas
+    # les nouvelles trames pour des doublons
+    seq = urandom.getrandbits(16)
 
     while True:
-        # === Lecture capteur + envoi ===
+        # La mesure devient l'annonce de fond, émise pendant les scans
         local_distance = DISTANCE.read()
-        msg = {"src": device_name, "dst": relay_name, "payload": local_distance, "hop": 0}
-        man_data = xor_encrypt(json.dumps(msg).encode())
-        adv = advertising_payload(name=device_name, manufacturer_data=man_data)
-        try :
-            await aioble.advertise(
-                interval_us=150_000, 
-                adv_data=adv, 
-                connectable=False, 
-                timeout_ms=500)
-            print("Advertisement done.")
-        except asyncio.TimeoutError:
-            print("Advertisement timeout (non-connectable).")
+        seq = (seq + 1) & 0xFFFF
+        man_data = codec.encode_distance(me, relay, seq, 0, local_distance, MESH_TTL)
+        radio.set_beacon(advertising_payload(name=device_name, manufacturer_data=man_data))
+        await asyncio.sleep_ms(SENSOR_PERIOD_MS)
 
-        # === Réception éventuelle ===
-        async with aioble.scan(500, interval_us=30000, window_us=30000, active=True) as scanner:
-            async for result in scanner:
-                name = result.name()
-                if not name or not name.startswith("STeaMi-R"): continue
-                man = extract_manufacturer_data(result.adv_data)
-                if not man: continue
-                try:
-                    msg_json = xor_encrypt(man).decode()
-                    msg = json.loads(msg_json)
-                except:
-                    continue
-                if msg.get("dst") == device_name:
-                    distance = msg.get("payload", 0)
-                    if distance < 300:
-                        led.on()
-                    else:
-                        led.off()
-                    print(f"{device_name} received {distance} from {name}")
-        await asyncio.sleep_ms(500)
+async def ble_task(radio, policy, device_name, led):
+    me = node_id(device_name)
+    parser = AdvParser()
+    codec = MeshCodec(MESH_KEY)
+
+    while True:
+        # Trames des relais (filtrées par l'ordonnanceur sur "STeaMi-R")
+        adv_data = await radio.receive()
+        if not parser.parse(adv_data): continue
+        man = parser.manufacturer_data()
+        if not man or not codec.decode(man): continue
+        if codec.dst == me:
+            policy.note_traffic()
+            distance = codec.distance()
+            if distance is None: continue
+            if distance < 300:
+                led.on()
+            else:
+                led.off()
+            print(f"{device_name} received {distance} from {parser.name()}")
 
 async def display_task(name):
     while True:
@@ -83,4 +62,13 @@ async def run(device_name, relay_name, led):
     print("Peripheral base")
     print(f"Device: {device_name}, Relay: {relay_name}, LED: {led}")
     print("Starting tasks...")
-    await asyncio.gather(ble_task(device_name, relay_name, led), display_task(device_name))
+    radio = RadioScheduler(name_prefix=b"STeaMi-R")
+    # Intervalles radio adaptés à la batterie et au trafic reçu
+    policy = PowerPolicy(fg)
+    await asyncio.gather(
+        radio.run(),
+        policy.run(radio, POWER_PERIOD_MS),
+        sensor_task(radio, device_name, relay_name),
+        ble_task(radio, policy, device_name, led),
+        display_task(device_name),
+    )
@@ -1,3 +1,4 @@
+import uasyncio as asyncio
 from relay_base import run
 
-run("STeaMi-R2")
\ No newline at end of file
+asyncio.run(run("STeaMi-R2"))
\ No newline at end of file
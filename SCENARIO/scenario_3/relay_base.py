@@ -1,61 +1,44 @@
-import bluetooth, uasyncio as asyncio, aioble, struct, json
-from time import ticks_ms
+import uasyncio as asyncio
 from pins import *
-
-KEY = 0x5A  # Clé XOR simple
-
-def xor_encrypt(data: bytes) -> bytes:
-    return bytes([b ^ KEY for b in data])
-
-def advertising_payload(name=None, manufacturer_data=None):
-    payload = bytearray()
-    if name:
-        name_bytes = name.encode()
-        payload += bytes((len(name_bytes) + 1, 0x09)) + name_bytes
-    if manufacturer_data:
-        payload += bytes((len(manufacturer_data) + 1, 0xFF)) + manufacturer_data
-    return payload
-
-def extract_manufacturer_data(adv_bytes):
-    i = 0
-    while i < len(adv_bytes):
-        length = adv_bytes[i]
-        if length == 0: break
-        type_ = adv_bytes[i + 1]
-        if type_ == 0xFF:
-            return adv_bytes[i + 2 : i + 1 + length]
-        i += 1 + length
-    return None
-
-async def ble_task(device_name):
-    seen_msgs = set()
-    ble = bluetooth.BLE(); ble.active(True)
-    print(f"Relay {device_name} active")
+from ble_advertising import AdvParser, advertising_payload
+from mesh_frame import MeshCodec, node_id
+from dedup_cache import DedupCache
+from mesh_flood import FloodControl
+from radio_scheduler import RadioScheduler
+
+MESH_KEY = b"STeaMi-scenario-3"  # Clé partagée (authentification des trames)
+SEEN_CAPACITY = 64       # Trames mémorisées contre les doublons
+SEEN_MAX_AGE_MS = 60000  # Durée de mémorisation d'une trame
+RELAY_MIN_DELAY_MS = 50  # Délai aléatoire avant réémission
+RELAY_MAX_DELAY_MS = 400
+RELAY_REDUNDANCY = 2     # Copies entendues au-delà desquelles on se tait
+FLOOD_IDLE_MS = 50       # Période de vérification sans réémission en attente
+
+async def ble_task(radio, flood, device_name):
+    me = node_id(device_name)
+    own_name = device_name.encode()
+    parser = AdvParser()
+    codec = MeshCodec(MESH_KEY)
 
     while True:
-        async with aioble.scan(800, interval_us=30000, window_us=30000, active=True) as scanner:
-            async for result in scanner:
-                name = result.name()
-                if not name or name == device_name or not name.startswith("STeaMi"): continue
-                man = extract_manufacturer_data(result.adv_data)
-                if not man: continue
-                try:
-                    msg_json = xor_encrypt(man).decode()
-                    msg = json.loads(msg_json)
-                except Exception:
-                    continue
-                msg_id = (msg["src"], msg["dst"], msg["payload"])
-                if msg_id in seen_msgs: continue
-                seen_msgs.add(msg_id)
-                print(f"{device_name} relays: {msg}")
-                msg["hop"] += 1
-                man_data = xor_encrypt(json.dumps(msg).encode())
-                adv = advertising_payload(name=device_name, manufacturer_data=man_data)
-                try:
-                    await aioble.advertise(interval_us=150_000, adv_data=adv, connectable=False, timeout_ms=500)
-                except:
-                    pass
-        await asyncio.sleep_ms(200)
+        adv_data = await radio.receive()
+        if not parser.parse(adv_data) or parser.name_equals(own_name): continue
+        man = parser.manufacturer_data()
+        if not man or not codec.decode(man): continue
+        if codec.src == me: continue
+        if flood.receive(codec) == FloodControl.QUEUED:
+            print(f"{device_name} queues: src={codec.src:04X} dst={codec.dst:04X} seq={codec.seq} hop={codec.hop} ttl={codec.ttl}")
+
+async def relay_task(radio, flood, device_name):
+    # Les trames échues passent dans la file d'émission de l'ordonnanceur ;
+    # le scan continue pendant leur annonce
+    while True:
+        man_data = flood.pop_due()
+        while man_data is not None:
+            radio.send(advertising_payload(name=device_name, manufacturer_data=man_data))
+            man_data = flood.pop_due()
+        wait = flood.next_due_ms()
+        await asyncio.sleep_ms(wait if 0 <= wait < FLOOD_IDLE_MS else FLOOD_IDLE_MS)
 
 async def display_task(name):
     while True:
@@ -66,4 +49,14 @@ async def display_task(name):
         await asyncio.sleep(0.5)
 
 async def run(device_name):
-    await asyncio.gather(ble_task(device_name), display_task(device_name))
\ No newline at end of file
+    print(f"Relay {device_name} active")
+    radio = RadioScheduler(name_prefix=b"STeaMi")
+    flood = FloodControl(DedupCache(SEEN_CAPACITY, SEEN_MAX_AGE_MS),
+                         min_delay_ms=RELAY_MIN_DELAY_MS, max_delay_ms=RELAY_MAX_DELAY_MS,
+                         redundancy=RELAY_REDUNDANCY)
+    await asyncio.gather(
+        radio.run(),
+        ble_task(radio, flood, device_name),
+        relay_task(radio, flood, device_name),
+        display_task(device_name),
+    )
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Vérifications sur PC du contrôle d'inondation (lib/mesh_flood.py)
+
+Rejoue des réceptions de trames sur une horloge virtuelle et vérifie les
+décisions de FloodControl. Le script échoue (code de sortie 1) si une
+vérification échoue : utilisable en intégration continue.
+
+    python3 SCENARIO/scenario_3/sim/check_flood.py
+"""
+
+import os
+import random
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+
+# Remplaçants des modules MicroPython utilisés par lib/
+sys.modules["micropython"] = types.SimpleNamespace(const=lambda x: x)
+sys.modules["urandom"] = types.SimpleNamespace(getrandbits=random.getrandbits)
+time.ticks_ms = lambda: 0
+time.ticks_diff = lambda a, b: a - b
+time.ticks_add = lambda a, b: a + b
+
+from dedup_cache import DedupCache  # noqa: E402
+from mesh_flood import FloodControl  # noqa: E402
+from mesh_frame import MeshCodec, BROADCAST  # noqa: E402
+
+KEY = b"STeaMi-scenario-3"
+FRAMES = 200
+SOURCE_REPEAT_MS = 40     # intervalle d'annonce de l'émetteur
+SOURCE_DURATION_MS = 1000  # durée d'annonce d'une trame par l'émetteur
+
+
+def run_relay(neighbour_copies):
+    """
+    Un relais reçoit FRAMES trames, chacune répétée par l'émetteur pendant
+    SOURCE_DURATION_MS ; neighbour_copies voisins la relaient 10 ms après
+    la première réception
+
+    Returns:
+        Nombre de trames réémises par le relais
+    """
+    random.seed(1)
+    source = MeshCodec(KEY)
+    neighbour = MeshCodec(KEY)
+    relay = MeshCodec(KEY)
+    flood = FloodControl(DedupCache(64))
+    forwarded = 0
+    now = 0
+    for seq in range(FRAMES):
+        frame = bytes(source.encode_distance(0x1234, BROADCAST, seq, 0, 100 + seq, ttl=3))
+        # Copie relayée par un voisin : un saut de plus
+        neighbour.decode(frame)
+        relayed = bytes(neighbour.forward())
+        events = [(now + t, frame) for t in range(0, SOURCE_DURATION_MS, SOURCE_REPEAT_MS)]
+        events += [(now + 10, relayed)] * neighbour_copies
+        events.sort(key=lambda event: event[0])
+        end = now + SOURCE_DURATION_MS
+        for t, data in events:
+            while flood.pop_due(t) is not None:
+                forwarded += 1
+            assert relay.decode(data)
+            flood.receive(relay, t)
+        while flood.pop_due(end) is not None:
+            forwarded += 1
+        now = end + 100
+    return forwarded
+
+
+def main():
+    failures = 0
+    checks = (
+        ("lone relay forwards every frame", run_relay(0), lambda n: n == FRAMES),
+        ("one neighbour: relay still forwards", run_relay(1), lambda n: n == FRAMES),
+        ("two neighbours: rebroadcast suppressed", run_relay(2), lambda n: n == 0),
+    )
+    for name, forwarded, ok in checks:
+        status = "ok" if ok(forwarded) else "FAIL"
+        if status != "ok":
+            failures += 1
+        print(f"{status:4} {name}: {forwarded}/{FRAMES} forwarded")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
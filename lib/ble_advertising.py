@@ -0,0 +1,268 @@
+"""
+Codec des trames d'advertising BLE (structures AD)
+
+Module partagé par les exemples BLE, SCENARIO, BATTERY et DEMO. La lecture
+se fait en une seule passe avec des memoryview (aucune copie des données)
+et la construction dans un buffer préalloué.
+
+A copier dans /lib sur la carte :
+
+    mpremote fs cp -r lib :
+"""
+
+from micropython import const
+
+# Types de structures AD utilisés
+AD_TYPE_FLAGS = const(0x01)
+AD_TYPE_NAME_SHORT = const(0x08)
+AD_TYPE_NAME_COMPLETE = const(0x09)
+AD_TYPE_SERVICE_DATA_16 = const(0x16)
+AD_TYPE_MANUFACTURER = const(0xFF)
+
+# Taille maximale d'une trame d'advertising legacy
+ADV_MAX_LEN = const(31)
+
+
+class AdvPayload:
+    """
+    Trame d'advertising construite dans un buffer préalloué
+
+    Exemple :
+        payload = AdvPayload()
+        payload.add_name(b"STeaMi-R1")
+        offset = payload.add_manufacturer_data(bytes(2))
+        ...
+        struct.pack_into("h", payload.buf, offset, distance)
+        await aioble.advertise(..., adv_data=payload.view())
+    """
+
+    def __init__(self, size=ADV_MAX_LEN):
+        self.buf = bytearray(size)
+        self._view = memoryview(self.buf)
+        self.length = 0
+
+    def clear(self):
+        """Vide la trame (le buffer est réutilisé)"""
+        self.length = 0
+
+    def add_field(self, ad_type, data):
+        """
+        Ajoute une structure AD
+
+        Args:
+            ad_type: Type de la structure (AD_TYPE_*)
+            data: Contenu (bytes, bytearray ou memoryview)
+
+        Returns:
+            Position du contenu dans buf, pour le mettre à jour en place
+
+        Raises:
+            ValueError si la trame dépasse la taille du buffer
+        """
+        n = len(data)
+        start = self.length
+        end = start + 2 + n
+        if end > len(self.buf):
+            raise ValueError("advertising payload too large")
+        buf = self.buf
+        buf[start] = n + 1
+        buf[start + 1] = ad_type
+        self._view[start + 2:end] = data
+        self.length = end
+        return start + 2
+
+    def add_name(self, name):
+        """Ajoute le nom complet (str ou bytes)"""
+        if isinstance(name, str):
+            name = name.encode()
+        return self.add_field(AD_TYPE_NAME_COMPLETE, name)
+
+    def add_manufacturer_data(self, data):
+        """Ajoute les données constructeur"""
+        return self.add_field(AD_TYPE_MANUFACTURER, data)
+
+    def view(self):
+        """Trame construite, sans copie"""
+        return self._view[:self.length]
+
+
+class AdvParser:
+    """
+    Lecture en une passe de toutes les structures AD d'une trame
+
+    Les positions des champs sont gardées dans des buffers préalloués ; les
+    accesseurs retournent des memoryview sur la trame d'origine.
+
+    Exemple :
+        parser = AdvParser()
+        async for result in scanner:
+            if not parser.parse(result.adv_data):
+                continue
+            if parser.name_startswith(b"STeaMi"):
+                data = parser.manufacturer_data()
+    """
+
+    MAX_FIELDS = 16
+
+    def __init__(self):
+        self.types = bytearray(self.MAX_FIELDS)
+        self.starts = bytearray(self.MAX_FIELDS)
+        self.ends = bytearray(self.MAX_FIELDS)
+        self.count = 0
+        self._view = None
+
+    def parse(self, adv_data):
+        """
+        Découpe la trame en structures AD
+
+        Args:
+            adv_data: Trame reçue (bytes, bytearray ou memoryview)
+
+        Returns:
+            Nombre de structures trouvées (une trame tronquée s'arrête à la
+            dernière structure complète)
+        """
+        view = memoryview(adv_data)
+        self._view = view
+        n = len(view)
+        if n > 255:
+            n = 255
+        types = self.types
+        starts = self.starts
+        ends = self.ends
+        count = 0
+        i = 0
+        while i + 1 < n and count < self.MAX_FIELDS:
+            length = view[i]
+            if length == 0:
+                break
+            end = i + 1 + length
+            if end > n:
+                break
+            types[count] = view[i + 1]
+            starts[count] = i + 2
+            ends[count] = end
+            count += 1
+            i = end
+        self.count = count
+        return count
+
+    def _index(self, ad_type):
+        types = self.types
+        for k in range(self.count):
+            if types[k] == ad_type:
+                return k
+        return -1
+
+    def field(self, ad_type):
+        """Contenu de la première structure du type donné (memoryview) ou None"""
+        k = self._index(ad_type)
+        if k < 0:
+            return None
+        return self._view[self.starts[k]:self.ends[k]]
+
+    def field_length(self, ad_type):
+        """Longueur du contenu d'une structure, -1 si absente (sans allocation)"""
+        k = self._index(ad_type)
+        if k < 0:
+            return -1
+        return self.ends[k] - self.starts[k]
+
+    def field_offset(self, ad_type):
+        """
+        Position du contenu d'une structure dans la trame, -1 si absente
+
+        Permet de décoder directement la trame d'origine avec
+        struct.unpack_from, sans allocation.
+        """
+        k = self._index(ad_type)
+        if k < 0:
+            return -1
+        return self.starts[k]
+
+    def manufacturer_data(self):
+        """Données constructeur (memoryview) ou None"""
+        return self.field(AD_TYPE_MANUFACTURER)
+
+    def _name_index(self):
+        k = self._index(AD_TYPE_NAME_COMPLETE)
+        if k < 0:
+            k = self._index(AD_TYPE_NAME_SHORT)
+        return k
+
+    def name_startswith(self, prefix):
+        """
+        Compare le début du nom à prefix (bytes) sans décoder le nom
+
+        Returns:
+            True si le nom commence par prefix
+        """
+        k = self._name_index()
+        if k < 0:
+            return False
+        start = self.starts[k]
+        n = len(prefix)
+        if self.ends[k] - start < n:
+            return False
+        view = self._view
+        for j in range(n):
+            if view[start + j] != prefix[j]:
+                return False
+        return True
+
+    def name_equals(self, name):
+        """Compare le nom complet à name (bytes) sans le décoder"""
+        k = self._name_index()
+        return k >= 0 and self.ends[k] - self.starts[k] == len(name) and self.name_startswith(name)
+
+    def name(self):
+        """Nom décodé (str) ou None"""
+        k = self._name_index()
+        if k < 0:
+            return None
+        return str(self._view[self.starts[k]:self.ends[k]], "utf-8")
+
+
+def advertising_payload(name=None, manufacturer_data=None):
+    """
+    Construit une trame d'advertising (nom complet + données constructeur)
+
+    Pour les envois fréquents, préférer AdvPayload et son buffer réutilisé.
+
+    Returns:
+        memoryview sur la trame (et non bytes) : à copier avec bytes() si
+        elle doit être comparée ou servir de clé de dictionnaire
+    """
+    if isinstance(name, str):
+        name = name.encode()
+    size = (len(name) + 2 if name else 0) + (len(manufacturer_data) + 2 if manufacturer_data else 0)
+    # Taille exacte : une trame trop longue est refusée plus tard par aioble
+    payload = AdvPayload(size)
+    if name:
+        payload.add_name(name)
+    if manufacturer_data:
+        payload.add_manufacturer_data(manufacturer_data)
+    return payload.view()
+
+
+def extract_manufacturer_data(adv_bytes):
+    """
+    Données constructeur d'une trame d'advertising, sans copie
+
+    Returns:
+        memoryview sur la trame d'origine, ou None
+    """
+    view = memoryview(adv_bytes)
+    n = len(view)
+    i = 0
+    while i + 1 < n:
+        length = view[i]
+        if length == 0:
+            break
+        end = i + 1 + length
+        if end > n:
+            break
+        if view[i + 1] == AD_TYPE_MANUFACTURER:
+            return view[i + 2:end]
+        i = end
+    return None
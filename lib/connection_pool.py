@@ -0,0 +1,287 @@
+"""
+Pool de connexions BLE simultanées pour un central
+
+Une passerelle garde plusieurs périphériques connectés en même temps :
+chaque périphérique a sa tâche, qui se connecte, découvre les
+caractéristiques (handles mémorisés par GattCache), s'abonne aux
+notifications et se reconnecte après une déconnexion avec un délai
+croissant. Toutes les notifications arrivent dans une seule file, lue par
+await receive().
+"""
+
+import asyncio
+import urandom
+from array import array
+from gatt_cache import GattCache
+
+
+class Peer:
+    """État d'un périphérique du pool"""
+
+    def __init__(self, index, device, name):
+        self.index = index            # rang dans le pool
+        self.device = device
+        self.name = name
+        self.connection = None        # connexion aioble en cours, ou None
+        self.stream_index = -1        # rang dans notify_uuids de la caractéristique suivie
+        self.connects = 0
+        self.failures = 0
+        self.active = True            # False après remove()
+        self.task = None
+
+    def connected(self):
+        return self.connection is not None and self.connection.is_connected()
+
+
+class ConnectionPool:
+    """
+    Connexions simultanées à plusieurs périphériques
+
+    Exemple :
+        pool = ConnectionPool(_SERVICE_UUID, (_BATCH_UUID, _TEMP_UUID))
+        pool.add(result.device, result.name())
+        while True:
+            peer, data = await pool.receive()
+            ...  # data vient de notify_uuids[peer.stream_index]
+    """
+
+    def __init__(self, service_uuid, notify_uuids, extra_uuids=(), max_peers=8,
+                 on_connect=None, connect_timeout_ms=5000, notify_timeout_ms=10000,
+                 backoff_min_ms=500, backoff_max_ms=30000, queue_depth=32, max_len=64,
+                 cache_path=None):
+        """
+        Initialise le pool
+
+        Args:
+            service_uuid: Service contenant les caractéristiques
+            notify_uuids: Caractéristiques notifiées, par ordre de préférence ;
+                la première présente chez le périphérique est suivie
+            extra_uuids: Autres caractéristiques à découvrir (pour on_connect)
+            max_peers: Nombre maximal de périphériques
+            on_connect: Coroutine appelée après la découverte avec
+                (peer, characteristics), characteristics étant un dict
+                uuid -> caractéristique
+            connect_timeout_ms: Délai maximal d'une tentative de connexion
+            notify_timeout_ms: Silence au-delà duquel la connexion est
+                considérée comme perdue
+            backoff_min_ms: Attente avant la première reconnexion
+            backoff_max_ms: Attente maximale entre deux tentatives
+            queue_depth: Nombre de notifications en attente au plus
+            max_len: Taille maximale d'une notification gardée
+            cache_path: Fichier où sauvegarder les handles GATT (None = RAM)
+        """
+        self.service_uuid = service_uuid
+        self.notify_uuids = notify_uuids
+        self.uuids = tuple(notify_uuids) + tuple(extra_uuids)
+        self.max_peers = max_peers
+        self.on_connect = on_connect
+        self.connect_timeout_ms = connect_timeout_ms
+        self.notify_timeout_ms = notify_timeout_ms
+        self.backoff_min_ms = backoff_min_ms
+        self.backoff_max_ms = backoff_max_ms
+
+        self.peers = [None] * max_peers
+        # Incrémenté à chaque remove() : distingue les notifications d'un
+        # périphérique retiré de celles du suivant dans le même rang
+        self._generation = array("B", [0] * max_peers)
+        self._by_addr = {}  # adresse -> Peer
+        # Le contrôleur n'accepte qu'une tentative de connexion à la fois
+        self._connect_lock = asyncio.Lock()
+        # Handles découverts, réutilisés à la reconnexion
+        self.cache = GattCache(service_uuid, self.uuids, path=cache_path,
+                               capacity=max(max_peers, 8))
+
+        # File des notifications : anneau de max_len octets par entrée
+        self._max_len = max_len
+        self._rx = bytearray(queue_depth * max_len)
+        self._rx_view = memoryview(self._rx)
+        self._rx_len = array("B", [0] * queue_depth)
+        self._rx_peer = array("B", [0] * queue_depth)
+        self._rx_gen = array("B", [0] * queue_depth)
+        self._rx_depth = queue_depth
+        self._rx_head = 0
+        self._rx_count = 0
+        self._rx_busy = False
+        self._rx_event = asyncio.Event()
+
+        # Statistiques
+        self.received = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._by_addr)
+
+    def __contains__(self, addr):
+        return addr in self._by_addr
+
+    def get(self, addr):
+        """Périphérique d'adresse addr, ou None"""
+        return self._by_addr.get(addr)
+
+    def radio_lock(self):
+        """
+        Verrou tenu pendant chaque tentative de connexion
+
+        Le contrôleur refuse une connexion pendant un scan, et un scan
+        pendant une connexion en cours : un scan lancé à côté du pool doit
+        tenir ce verrou (async with pool.radio_lock(): ...).
+        """
+        return self._connect_lock
+
+    # === Gestion des périphériques ===
+
+    def add(self, device, name=None):
+        """
+        Ajoute un périphérique et lance sa tâche de connexion
+
+        Returns:
+            Le Peer, ou None si le pool est plein
+        """
+        peer = self._by_addr.get(device.addr)
+        if peer is not None:
+            return peer
+        for index in range(self.max_peers):
+            if self.peers[index] is None:
+                break
+        else:
+            return None
+        peer = Peer(index, device, name)
+        self.peers[index] = peer
+        self._by_addr[device.addr] = peer
+        peer.task = asyncio.create_task(self._peer_task(peer))
+        return peer
+
+    async def remove(self, addr):
+        """Retire un périphérique et le déconnecte"""
+        peer = self._by_addr.pop(addr, None)
+        if peer is None:
+            return
+        peer.active = False
+        self.peers[peer.index] = None
+        self._generation[peer.index] = (self._generation[peer.index] + 1) & 0xFF
+        if peer.connected():
+            try:
+                await peer.connection.disconnect()
+            except Exception:
+                pass
+        if peer.task is not None:
+            peer.task.cancel()
+
+    # === Tâche par périphérique ===
+
+    async def _peer_task(self, peer):
+        backoff = self.backoff_min_ms
+        while peer.active:
+            try:
+                async with self._connect_lock:
+                    connection = await peer.device.connect(timeout_ms=self.connect_timeout_ms)
+            except (asyncio.TimeoutError, OSError):
+                peer.failures += 1
+                print(f"{peer.name}: connection failed, retry in {backoff} ms")
+                await asyncio.sleep_ms(backoff + urandom.getrandbits(16) % (backoff // 2 + 1))
+                backoff = min(backoff * 2, self.backoff_max_ms)
+                continue
+
+            backoff = self.backoff_min_ms
+            peer.connection = connection
+            peer.connects += 1
+            try:
+                async with connection:
+                    await self._serve(peer, connection)
+            except Exception as e:
+                print(f"{peer.name}: {e}")
+            peer.connection = None
+            if peer.active:
+                await asyncio.sleep_ms(self.backoff_min_ms)
+
+    async def _serve(self, peer, connection):
+        """Abonnement puis transfert des notifications vers la file"""
+        characteristics, cached = await self.cache.characteristics(connection)
+
+        stream = None
+        for i, uuid in enumerate(self.notify_uuids):
+            stream = characteristics.get(uuid)
+            if stream is not None:
+                peer.stream_index = i
+                break
+        if stream is None:
+            raise OSError("no notify characteristic")
+
+        try:
+            if self.on_connect is not None:
+                await self.on_connect(peer, characteristics)
+            await self.cache.subscribe(connection, stream)
+        except Exception:
+            # Handles périmés (périphérique reprogrammé) : nouvelle
+            # découverte à la prochaine connexion
+            self.cache.invalidate(connection)
+            raise
+
+        received = False
+        while peer.active and connection.is_connected():
+            try:
+                data = await stream.notified(timeout_ms=self.notify_timeout_ms)
+            except asyncio.TimeoutError:
+                print(f"{peer.name}: no notification for {self.notify_timeout_ms} ms")
+                if cached and not received:
+                    # Sans Database Hash, des handles mémorisés périmés
+                    # peuvent abonner le mauvais descripteur sans erreur
+                    self.cache.invalidate(connection)
+                return
+            received = True
+            if not peer.active:
+                # Retiré pendant l'attente : son rang peut déjà être réutilisé
+                return
+            self._push(peer.index, data)
+
+    # === File des notifications ===
+
+    def _push(self, peer_index, data):
+        # Un emplacement est réservé à la notification en cours de lecture
+        capacity = self._rx_depth - 1 if self._rx_busy else self._rx_depth
+        if self._rx_count >= capacity:
+            self.dropped += 1
+            return
+        n = min(len(data), self._max_len)
+        k = (self._rx_head + self._rx_count + (1 if self._rx_busy else 0)) % self._rx_depth
+        start = k * self._max_len
+        self._rx_view[start:start + n] = memoryview(data)[:n]
+        self._rx_len[k] = n
+        self._rx_peer[k] = peer_index
+        self._rx_gen[k] = self._generation[peer_index]
+        self._rx_count += 1
+        self.received += 1
+        self._rx_event.set()
+
+    async def receive(self):
+        """
+        Attend la prochaine notification, tous périphériques confondus
+
+        Returns:
+            (peer, memoryview sur la valeur, valide jusqu'au prochain appel) ;
+            peer vaut None si le périphérique a été retiré entre-temps
+        """
+        if self._rx_busy:
+            self._rx_head = (self._rx_head + 1) % self._rx_depth
+            self._rx_busy = False
+        while not self._rx_count:
+            self._rx_event.clear()
+            await self._rx_event.wait()
+        k = self._rx_head
+        self._rx_count -= 1
+        self._rx_busy = True
+        start = k * self._max_len
+        index = self._rx_peer[k]
+        peer = self.peers[index] if self._rx_gen[k] == self._generation[index] else None
+        return peer, self._rx_view[start:start + self._rx_len[k]]
+
+    def stats(self):
+        """Compteurs de fonctionnement"""
+        return {
+            "peers": len(self._by_addr),
+            "connected": sum(1 for peer in self.peers if peer is not None and peer.connected()),
+            "received": self.received,
+            "dropped": self.dropped,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
@@ -0,0 +1,175 @@
+"""
+Cache de suppression des doublons pour les relais BLE
+
+Mémorise les trames déjà vues, identifiées par (émetteur, numéro de
+séquence), dans des tableaux de taille fixe : la mémoire utilisée ne
+dépend pas de la durée de fonctionnement du relais et aucune allocation
+n'a lieu après la construction.
+"""
+
+from array import array
+from time import ticks_ms, ticks_diff
+
+
+class DedupCache:
+    """
+    Ensemble borné des trames vues récemment (LRU avec expiration)
+
+    Les entrées sont chaînées de la plus récente à la plus ancienne ; quand
+    le cache est plein, la plus ancienne est remplacée. Une entrée plus
+    vieille que max_age_ms est considérée comme absente, ce qui permet au
+    numéro de séquence d'un émetteur de reboucler.
+
+    Exemple :
+        seen = DedupCache(capacity=64)
+        if codec.decode(man) and not seen.check(codec.src, codec.seq):
+            ...  # trame nouvelle, à relayer
+    """
+
+    def __init__(self, capacity=64, max_age_ms=60000):
+        """
+        Initialise le cache
+
+        Args:
+            capacity: Nombre maximal de trames mémorisées (32767 au plus)
+            max_age_ms: Durée de validité d'une entrée en ms
+        """
+        if not 0 < capacity < 0x8000:
+            raise ValueError("invalid capacity")
+        self.capacity = capacity
+        self.max_age_ms = max_age_ms
+
+        # Table de hachage : têtes de listes et chaînage, -1 = vide
+        buckets = 1
+        while buckets < 2 * capacity:
+            buckets <<= 1
+        self._mask = buckets - 1
+        self._heads = array("h", [-1] * buckets)
+        self._chain = array("h", [-1] * capacity)
+
+        # Entrées
+        self._src = array("H", [0] * capacity)
+        self._seq = array("H", [0] * capacity)
+        self._stamp = array("L", [0] * capacity)
+
+        # Liste doublement chaînée, de la plus récente à la plus ancienne
+        self._prev = array("h", [-1] * capacity)
+        self._next = array("h", [-1] * capacity)
+        self._newest = -1
+        self._oldest = -1
+        self.count = 0
+
+        # Statistiques
+        self.hits = 0
+        self.evictions = 0
+
+    def _bucket(self, src, seq):
+        return ((src * 40503) ^ seq) & self._mask
+
+    def _find(self, src, seq):
+        """Indice de l'entrée (src, seq), -1 si absente"""
+        i = self._heads[self._bucket(src, seq)]
+        srcs = self._src
+        seqs = self._seq
+        chain = self._chain
+        while i >= 0:
+            if srcs[i] == src and seqs[i] == seq:
+                return i
+            i = chain[i]
+        return -1
+
+    def _unlink(self, i):
+        """Retire l'entrée i de la liste LRU"""
+        prev = self._prev[i]
+        nxt = self._next[i]
+        if prev >= 0:
+            self._next[prev] = nxt
+        else:
+            self._newest = nxt
+        if nxt >= 0:
+            self._prev[nxt] = prev
+        else:
+            self._oldest = prev
+
+    def _push_newest(self, i):
+        """Place l'entrée i en tête de la liste LRU"""
+        self._prev[i] = -1
+        self._next[i] = self._newest
+        if self._newest >= 0:
+            self._prev[self._newest] = i
+        self._newest = i
+        if self._oldest < 0:
+            self._oldest = i
+
+    def _unhash(self, i):
+        """Retire l'entrée i de sa liste de hachage"""
+        bucket = self._bucket(self._src[i], self._seq[i])
+        j = self._heads[bucket]
+        if j == i:
+            self._heads[bucket] = self._chain[i]
+            return
+        while j >= 0:
+            nxt = self._chain[j]
+            if nxt == i:
+                self._chain[j] = self._chain[i]
+                return
+            j = nxt
+
+    def check(self, src, seq, now=None):
+        """
+        Teste et mémorise une trame
+
+        Args:
+            src: Identifiant de l'émetteur (16 bits)
+            seq: Numéro de séquence (16 bits)
+            now: Date en ms (ticks_ms() par défaut)
+
+        Returns:
+            True si la trame a déjà été vue depuis moins de max_age_ms,
+            False si elle est nouvelle (elle est alors mémorisée)
+        """
+        if now is None:
+            now = ticks_ms()
+        i = self._find(src, seq)
+        if i >= 0:
+            fresh = ticks_diff(now, self._stamp[i]) < self.max_age_ms
+            if fresh:
+                self.hits += 1
+            self._stamp[i] = now
+            if i != self._newest:
+                self._unlink(i)
+                self._push_newest(i)
+            return fresh
+
+        if self.count < self.capacity:
+            i = self.count
+            self.count += 1
+        else:
+            # Remplacement de la plus ancienne entrée
+            i = self._oldest
+            self._unlink(i)
+            self._unhash(i)
+            if ticks_diff(now, self._stamp[i]) < self.max_age_ms:
+                self.evictions += 1
+
+        self._src[i] = src
+        self._seq[i] = seq
+        self._stamp[i] = now
+        bucket = self._bucket(src, seq)
+        self._chain[i] = self._heads[bucket]
+        self._heads[bucket] = i
+        self._push_newest(i)
+        return False
+
+    def __contains__(self, key):
+        """(src, seq) in cache : test sans mémorisation ni mise à jour"""
+        i = self._find(key[0], key[1])
+        return i >= 0 and ticks_diff(ticks_ms(), self._stamp[i]) < self.max_age_ms
+
+    def clear(self):
+        """Vide le cache"""
+        for k in range(len(self._heads)):
+            self._heads[k] = -1
+        self._newest = -1
+        self._oldest = -1
+        self.count = 0
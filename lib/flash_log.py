@@ -0,0 +1,259 @@
+"""
+Journal binaire en flash
+
+Les enregistrements (struct de taille fixe) sont accumulés en RAM et écrits
+par blocs entiers : un fichier reste ouvert et chaque écriture couvre
+exactement un bloc du système de fichiers, aligné sur un bloc, au lieu
+d'un open/write/close par mesure. Un enregistrement peut donc être coupé
+entre deux blocs. Une écriture anticipée (flush(), max_delay_ms) écrit un
+bloc partiel ; l'écriture suivante le complète pour retrouver l'alignement.
+Les fichiers tournent en anneau (prefix0.bin, prefix1.bin, ...) : la place
+occupée en flash est bornée et le plus ancien fichier est réécrit en
+premier, ce qui répartit l'usure.
+
+Chaque fichier commence par un en-tête qui le décrit entièrement :
+
+    b"SLOG", version (uint8), longueur n (uint16), puis n octets de JSON :
+    {"seq": numéro du fichier, "format": format struct d'un enregistrement,
+     "fields": noms des champs, "scales": diviseurs, "labels": {champ: noms},
+     "epoch_year": origine de time.time()}
+
+Le JSON est complété par des espaces pour que l'en-tête occupe un nombre
+entier de blocs : les enregistrements commencent sur une frontière de bloc.
+
+Un décodeur sur PC n'a donc besoin que des fichiers (voir
+BLE/Thermometer_Scanner/host/log_to_csv.py).
+"""
+
+import json
+import os
+import struct
+import time
+from micropython import const
+
+LOG_MAGIC = b"SLOG"
+LOG_VERSION = const(1)
+_PREAMBLE = "<4sBH"
+_PREAMBLE_SIZE = const(7)
+
+
+def read_header(f):
+    """
+    Lit l'en-tête d'un fichier journal ouvert en lecture binaire
+
+    Returns:
+        (dict de l'en-tête, taille de l'en-tête en octets), ou (None, 0) si
+        le fichier n'est pas un journal
+    """
+    preamble = f.read(_PREAMBLE_SIZE)
+    if len(preamble) < _PREAMBLE_SIZE:
+        return None, 0
+    magic, version, length = struct.unpack(_PREAMBLE, preamble)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        return None, 0
+    try:
+        header = json.loads(f.read(length).decode())
+    except ValueError:
+        return None, 0
+    return header, _PREAMBLE_SIZE + length
+
+
+class FlashLog:
+    """
+    Journal d'enregistrements de taille fixe, écrit par blocs
+
+    Exemple :
+        log = FlashLog("thermo", "<IBh", ("time", "sensor", "temperature"),
+                       scales=(1, 1, 100), labels={"sensor": ["Nord", "Sud"]})
+        log.append((time.time(), 0, 2345))
+    """
+
+    def __init__(self, prefix, record_format, fields, scales=None, labels=None,
+                 block_size=512, file_size=16384, files=4, max_delay_ms=None):
+        """
+        Ouvre le journal (reprend le fichier le plus récent s'il est compatible)
+
+        Args:
+            prefix: Début du nom des fichiers
+            record_format: Format struct d'un enregistrement
+            fields: Noms des champs, dans l'ordre du format
+            scales: Diviseurs à appliquer aux champs au décodage (1 par défaut)
+            labels: {champ: liste de noms} pour les champs qui sont des indices
+            block_size: Taille d'une écriture en octets (un bloc du système
+                de fichiers)
+            file_size: Taille au-delà de laquelle on passe au fichier suivant
+            files: Nombre de fichiers de l'anneau
+            max_delay_ms: Durée maximale d'un enregistrement en RAM (None =
+                écriture seulement quand le bloc est plein)
+        """
+        self.prefix = prefix
+        self.record_format = record_format
+        self.record_size = struct.calcsize(record_format)
+        self.file_size = file_size
+        self.files = files
+        self.max_delay_ms = max_delay_ms
+        self.block_size = block_size
+        self._description = {
+            "format": record_format,
+            "fields": list(fields),
+            "scales": list(scales) if scales else [1] * len(fields),
+            "labels": labels or {},
+            "epoch_year": time.gmtime(0)[0],
+        }
+
+        # Tampon d'un bloc, plus la fin d'un enregistrement à cheval sur
+        # le bloc suivant
+        self._buf = bytearray(block_size + self.record_size)
+        self._view = memoryview(self._buf)
+        self._used = 0
+        self._room = block_size  # octets jusqu'à la prochaine frontière de bloc
+        self._first_ms = 0
+
+        self._file = None
+        self._file_index = 0
+        self._seq = 0
+        self._size = 0
+
+        # Statistiques
+        self.records = 0
+        self.writes = 0
+        self.rotations = 0
+
+        self._resume()
+
+    def _path(self, index):
+        return "%s%d.bin" % (self.prefix, index)
+
+    def _resume(self):
+        """Reprend le fichier de plus grand numéro, ou en commence un"""
+        best = -1
+        best_seq = -1
+        best_header = None
+        best_header_size = 0
+        for index in range(self.files):
+            try:
+                with open(self._path(index), "rb") as f:
+                    header, header_size = read_header(f)
+            except OSError:
+                continue
+            if header is not None and header.get("seq", -1) > best_seq:
+                best, best_seq = index, header["seq"]
+                best_header, best_header_size = header, header_size
+        if best < 0:
+            self._open_new(0, 0)
+            return
+        size = os.stat(self._path(best))[6]
+        self._file_index = best
+        self._seq = best_seq
+        compatible = all(best_header.get(key) == self._description[key]
+                         for key in ("format", "fields", "scales", "labels"))
+        # Un enregistrement incomplet (coupure pendant une écriture)
+        # décalerait tous les suivants : on passe alors au fichier suivant
+        if compatible and size < self.file_size and (size - best_header_size) % self.record_size == 0:
+            self._file = open(self._path(best), "ab")
+            self._size = size
+            self._room = self.block_size - size % self.block_size
+        else:
+            self._open_new((best + 1) % self.files, best_seq + 1)
+
+    def _open_new(self, index, seq):
+        """Réécrit le fichier index avec un nouvel en-tête"""
+        if self._file is not None:
+            self._file.close()
+        self._description["seq"] = seq
+        header = json.dumps(self._description).encode()
+        # Espaces jusqu'à la fin du bloc (ignorés par le décodeur JSON)
+        size = _PREAMBLE_SIZE + len(header)
+        size += -size % self.block_size
+        length = size - _PREAMBLE_SIZE
+        self._file = open(self._path(index), "wb")
+        self._file.write(struct.pack(_PREAMBLE, LOG_MAGIC, LOG_VERSION, length))
+        self._file.write(header)
+        self._file.write(b" " * (length - len(header)))
+        self._file.flush()
+        self._file_index = index
+        self._seq = seq
+        self._size = size
+        self._room = self.block_size
+
+    def append(self, values, now=None):
+        """
+        Ajoute un enregistrement (écrit en flash quand le bloc est plein)
+
+        Args:
+            values: Valeurs des champs, dans l'ordre du format
+            now: Date en ms (time.ticks_ms() par défaut), pour max_delay_ms
+        """
+        if now is None:
+            now = time.ticks_ms()
+        if self._size + self._used >= self.file_size:
+            # Changement de fichier entre deux enregistrements
+            self.flush()
+            self._open_new((self._file_index + 1) % self.files, self._seq + 1)
+            self.rotations += 1
+        if self._used == 0:
+            self._first_ms = now
+        struct.pack_into(self.record_format, self._buf, self._used, *values)
+        self._used += self.record_size
+        self.records += 1
+        if self._used >= self._room:
+            # Bloc complet : la fin de l'enregistrement passe au bloc suivant
+            room = self._room
+            self._write(room)
+            rest = self._used - room
+            buf = self._buf
+            for i in range(rest):
+                buf[i] = buf[room + i]
+            self._used = rest
+            self._first_ms = now
+        else:
+            self.poll(now)
+
+    def poll(self, now=None):
+        """
+        Écrit les enregistrements en attente depuis plus de max_delay_ms
+
+        À appeler périodiquement si les enregistrements peuvent s'espacer
+        de plus de max_delay_ms (append() ne vérifie le délai qu'à l'arrivée
+        d'un enregistrement).
+        """
+        if not self._used or self.max_delay_ms is None:
+            return
+        if now is None:
+            now = time.ticks_ms()
+        if time.ticks_diff(now, self._first_ms) >= self.max_delay_ms:
+            self.flush()
+
+    def _write(self, n):
+        """Écrit les n premiers octets du tampon (n <= self._room)"""
+        self._file.write(self._view[:n])
+        self._file.flush()
+        self._size += n
+        self._room -= n
+        if self._room == 0:
+            self._room = self.block_size
+        self.writes += 1
+
+    def flush(self):
+        """Écrit les enregistrements en attente (bloc partiel)"""
+        if not self._used:
+            return
+        self._write(self._used)
+        self._used = 0
+
+    def close(self):
+        """Écrit les enregistrements en attente et ferme le fichier"""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        """Compteurs de fonctionnement"""
+        return {
+            "records": self.records,
+            "writes": self.writes,
+            "rotations": self.rotations,
+            "file": self._path(self._file_index),
+            "size": self._size,
+        }
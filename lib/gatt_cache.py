@@ -0,0 +1,247 @@
+"""
+Cache des handles GATT des périphériques
+
+La découverte d'un service et de ses caractéristiques coûte plusieurs
+échanges radio à chaque connexion. Les handles trouvés à la première
+connexion sont gardés par adresse (en RAM et, si un fichier est donné,
+en flash) et les objets aioble sont reconstruits à partir d'eux lors des
+connexions suivantes.
+
+Si le périphérique expose la caractéristique Database Hash (0x2B2A), son
+handle est gardé avec les autres : à la reconnexion, une seule lecture
+suffit à vérifier que la base GATT n'a pas changé. Sinon, une erreur lors
+de l'utilisation des handles invalide l'entrée (voir invalidate()).
+
+Les objets sont reconstruits avec des attributs privés d'aioble
+(_value_handle, _start_handle, _end_handle et
+_register_with_connection()) : à revoir en cas de mise à jour d'aioble.
+"""
+
+import binascii
+import bluetooth
+import json
+from micropython import const
+from aioble.client import ClientService, ClientCharacteristic, ClientDescriptor
+
+_GATT_SERVICE_UUID = bluetooth.UUID(0x1801)
+_DATABASE_HASH_UUID = bluetooth.UUID(0x2B2A)
+_CCCD_UUID = bluetooth.UUID(0x2902)
+_FLAG_READ = const(0x02)
+_FLAG_NOTIFY = const(0x10)
+_CCCD_NOTIFY = b"\x01\x00"
+
+
+class GattCache:
+    """
+    Handles d'un service et de ses caractéristiques, par périphérique
+
+    Exemple :
+        cache = GattCache(_SERVICE_UUID, (_TEMP_UUID, _NAME_UUID), path="gatt_cache.json")
+        characteristics, cached = await cache.characteristics(connection)
+        await cache.subscribe(connection, characteristics[_TEMP_UUID])
+    """
+
+    def __init__(self, service_uuid, uuids, path=None, capacity=8):
+        """
+        Initialise le cache
+
+        Args:
+            service_uuid: Service à découvrir
+            uuids: Caractéristiques à découvrir dans ce service
+            path: Fichier de sauvegarde en flash (None = RAM seulement)
+            capacity: Nombre maximal de périphériques mémorisés
+        """
+        self.service_uuid = service_uuid
+        self.uuids = tuple(uuids)
+        self.path = path
+        self.capacity = capacity
+        # adresse (hex) -> [handle Database Hash, hash (hex), début service,
+        #   fin service, [[fin, handle valeur, propriétés, handle CCCD] ou None
+        #   pour chaque uuid]]
+        self._entries = {}
+        self._dirty = False
+
+        # Statistiques
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+        if path is not None:
+            self.load()
+
+    # === Persistance ===
+
+    def load(self):
+        """
+        Relit le fichier de sauvegarde
+
+        Un fichier absent ou illisible est ignoré ; une entrée mal formée
+        (fichier tronqué, modifié ou d'un autre format) est écartée et le
+        périphérique sera redécouvert.
+        """
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(entries, dict):
+            return
+        self._entries = {key: entry for key, entry in entries.items() if self._valid(entry)}
+        self._dirty = len(self._entries) != len(entries)
+
+    def _valid(self, entry):
+        """Vérifie la forme d'une entrée relue du fichier"""
+        if not isinstance(entry, list) or len(entry) != 5:
+            return False
+        hash_handle, db_hash, start, end, handles = entry
+        if not (isinstance(start, int) and isinstance(end, int)
+                and (hash_handle is None or isinstance(hash_handle, int))
+                and (db_hash is None or isinstance(db_hash, str))
+                and isinstance(handles, list) and len(handles) == len(self.uuids)):
+            return False
+        for h in handles:
+            if h is None:
+                continue
+            if not isinstance(h, list) or len(h) != 4:
+                return False
+            if not all(isinstance(v, int) for v in h[:3]):
+                return False
+            if h[3] is not None and not isinstance(h[3], int):
+                return False
+        return True
+
+    def save(self):
+        """Écrit le cache en flash s'il a changé depuis la dernière sauvegarde"""
+        if self.path is None or not self._dirty:
+            return
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self._entries, f)
+            self._dirty = False
+        except OSError as e:
+            print("GATT cache not saved:", e)
+
+    # === Entrées ===
+
+    @staticmethod
+    def _key(connection):
+        return connection.device.addr_hex()
+
+    def invalidate(self, connection):
+        """Oublie les handles d'un périphérique (base GATT modifiée)"""
+        if self._entries.pop(self._key(connection), None) is not None:
+            self.stale += 1
+            self._dirty = True
+            self.save()
+
+    def _store(self, key, entry):
+        if key not in self._entries and len(self._entries) >= self.capacity:
+            # Plus ancienne entrée insérée
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = entry
+        self._dirty = True
+        self.save()
+
+    # === Découverte ===
+
+    async def _read_hash(self, connection, handle):
+        """Valeur de la caractéristique Database Hash (hex), None si illisible"""
+        service = ClientService(connection, 1, 0xFFFF, _GATT_SERVICE_UUID)
+        characteristic = ClientCharacteristic(service, handle, handle, _FLAG_READ,
+                                              _DATABASE_HASH_UUID)
+        try:
+            return binascii.hexlify(await characteristic.read()).decode()
+        except Exception:
+            return None
+
+    async def _discover(self, connection):
+        """Découverte complète ; mémorise les handles trouvés"""
+        hash_handle = None
+        db_hash = None
+        gatt = await connection.service(_GATT_SERVICE_UUID)
+        if gatt is not None:
+            hash_char = await gatt.characteristic(_DATABASE_HASH_UUID)
+            if hash_char is not None:
+                hash_handle = hash_char._value_handle
+                db_hash = await self._read_hash(connection, hash_handle)
+
+        service = await connection.service(self.service_uuid)
+        if service is None:
+            raise OSError("service not found")
+        found = {}
+        handles = []
+        for uuid in self.uuids:
+            characteristic = await service.characteristic(uuid)
+            if characteristic is None:
+                handles.append(None)
+                continue
+            found[uuid] = characteristic
+            cccd_handle = None
+            if characteristic.properties & _FLAG_NOTIFY:
+                cccd = await characteristic.descriptor(_CCCD_UUID)
+                if cccd is not None:
+                    cccd_handle = cccd._value_handle
+            handles.append([characteristic._end_handle, characteristic._value_handle,
+                            characteristic.properties, cccd_handle])
+
+        self._store(self._key(connection), [hash_handle, db_hash, service._start_handle,
+                                            service._end_handle, handles])
+        return found
+
+    async def characteristics(self, connection):
+        """
+        Caractéristiques du service pour cette connexion
+
+        Les handles mémorisés sont utilisés s'ils existent et si le hash de
+        la base GATT (quand le périphérique l'expose) n'a pas changé ;
+        sinon la découverte complète est faite et mémorisée.
+
+        Returns:
+            (dict uuid -> caractéristique aioble, uuids absents omis ;
+            True si les handles viennent du cache)
+        """
+        entry = self._entries.get(self._key(connection))
+        if entry is not None:
+            hash_handle, db_hash, start, end, handles = entry
+            if hash_handle is None or await self._read_hash(connection, hash_handle) == db_hash:
+                self.hits += 1
+                service = ClientService(connection, start, end, self.service_uuid)
+                found = {}
+                for uuid, h in zip(self.uuids, handles):
+                    if h is not None:
+                        found[uuid] = ClientCharacteristic(service, h[0], h[1], h[2], uuid)
+                return found, True
+            self.stale += 1
+        self.misses += 1
+        return await self._discover(connection), False
+
+    async def subscribe(self, connection, characteristic, notify=True):
+        """
+        Active les notifications d'une caractéristique
+
+        Avec un handle CCCD mémorisé, le descripteur est écrit directement,
+        sans découverte des descripteurs.
+        """
+        entry = self._entries.get(self._key(connection))
+        cccd_handle = None
+        if entry is not None:
+            for uuid, h in zip(self.uuids, entry[4]):
+                if uuid == characteristic.uuid and h is not None:
+                    cccd_handle = h[3]
+        if cccd_handle is None:
+            await characteristic.subscribe(notify=notify)
+            return
+        # Comme subscribe() : les notifications arrivées avant le premier
+        # notified() doivent être transmises à la caractéristique
+        characteristic._register_with_connection()
+        cccd = ClientDescriptor(characteristic, cccd_handle, _CCCD_UUID)
+        await cccd.write(_CCCD_NOTIFY if notify else b"\x00\x00")
+
+    def stats(self):
+        """Compteurs de fonctionnement"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+        }
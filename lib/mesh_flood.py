@@ -0,0 +1,191 @@
+"""
+Inondation contrôlée du réseau maillé BLE
+
+Un relais ne réémet pas une trame dès sa réception : il attend un délai
+aléatoire et compte les copies de la même trame relayées entre-temps par
+ses voisins. S'il en a entendu assez, sa propre réémission est inutile et
+elle est supprimée (principe de Trickle, RFC 6206). Les trames dont le TTL
+est épuisé ne sont pas relayées.
+"""
+
+import urandom
+from array import array
+from time import ticks_ms, ticks_diff, ticks_add
+from mesh_frame import HEADER_SIZE, TAG_SIZE
+
+
+class FloodControl:
+    """
+    File de réémissions différées avec suppression des redondances
+
+    Exemple :
+        flood = FloodControl(DedupCache(64))
+        while True:
+            async with aioble.scan(flood.scan_time_ms(800), ...) as scanner:
+                async for result in scanner:
+                    ...
+                    if codec.decode(man):
+                        flood.receive(codec)
+            frame = flood.pop_due()
+            while frame is not None:
+                ...  # advertise(frame)
+                frame = flood.pop_due()
+    """
+
+    # Valeurs retournées par receive()
+    DUPLICATE = 0
+    QUEUED = 1
+    TTL_EXPIRED = 2
+    QUEUE_FULL = 3
+
+    def __init__(self, dedup, slots=8, min_delay_ms=50, max_delay_ms=400,
+                 redundancy=2, max_payload=8):
+        """
+        Initialise le contrôle d'inondation
+
+        Args:
+            dedup: Cache des trames déjà vues (DedupCache)
+            slots: Nombre de réémissions en attente au plus
+            min_delay_ms: Délai minimal avant réémission
+            max_delay_ms: Délai maximal avant réémission
+            redundancy: Nombre de copies entendues au-delà duquel la
+                réémission est supprimée (k de Trickle)
+            max_payload: Taille maximale du contenu des trames (octets)
+        """
+        self.dedup = dedup
+        self.slots = slots
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.redundancy = redundancy
+
+        self._frame_size = HEADER_SIZE + max_payload + TAG_SIZE
+        self._frames = bytearray(slots * self._frame_size)
+        self._frames_view = memoryview(self._frames)
+        self._length = array("B", [0] * slots)  # 0 = emplacement libre
+        self._src = array("H", [0] * slots)
+        self._seq = array("H", [0] * slots)
+        self._hop = array("B", [0] * slots)  # nombre de sauts de la copie reçue
+        self._due = array("L", [0] * slots)
+        self._heard = array("B", [0] * slots)
+
+        # Statistiques
+        self.queued = 0
+        self.sent = 0
+        self.suppressed = 0
+        self.expired = 0
+        self.dropped = 0
+
+    def _find(self, src, seq):
+        length = self._length
+        for k in range(self.slots):
+            if length[k] and self._src[k] == src and self._seq[k] == seq:
+                return k
+        return -1
+
+    def receive(self, codec, now=None):
+        """
+        Traite une trame décodée par codec
+
+        Args:
+            codec: MeshCodec sur lequel decode() vient de réussir
+            now: Date en ms (ticks_ms() par défaut)
+
+        Returns:
+            DUPLICATE, QUEUED, TTL_EXPIRED ou QUEUE_FULL
+        """
+        if now is None:
+            now = ticks_ms()
+        src = codec.src
+        seq = codec.seq
+        if self.dedup.check(src, seq, now):
+            # Seule une copie relayée par un voisin (plus de sauts que la
+            # nôtre) compte pour la suppression ; les répétitions de
+            # l'annonce de l'émetteur ont le même nombre de sauts
+            k = self._find(src, seq)
+            if k >= 0 and codec.hop > self._hop[k] and self._heard[k] < 255:
+                self._heard[k] += 1
+            return self.DUPLICATE
+        if codec.ttl == 0:
+            self.expired += 1
+            return self.TTL_EXPIRED
+
+        length = self._length
+        for k in range(self.slots):
+            if not length[k]:
+                break
+        else:
+            self.dropped += 1
+            return self.QUEUE_FULL
+
+        frame = codec.forward()
+        start = k * self._frame_size
+        self._frames_view[start:start + len(frame)] = frame
+        length[k] = len(frame)
+        self._src[k] = src
+        self._seq[k] = seq
+        self._hop[k] = codec.hop
+        self._heard[k] = 0
+        spread = self.max_delay_ms - self.min_delay_ms
+        delay = self.min_delay_ms + (urandom.getrandbits(16) % (spread + 1) if spread > 0 else 0)
+        self._due[k] = ticks_add(now, delay)
+        self.queued += 1
+        return self.QUEUED
+
+    def next_due_ms(self, now=None):
+        """Délai en ms avant la prochaine réémission, -1 si aucune en attente"""
+        if now is None:
+            now = ticks_ms()
+        best = -1
+        length = self._length
+        for k in range(self.slots):
+            if length[k]:
+                wait = ticks_diff(self._due[k], now)
+                if wait < 0:
+                    wait = 0
+                if best < 0 or wait < best:
+                    best = wait
+        return best
+
+    def scan_time_ms(self, default_ms, now=None):
+        """Durée du prochain scan : default_ms, raccourcie par la prochaine réémission"""
+        wait = self.next_due_ms(now)
+        if wait < 0 or wait > default_ms:
+            return default_ms
+        return max(wait, 1)
+
+    def pop_due(self, now=None):
+        """
+        Retire la prochaine réémission échue
+
+        Les trames entendues au moins redundancy fois pendant leur attente
+        sont abandonnées sans être réémises.
+
+        Returns:
+            memoryview sur la trame à réémettre (valide jusqu'au prochain
+            receive()), ou None
+        """
+        if now is None:
+            now = ticks_ms()
+        length = self._length
+        for k in range(self.slots):
+            n = length[k]
+            if not n or ticks_diff(self._due[k], now) > 0:
+                continue
+            length[k] = 0
+            if self._heard[k] >= self.redundancy:
+                self.suppressed += 1
+                continue
+            self.sent += 1
+            start = k * self._frame_size
+            return self._frames_view[start:start + n]
+        return None
+
+    def stats(self):
+        """Compteurs de fonctionnement"""
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "suppressed": self.suppressed,
+            "expired": self.expired,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,203 @@
+"""
+Trame binaire du réseau maillé BLE
+
+Remplace le JSON chiffré par XOR : la trame tient dans les données
+constructeur d'une annonce et porte un tag d'authentification.
+
+Format (little endian) :
+
+    magic   u8   MESH_MAGIC (version du format)
+    type    u8   type du contenu (TYPE_*)
+    src     u16  identifiant du nœud émetteur (node_id)
+    dst     u16  identifiant du destinataire (BROADCAST = tous)
+    seq     u16  numéro de séquence de l'émetteur
+    hop     u8   nombre de relais traversés
+    ttl     u8   nombre de relais encore autorisés
+    payload      contenu typé
+    tag     4 o  HMAC-SHA256 tronqué, calculé sur tout ce qui précède
+
+Le tag authentifie la trame (clé partagée) mais ne la chiffre pas : le
+contenu reste lisible par un observateur.
+"""
+
+import hashlib
+import struct
+from micropython import const
+
+MESH_MAGIC = const(0xA8)
+
+HEADER_FORMAT = "<BBHHHBB"
+HEADER_SIZE = const(10)
+TAG_SIZE = const(4)
+
+BROADCAST = const(0xFFFF)
+
+# Nombre de relais autorisés par défaut pour une nouvelle trame
+DEFAULT_TTL = const(4)
+
+# Types de contenu
+TYPE_RAW = const(0x00)
+TYPE_DISTANCE = const(0x01)  # int16, valeur de DISTANCE.read()
+
+_BLOCK_SIZE = const(64)
+
+
+def node_id(name):
+    """
+    Identifiant 16 bits d'un nœud, dérivé de son nom (CRC-16/CCITT)
+
+    Args:
+        name: Nom BLE du nœud (str ou bytes)
+
+    Returns:
+        Identifiant de 0 à 0xFFFE (BROADCAST est réservé)
+    """
+    if isinstance(name, str):
+        name = name.encode()
+    crc = 0xFFFF
+    for b in name:
+        crc ^= b << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    if crc == BROADCAST:
+        crc = 0
+    return crc
+
+
+class MeshCodec:
+    """
+    Encodage et décodage des trames dans des buffers préalloués
+
+    encode() écrit dans le buffer du codec et retourne une memoryview ;
+    decode() lit la trame reçue sans la copier et expose ses champs en
+    attributs (frame_type, src, dst, seq, hop, ttl, payload).
+
+    Exemple :
+        codec = MeshCodec(b"cle partagee")
+        frame = codec.encode_distance(me, relay, seq, 0, distance)
+        ...
+        if codec.decode(man_data) and codec.dst == me:
+            distance = codec.distance()
+    """
+
+    def __init__(self, key, max_payload=8):
+        """
+        Initialise le codec
+
+        Args:
+            key: Clé partagée par tous les nœuds (bytes, 64 octets au plus)
+            max_payload: Taille maximale du contenu en octets
+        """
+        if len(key) > _BLOCK_SIZE:
+            raise ValueError("mesh key too long")
+        key = key + bytes(_BLOCK_SIZE - len(key))
+        self._ipad = bytes(b ^ 0x36 for b in key)
+        self._opad = bytes(b ^ 0x5C for b in key)
+
+        self.buf = bytearray(HEADER_SIZE + max_payload + TAG_SIZE)
+        self._view = memoryview(self.buf)
+        self.max_payload = max_payload
+
+        self.frame_type = TYPE_RAW
+        self.src = 0
+        self.dst = 0
+        self.seq = 0
+        self.hop = 0
+        self.ttl = 0
+        self.payload = None
+
+    def _tag(self, data):
+        """HMAC-SHA256 de data, tronqué à TAG_SIZE octets"""
+        inner = hashlib.sha256(self._ipad)
+        inner.update(data)
+        outer = hashlib.sha256(self._opad)
+        outer.update(inner.digest())
+        return outer.digest()[:TAG_SIZE]
+
+    def _seal(self, length):
+        """Ajoute le tag après length octets et retourne la trame"""
+        view = self._view
+        view[length:length + TAG_SIZE] = self._tag(view[:length])
+        return view[:length + TAG_SIZE]
+
+    def encode(self, frame_type, src, dst, seq, hop, payload, ttl=DEFAULT_TTL):
+        """
+        Construit une trame dans le buffer du codec
+
+        Args:
+            frame_type: Type du contenu (TYPE_*)
+            src: Identifiant de l'émetteur
+            dst: Identifiant du destinataire
+            seq: Numéro de séquence (modulo 2^16)
+            hop: Nombre de relais traversés
+            payload: Contenu (bytes, bytearray ou memoryview)
+            ttl: Nombre de relais autorisés
+
+        Returns:
+            memoryview sur la trame, valide jusqu'au prochain encode()
+        """
+        n = len(payload)
+        if n > self.max_payload:
+            raise ValueError("mesh payload too large")
+        struct.pack_into(HEADER_FORMAT, self.buf, 0, MESH_MAGIC, frame_type,
+                         src, dst, seq & 0xFFFF, hop, ttl)
+        self._view[HEADER_SIZE:HEADER_SIZE + n] = payload
+        return self._seal(HEADER_SIZE + n)
+
+    def encode_distance(self, src, dst, seq, hop, distance, ttl=DEFAULT_TTL):
+        """Construit une trame TYPE_DISTANCE (distance en int16)"""
+        struct.pack_into(HEADER_FORMAT + "h", self.buf, 0, MESH_MAGIC, TYPE_DISTANCE,
+                         src, dst, seq & 0xFFFF, hop, ttl, distance)
+        return self._seal(HEADER_SIZE + 2)
+
+    def decode(self, data):
+        """
+        Vérifie et lit une trame reçue
+
+        Args:
+            data: Données constructeur reçues (bytes ou memoryview)
+
+        Returns:
+            True si la trame est valide (format et tag), les champs sont
+            alors disponibles en attributs
+        """
+        n = len(data)
+        if n < HEADER_SIZE + TAG_SIZE or data[0] != MESH_MAGIC:
+            return False
+        view = memoryview(data)
+        end = n - TAG_SIZE
+        if self._tag(view[:end]) != bytes(view[end:]):
+            return False
+        (_, self.frame_type, self.src, self.dst,
+         self.seq, self.hop, self.ttl) = struct.unpack_from(HEADER_FORMAT, view, 0)
+        self.payload = view[HEADER_SIZE:end]
+        return True
+
+    def distance(self):
+        """Distance d'une trame TYPE_DISTANCE décodée, None sinon"""
+        if self.frame_type != TYPE_DISTANCE or len(self.payload) != 2:
+            return None
+        return struct.unpack_from("h", self.payload, 0)[0]
+
+    def forward(self):
+        """
+        Prépare le relais de la dernière trame décodée (hop + 1, ttl - 1)
+
+        Returns:
+            memoryview sur la trame re-signée dans le buffer du codec
+
+        Raises:
+            ValueError si le TTL de la trame est épuisé
+        """
+        n = len(self.payload)
+        if n > self.max_payload:
+            raise ValueError("mesh payload too large")
+        if self.ttl == 0:
+            raise ValueError("mesh frame TTL expired")
+        struct.pack_into(HEADER_FORMAT, self.buf, 0, MESH_MAGIC, self.frame_type,
+                         self.src, self.dst, self.seq, min(self.hop + 1, 255), self.ttl - 1)
+        self._view[HEADER_SIZE:HEADER_SIZE + n] = self.payload
+        return self._seal(HEADER_SIZE + n)
@@ -0,0 +1,164 @@
+"""
+Table des voisins BLE récemment vus
+
+Remplace le dictionnaire {nom: (valeur, last_seen_ms)} trié à chaque
+rafraîchissement de l'écran : la table a une capacité fixe, se met à
+jour en O(1) et se parcourt du plus récent au plus ancien sans tri.
+"""
+
+from array import array
+from time import ticks_ms, ticks_diff
+
+
+class NeighborTable:
+    """
+    Voisins classés par date de dernière réception (LRU)
+
+    Quand la table est pleine, le voisin vu le moins récemment est
+    remplacé ; les voisins plus vieux que max_age_ms sont oubliés.
+
+    Exemple :
+        neighbors = NeighborTable(capacity=16, max_age_ms=10000)
+        neighbors.update(name, distance)
+        for name, distance in neighbors.recent(4):
+            display.text(f"{name[-4:]}: {distance}", ...)
+    """
+
+    def __init__(self, capacity=16, max_age_ms=10000):
+        """
+        Initialise la table
+
+        Args:
+            capacity: Nombre maximal de voisins
+            max_age_ms: Durée après laquelle un voisin silencieux est
+                oublié (None = jamais)
+        """
+        self.capacity = capacity
+        self.max_age_ms = max_age_ms
+        self._index = {}  # nom -> emplacement
+        self._names = [None] * capacity
+        self._values = array("l", [0] * capacity)
+        self._stamps = array("L", [0] * capacity)
+        # Liste doublement chaînée, du plus récent au plus ancien
+        self._prev = array("b" if capacity < 128 else "h", [-1] * capacity)
+        self._next = array("b" if capacity < 128 else "h", [-1] * capacity)
+        self._newest = -1
+        self._oldest = -1
+        # Pile des emplacements libres
+        self._free = array("b" if capacity < 128 else "h", range(capacity - 1, -1, -1))
+        self._free_count = capacity
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def _unlink(self, i):
+        prev = self._prev[i]
+        nxt = self._next[i]
+        if prev >= 0:
+            self._next[prev] = nxt
+        else:
+            self._newest = nxt
+        if nxt >= 0:
+            self._prev[nxt] = prev
+        else:
+            self._oldest = prev
+
+    def _push_newest(self, i):
+        self._prev[i] = -1
+        self._next[i] = self._newest
+        if self._newest >= 0:
+            self._prev[self._newest] = i
+        self._newest = i
+        if self._oldest < 0:
+            self._oldest = i
+
+    def _remove_oldest(self):
+        """Libère l'emplacement du voisin le plus ancien et le retourne"""
+        i = self._oldest
+        self._unlink(i)
+        del self._index[self._names[i]]
+        self._names[i] = None
+        return i
+
+    def update(self, name, value, now=None):
+        """
+        Enregistre une réception
+
+        Args:
+            name: Nom du voisin
+            value: Valeur reçue (entier)
+            now: Date en ms (ticks_ms() par défaut)
+        """
+        if now is None:
+            now = ticks_ms()
+        i = self._index.get(name, -1)
+        if i >= 0:
+            if i != self._newest:
+                self._unlink(i)
+                self._push_newest(i)
+        else:
+            if self._free_count:
+                self._free_count -= 1
+                i = self._free[self._free_count]
+            else:
+                i = self._remove_oldest()
+            self._names[i] = name
+            self._index[name] = i
+            self._push_newest(i)
+        self._values[i] = value
+        self._stamps[i] = now
+
+    def get(self, name, default=None):
+        """Dernière valeur reçue d'un voisin"""
+        i = self._index.get(name, -1)
+        if i < 0:
+            return default
+        return self._values[i]
+
+    def age_ms(self, name, now=None):
+        """Temps écoulé depuis la dernière réception d'un voisin, ou None"""
+        i = self._index.get(name, -1)
+        if i < 0:
+            return None
+        if now is None:
+            now = ticks_ms()
+        return ticks_diff(now, self._stamps[i])
+
+    def purge(self, now=None):
+        """
+        Oublie les voisins plus vieux que max_age_ms
+
+        Seuls les voisins expirés sont visités (depuis le plus ancien).
+
+        Returns:
+            Nombre de voisins oubliés
+        """
+        if self.max_age_ms is None:
+            return 0
+        if now is None:
+            now = ticks_ms()
+        removed = 0
+        while self._oldest >= 0 and ticks_diff(now, self._stamps[self._oldest]) >= self.max_age_ms:
+            self._free[self._free_count] = self._remove_oldest()
+            self._free_count += 1
+            removed += 1
+        return removed
+
+    def recent(self, k, now=None):
+        """
+        Parcourt les k voisins les plus récents, du plus récent au plus ancien
+
+        Les voisins expirés sont d'abord oubliés.
+
+        Yields:
+            (nom, valeur)
+        """
+        self.purge(now)
+        i = self._newest
+        while i >= 0 and k > 0:
+            yield self._names[i], self._values[i]
+            i = self._next[i]
+            k -= 1
@@ -0,0 +1,212 @@
+"""
+Politique d'énergie adaptative pour la radio BLE
+
+Choisit l'intervalle d'annonce et le rapport cyclique du scan (fenêtre,
+intervalle, durée des créneaux et pause entre eux) d'un RadioScheduler à
+partir de la charge de la batterie et du courant moyen (jauge BQ27441),
+et du trafic observé. Une batterie faible ou un courant trop élevé
+allongent les intervalles (plus d'autonomie, plus de latence) ; un trafic
+soutenu les raccourcit tant que la batterie le permet.
+"""
+
+import asyncio
+from time import ticks_ms, ticks_diff
+
+
+# Niveaux, du plus réactif au plus économe :
+# (nom, intervalle d'annonce µs, intervalle de scan µs, fenêtre de scan µs,
+#  créneau de scan ms, pause entre créneaux ms)
+# Chaque créneau relance le scan, qui commence par une fenêtre : le créneau
+# est un multiple de l'intervalle, sinon l'intervalle réel serait celui des
+# créneaux. Rapport cyclique effectif (voir scan_duty()) : 100 %, 30 %, 3 %, 1 %.
+POWER_LEVELS = (
+    ("PERF", 40_000, 30_000, 30_000, 300, 0),
+    ("BALANCED", 150_000, 100_000, 30_000, 300, 0),
+    ("SAVER", 500_000, 300_000, 30_000, 300, 700),
+    ("CRITICAL", 1_000_000, 1_000_000, 30_000, 1000, 2000),
+)
+
+
+def scan_duty(level):
+    """
+    Rapport cyclique effectif du scan pour une ligne de POWER_LEVELS
+
+    Returns:
+        Fraction du temps pendant laquelle la radio écoute (0 à 1)
+    """
+    _, _, interval_us, window_us, slot_ms, idle_ms = level
+    # Fenêtres commencées pendant un créneau (la première à son début)
+    windows = (slot_ms * 1000 + interval_us - 1) // interval_us
+    listen_us = min(windows * window_us, slot_ms * 1000)
+    return listen_us / ((slot_ms + idle_ms) * 1000)
+
+
+def hysteresis_level(value, thresholds, level, margin):
+    """
+    Niveau correspondant à value, avec hystérésis
+
+    Args:
+        value: Valeur mesurée
+        thresholds: Seuils décroissants ; le niveau est le nombre de seuils
+            au-dessus de value
+        level: Niveau actuel
+        margin: Marge à dépasser au-dessus d'un seuil pour remonter
+
+    Returns:
+        Nouveau niveau (0 = valeur au-dessus de tous les seuils)
+    """
+    new = level
+    while new > 0 and value >= thresholds[new - 1] + margin:
+        new -= 1
+    while new < len(thresholds) and value < thresholds[new]:
+        new += 1
+    return new
+
+
+class PowerPolicy:
+    """
+    Adapte les paramètres radio à la batterie et au trafic
+
+    Trois contraintes sont combinées, la plus économe l'emporte :
+
+    * charge (state_of_charge) : sous soc_thresholds, le niveau est
+      plafonné ; il faut dépasser le seuil de soc_margin pour remonter ;
+    * trafic (trames par seconde, moyenne glissante) : un trafic soutenu
+      demande un niveau réactif immédiatement, un trafic faible ne relâche
+      le niveau qu'après hold_ms ;
+    * courant moyen : au-delà de current_budget_ma, un niveau de plus.
+
+    Exemple :
+        policy = PowerPolicy(fg)
+        asyncio.create_task(policy.run(radio))
+        ...
+        policy.note_traffic()  # à chaque trame utile reçue
+    """
+
+    def __init__(self, fuel_gauge=None, soc_thresholds=(60, 30, 10), soc_margin=5,
+                 traffic_thresholds=(1.0, 0.1), hold_ms=30000,
+                 current_budget_ma=None, levels=POWER_LEVELS):
+        """
+        Initialise la politique
+
+        Args:
+            fuel_gauge: Jauge BQ27441 (fg de pins.py), None sans batterie
+            soc_thresholds: Seuils de charge décroissants en %, un par
+                niveau au-delà du premier
+            soc_margin: Hystérésis sur la charge en %
+            traffic_thresholds: Seuils de trafic décroissants en trames/s
+            hold_ms: Durée minimale avant de relâcher le niveau après un
+                trafic soutenu
+            current_budget_ma: Courant moyen maximal en mA (None = ignoré)
+            levels: Table des niveaux (voir POWER_LEVELS)
+        """
+        self.fuel_gauge = fuel_gauge
+        self.soc_thresholds = soc_thresholds
+        self.soc_margin = soc_margin
+        self.traffic_thresholds = traffic_thresholds
+        self.hold_ms = hold_ms
+        self.current_budget_ma = current_budget_ma
+        self.levels = levels
+
+        self.level = 0
+        self.soc = None
+        self.current_ma = None
+        self.rate = 0.0
+        self._soc_level = 0
+        self._traffic_level = 0
+        self._traffic_since = ticks_ms()
+        self._traffic = 0
+        self._last_sent = 0
+        self._last_update = ticks_ms()
+
+    def note_traffic(self, count=1):
+        """Signale des trames utiles (reçues ou à relayer)"""
+        self._traffic += count
+
+    def _read_gauge(self):
+        """Lit la jauge ; garde les dernières valeurs en cas d'erreur I2C"""
+        if self.fuel_gauge is None:
+            return
+        try:
+            self.soc = self.fuel_gauge.state_of_charge()
+            self.current_ma = abs(self.fuel_gauge.current_average())
+        except OSError:
+            pass
+
+    def update(self, radio=None, now=None):
+        """
+        Réévalue le niveau
+
+        Args:
+            radio: RadioScheduler à reconfigurer ; ses trames émises
+                comptent dans le trafic
+            now: Date en ms (ticks_ms() par défaut)
+
+        Returns:
+            True si le niveau a changé
+        """
+        if now is None:
+            now = ticks_ms()
+        dt_ms = ticks_diff(now, self._last_update)
+        self._last_update = now
+
+        # Trafic : moyenne glissante (poids 1/4) en trames par seconde
+        traffic = self._traffic
+        self._traffic = 0
+        if radio is not None:
+            traffic += radio.sent - self._last_sent
+            self._last_sent = radio.sent
+        if dt_ms > 0:
+            self.rate += (traffic * 1000 / dt_ms - self.rate) / 4
+
+        wanted = 0
+        for threshold in self.traffic_thresholds:
+            if self.rate < threshold:
+                wanted += 1
+        if wanted <= self._traffic_level:
+            # Plus réactif : immédiat
+            self._traffic_level = wanted
+            self._traffic_since = now
+        elif ticks_diff(now, self._traffic_since) >= self.hold_ms:
+            # Plus économe : après hold_ms sans trafic soutenu
+            self._traffic_level = wanted
+            self._traffic_since = now
+
+        self._read_gauge()
+        if self.soc is not None:
+            self._soc_level = hysteresis_level(self.soc, self.soc_thresholds,
+                                               self._soc_level, self.soc_margin)
+
+        level = max(self._soc_level, self._traffic_level)
+        if (self.current_budget_ma is not None and self.current_ma is not None
+                and self.current_ma > self.current_budget_ma):
+            level += 1
+        level = min(level, len(self.levels) - 1)
+
+        if level == self.level:
+            return False
+        self.level = level
+        if radio is not None:
+            self.apply(radio)
+        return True
+
+    def apply(self, radio):
+        """Applique les paramètres du niveau courant au RadioScheduler"""
+        _, adv_interval_us, scan_interval_us, scan_window_us, scan_slot_ms, idle_ms = \
+            self.levels[self.level]
+        radio.configure(adv_interval_us=adv_interval_us, scan_interval_us=scan_interval_us,
+                        scan_window_us=scan_window_us, scan_slot_ms=scan_slot_ms,
+                        idle_ms=idle_ms)
+
+    def name(self):
+        """Nom du niveau courant"""
+        return self.levels[self.level][0]
+
+    async def run(self, radio, period_ms=5000):
+        """Réévalue périodiquement le niveau et reconfigure la radio"""
+        self.apply(radio)
+        while True:
+            await asyncio.sleep_ms(period_ms)
+            if self.update(radio):
+                print(f"Power level: {self.name()} (soc={self.soc}%, "
+                      f"I={self.current_ma} mA, rate={self.rate:.2f}/s)")
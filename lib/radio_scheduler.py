@@ -0,0 +1,330 @@
+"""
+Ordonnanceur radio BLE : annonces et scan entrelacés
+
+Les exemples alternaient un scan, une pause, une annonce puis une autre
+pause : le nœud était sourd pendant qu'il annonçait, muet pendant qu'il
+scannait, et inactif pendant les pauses. L'ordonnanceur possède la radio
+et enchaîne des créneaux courts sans pause ; les tâches de l'application
+ne voient que deux files :
+
+* émission : send() pour une trame ponctuelle, set_beacon() pour l'annonce
+  de fond répétée quand la file est vide ;
+* réception : await receive() retourne les trames reçues qui passent le
+  filtre de nom.
+
+En mode concurrent (par défaut), le contrôleur continue d'annoncer pendant
+le scan. En mode alterné, chaque cycle comporte un créneau d'annonce puis
+un créneau de scan ; l'ordonnanceur y passe si le scan échoue plusieurs
+fois de suite en mode concurrent.
+"""
+
+import aioble
+import asyncio
+import bluetooth
+from array import array
+from ble_advertising import ADV_MAX_LEN, AdvParser
+from micropython import const
+
+# Échecs de scan consécutifs en mode concurrent avant de passer en mode alterné
+_MAX_SCAN_FAILURES = const(3)
+
+
+class RadioScheduler:
+    """
+    Propriétaire unique de la radio BLE d'un nœud
+
+    Exemple :
+        radio = RadioScheduler(name_prefix=b"STeaMi")
+        radio.set_beacon(advertising_payload(name, data))
+        asyncio.create_task(radio.run())
+        while True:
+            adv_data = await radio.receive()
+            ...
+    """
+
+    def __init__(self, scan_slot_ms=300, adv_slot_ms=100, idle_ms=0, adv_interval_us=40_000,
+                 scan_interval_us=30_000, scan_window_us=30_000, active=True,
+                 concurrent=True, name_prefix=None, rx_depth=16, tx_depth=8):
+        """
+        Initialise l'ordonnanceur
+
+        Args:
+            scan_slot_ms: Durée d'un créneau de scan
+            adv_slot_ms: Durée d'un créneau d'annonce (mode non concurrent)
+                et durée minimale d'affichage d'une trame send()
+            idle_ms: Pause sans scan après chaque créneau de scan (l'annonce
+                continue en mode concurrent)
+            adv_interval_us: Intervalle entre deux annonces
+            scan_interval_us: Intervalle de scan
+            scan_window_us: Fenêtre de scan
+            active: Scan actif (demande les réponses de scan)
+            concurrent: Annoncer pendant le scan si le contrôleur l'accepte
+            name_prefix: Préfixe de nom (bytes) des trames à garder, None
+                pour tout garder
+            rx_depth: Nombre de trames reçues en attente au plus
+            tx_depth: Nombre de trames à émettre en attente au plus
+        """
+        self.scan_slot_ms = scan_slot_ms
+        self.adv_slot_ms = adv_slot_ms
+        self.idle_ms = idle_ms
+        self.adv_interval_us = adv_interval_us
+        self.scan_interval_us = scan_interval_us
+        self.scan_window_us = scan_window_us
+        self.active = active
+        self.concurrent = concurrent
+        self.name_prefix = name_prefix
+
+        self._ble = bluetooth.BLE()
+        self._ble.active(True)
+        self._parser = AdvParser()
+
+        # File de réception : anneau de trames de ADV_MAX_LEN octets
+        self._rx = bytearray(rx_depth * ADV_MAX_LEN)
+        self._rx_view = memoryview(self._rx)
+        self._rx_len = array("B", [0] * rx_depth)
+        self._rx_rssi = array("b", [0] * rx_depth)
+        self._rx_depth = rx_depth
+        self._rx_head = 0    # prochaine trame à lire
+        self._rx_count = 0
+        self._rx_busy = False  # trame retournée par receive() en cours d'usage
+        self._rx_event = asyncio.Event()
+        self.rssi = 0
+
+        # File d'émission : anneau de trames + nombre de cycles restants
+        self._tx = bytearray(tx_depth * ADV_MAX_LEN)
+        self._tx_view = memoryview(self._tx)
+        self._tx_len = array("B", [0] * tx_depth)
+        self._tx_cycles = array("B", [0] * tx_depth)
+        self._tx_depth = tx_depth
+        self._tx_head = 0
+        self._tx_count = 0
+
+        # Annonce de fond
+        self._beacon = bytearray(ADV_MAX_LEN)
+        self._beacon_len = 0
+
+        # Annonce actuellement programmée dans le contrôleur
+        self._on_air = None
+        self._changed = True
+        self._scan_failures = 0  # échecs de scan consécutifs (mode concurrent)
+
+        # Statistiques
+        self.received = 0
+        self.rx_dropped = 0
+        self.sent = 0
+        self.tx_dropped = 0
+        self.scan_errors = 0
+        self.cycles = 0
+
+    def configure(self, adv_interval_us=None, scan_interval_us=None,
+                  scan_window_us=None, scan_slot_ms=None, idle_ms=None):
+        """
+        Modifie les paramètres radio en cours de fonctionnement
+
+        Les paramètres de scan s'appliquent au créneau suivant ; l'annonce
+        en cours est reprogrammée avec le nouvel intervalle.
+        """
+        if adv_interval_us is not None and adv_interval_us != self.adv_interval_us:
+            self.adv_interval_us = adv_interval_us
+            self._changed = True
+        if scan_interval_us is not None:
+            self.scan_interval_us = scan_interval_us
+        if scan_window_us is not None:
+            self.scan_window_us = scan_window_us
+        if scan_slot_ms is not None:
+            self.scan_slot_ms = scan_slot_ms
+        if idle_ms is not None:
+            self.idle_ms = idle_ms
+
+    # === Emission ===
+
+    def set_beacon(self, adv_data):
+        """
+        Définit l'annonce de fond (copiée), None pour ne rien annoncer
+
+        Elle est émise en continu quand aucune trame send() n'est en attente.
+        """
+        if adv_data is None:
+            self._beacon_len = 0
+        else:
+            n = len(adv_data)
+            if n > ADV_MAX_LEN:
+                raise ValueError("advertising payload too large")
+            self._beacon[:n] = adv_data
+            self._beacon_len = n
+        if self._tx_count == 0:
+            self._changed = True
+
+    def send(self, adv_data, cycles=1, replace=False):
+        """
+        Ajoute une trame ponctuelle à la file d'émission (copiée)
+
+        Args:
+            adv_data: Trame d'advertising complète
+            cycles: Nombre de cycles pendant lesquels la trame est annoncée
+            replace: Remplacer les trames en attente (commande dont seule
+                la dernière valeur compte) au lieu de s'ajouter à la file
+
+        Returns:
+            False si la file est pleine (trame perdue)
+        """
+        n = len(adv_data)
+        if n > ADV_MAX_LEN:
+            raise ValueError("advertising payload too large")
+        if replace and self._tx_count:
+            self._tx_count = 0
+            self._changed = True
+        if self._tx_count >= self._tx_depth:
+            self.tx_dropped += 1
+            return False
+        k = (self._tx_head + self._tx_count) % self._tx_depth
+        start = k * ADV_MAX_LEN
+        self._tx_view[start:start + n] = adv_data
+        self._tx_len[k] = n
+        self._tx_cycles[k] = max(1, min(cycles, 255))
+        self._tx_count += 1
+        if self._tx_count == 1:
+            self._changed = True
+        return True
+
+    def pending(self):
+        """Nombre de trames en attente d'émission"""
+        return self._tx_count
+
+    def _current_tx(self):
+        """Trame à annoncer pendant ce cycle (memoryview) ou None"""
+        if self._tx_count:
+            k = self._tx_head
+            start = k * ADV_MAX_LEN
+            return self._tx_view[start:start + self._tx_len[k]]
+        if self._beacon_len:
+            return memoryview(self._beacon)[:self._beacon_len]
+        return None
+
+    def _end_tx_cycle(self):
+        """Décompte le cycle de la trame ponctuelle en cours"""
+        if not self._tx_count:
+            return
+        k = self._tx_head
+        self._tx_cycles[k] -= 1
+        if self._tx_cycles[k] == 0:
+            self._tx_head = (k + 1) % self._tx_depth
+            self._tx_count -= 1
+            self.sent += 1
+            self._changed = True
+
+    def _advertise(self, adv_data):
+        """Programme l'annonce dans le contrôleur (None pour arrêter)"""
+        if adv_data is None:
+            if self._on_air is not None:
+                self._ble.gap_advertise(None)
+                self._on_air = None
+            return
+        self._ble.gap_advertise(self.adv_interval_us, adv_data=adv_data, connectable=False)
+        self._on_air = adv_data
+
+    # === Réception ===
+
+    def _push_rx(self, adv_data, rssi):
+        """Copie une trame reçue dans la file, si elle passe le filtre"""
+        if self.name_prefix is not None:
+            parser = self._parser
+            if not parser.parse(adv_data) or not parser.name_startswith(self.name_prefix):
+                return
+        # Un emplacement est réservé à la trame en cours de lecture
+        capacity = self._rx_depth - 1 if self._rx_busy else self._rx_depth
+        if self._rx_count >= capacity:
+            self.rx_dropped += 1
+            return
+        n = min(len(adv_data), ADV_MAX_LEN)
+        k = (self._rx_head + self._rx_count + (1 if self._rx_busy else 0)) % self._rx_depth
+        start = k * ADV_MAX_LEN
+        self._rx_view[start:start + n] = memoryview(adv_data)[:n]
+        self._rx_len[k] = n
+        self._rx_rssi[k] = rssi
+        self._rx_count += 1
+        self.received += 1
+        self._rx_event.set()
+
+    async def receive(self):
+        """
+        Attend la prochaine trame reçue
+
+        Returns:
+            memoryview sur la trame, valide jusqu'au prochain appel ; le
+            RSSI de la trame est dans l'attribut rssi
+        """
+        if self._rx_busy:
+            # Libère la trame retournée au dernier appel
+            self._rx_head = (self._rx_head + 1) % self._rx_depth
+            self._rx_busy = False
+        while not self._rx_count:
+            self._rx_event.clear()
+            await self._rx_event.wait()
+        k = self._rx_head
+        self._rx_count -= 1
+        self._rx_busy = True
+        self.rssi = self._rx_rssi[k]
+        start = k * ADV_MAX_LEN
+        return self._rx_view[start:start + self._rx_len[k]]
+
+    # === Boucle radio ===
+
+    async def _scan_slot(self):
+        async with aioble.scan(self.scan_slot_ms, interval_us=self.scan_interval_us,
+                               window_us=self.scan_window_us, active=self.active) as scanner:
+            async for result in scanner:
+                self._push_rx(result.adv_data, result.rssi)
+
+    async def run(self):
+        """Boucle de l'ordonnanceur, à lancer dans une tâche"""
+        while True:
+            self.cycles += 1
+            adv_data = self._current_tx()
+            if self.concurrent:
+                # L'annonce reste active pendant le scan : elle n'est
+                # reprogrammée que si la trame change
+                if self._changed or (self._on_air is None) != (adv_data is None):
+                    self._changed = False
+                    self._advertise(adv_data)
+            elif adv_data is not None:
+                self._changed = False
+                self._advertise(adv_data)
+                await asyncio.sleep_ms(self.adv_slot_ms)
+                self._advertise(None)
+
+            try:
+                await self._scan_slot()
+            except OSError:
+                if not self.concurrent:
+                    raise
+                # Échec du scan pendant l'annonce : l'annonce est coupée pour
+                # ce cycle seulement (elle est reprogrammée au suivant). Le
+                # mode alterné n'est adopté qu'après plusieurs échecs de
+                # suite, un refus isolé du contrôleur pouvant être passager.
+                self._advertise(None)
+                self.scan_errors += 1
+                self._scan_failures += 1
+                if self._scan_failures >= _MAX_SCAN_FAILURES:
+                    self.concurrent = False
+                continue
+            self._scan_failures = 0
+            self._end_tx_cycle()
+            if self.idle_ms:
+                await asyncio.sleep_ms(self.idle_ms)
+
+    def stop(self):
+        """Arrête l'annonce en cours (la tâche run() doit être annulée à part)"""
+        self._advertise(None)
+
+    def stats(self):
+        """Compteurs de fonctionnement"""
+        return {
+            "received": self.received,
+            "rx_dropped": self.rx_dropped,
+            "sent": self.sent,
+            "tx_dropped": self.tx_dropped,
+            "cycles": self.cycles,
+            "scan_errors": self.scan_errors,
+            "concurrent": self.concurrent,
+        }
@@ -0,0 +1,122 @@
+"""
+Format de lot d'échantillons horodatés pour les notifications GATT
+
+Au lieu d'une notification (ou d'une lecture) par mesure, le périphérique
+accumule plusieurs mesures et les envoie dans une seule notification :
+
+    octet 0     : version du format (BATCH_VERSION)
+    octet 1     : nombre n d'échantillons
+    octets 2-5  : date du premier échantillon en ms (uint32, little-endian)
+    puis n fois : écart à la date du premier en ms (uint16)
+                  valeur (int16)
+
+Un lot tient dans une notification si sa taille ne dépasse pas MTU - 3
+(20 octets avec le MTU par défaut de 23, soit 3 échantillons).
+"""
+
+import struct
+from micropython import const
+from time import ticks_ms, ticks_diff
+
+BATCH_VERSION = const(1)
+HEADER_FORMAT = "<BBI"
+HEADER_SIZE = const(6)
+SAMPLE_FORMAT = "<Hh"
+SAMPLE_SIZE = const(4)
+
+
+def batch_capacity(mtu=23):
+    """Nombre maximal d'échantillons par notification pour un MTU donné"""
+    return min((mtu - 3 - HEADER_SIZE) // SAMPLE_SIZE, 255)
+
+
+class SampleBatch:
+    """
+    Lot d'échantillons en cours de remplissage (côté périphérique)
+
+    Le tampon est alloué une fois ; view() retourne le lot encodé.
+
+    Exemple :
+        batch = SampleBatch(batch_capacity())
+        if batch.add(distance):
+            characteristic.write(batch.view(), send_update=True)
+            batch.clear()
+    """
+
+    def __init__(self, capacity=3):
+        """
+        Initialise le lot
+
+        Args:
+            capacity: Nombre d'échantillons par lot
+        """
+        if not 0 < capacity < 256:
+            raise ValueError("invalid capacity")
+        self.capacity = capacity
+        self.buf = bytearray(HEADER_SIZE + capacity * SAMPLE_SIZE)
+        self._view = memoryview(self.buf)
+        self.count = 0
+        self._base = 0
+
+    def clear(self):
+        """Vide le lot"""
+        self.count = 0
+
+    def add(self, value, now=None):
+        """
+        Ajoute un échantillon
+
+        Args:
+            value: Valeur (int16, bornée)
+            now: Date en ms (ticks_ms() par défaut)
+
+        Returns:
+            True si le lot est plein
+        """
+        if now is None:
+            now = ticks_ms()
+        if self.count >= self.capacity:
+            raise ValueError("batch full")
+        if self.count == 0:
+            self._base = now
+        delta = ticks_diff(now, self._base)
+        if delta > 0xFFFF:
+            delta = 0xFFFF
+        value = max(-32768, min(32767, int(value)))
+        struct.pack_into(SAMPLE_FORMAT, self.buf, HEADER_SIZE + self.count * SAMPLE_SIZE,
+                         delta, value)
+        self.count += 1
+        return self.count >= self.capacity
+
+    def view(self):
+        """Lot encodé (memoryview sur le tampon interne)"""
+        struct.pack_into(HEADER_FORMAT, self.buf, 0, BATCH_VERSION, self.count,
+                         self._base & 0xFFFFFFFF)
+        return self._view[:HEADER_SIZE + self.count * SAMPLE_SIZE]
+
+
+def iter_batch(data):
+    """
+    Parcourt les échantillons d'un lot reçu
+
+    Args:
+        data: Valeur de la notification
+
+    Yields:
+        (date en ms, valeur)
+
+    Raises:
+        ValueError: Version inconnue ou taille incohérente
+    """
+    if len(data) < HEADER_SIZE:
+        raise ValueError("batch too short")
+    version, count, base = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if version != BATCH_VERSION:
+        raise ValueError("unknown batch version")
+    if len(data) < HEADER_SIZE + count * SAMPLE_SIZE:
+        raise ValueError("truncated batch")
+    offset = HEADER_SIZE
+    for _ in range(count):
+        delta, value = struct.unpack_from(SAMPLE_FORMAT, data, offset)
+        offset += SAMPLE_SIZE
+        yield (base + delta) & 0xFFFFFFFF, value
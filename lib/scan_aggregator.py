@@ -0,0 +1,130 @@
+"""
+Agrégation des résultats de scan BLE par adresse
+
+Un appareil annonce plusieurs fois par seconde : au lieu de garder chaque
+résultat puis de dédoublonner, les résultats d'une même adresse sont
+fusionnés à la volée. La mémoire utilisée dépend du nombre d'appareils
+distincts (borné par capacity), pas du nombre d'annonces reçues.
+"""
+
+from array import array
+
+
+class ScanAggregator:
+    """
+    Appareils vus pendant un scan, avec statistiques de RSSI
+
+    Les appareils sont numérotés dans l'ordre de découverte ; le résultat
+    gardé pour chacun est le plus récent.
+
+    Exemple :
+        found = ScanAggregator(capacity=32)
+        async with aioble.scan(1000) as scanner:
+            async for result in scanner:
+                if found.add(result):
+                    print("Found:", result.name())
+        for i in range(len(found)):
+            print(found[i].name(), found.rssi_avg(i))
+    """
+
+    def __init__(self, capacity=32):
+        """
+        Initialise l'agrégateur
+
+        Args:
+            capacity: Nombre maximal d'appareils distincts ; au-delà, les
+                nouveaux appareils sont ignorés (compteur dropped)
+        """
+        self.capacity = capacity
+        self._index = {}  # adresse (bytes) -> rang
+        self._results = [None] * capacity
+        self._count = array("L", [0] * capacity)
+        self._rssi_min = array("b", [0] * capacity)
+        self._rssi_max = array("b", [0] * capacity)
+        self._rssi_sum = array("l", [0] * capacity)
+        self._len = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, addr):
+        """Adresse (bytes) déjà vue"""
+        return addr in self._index
+
+    def __getitem__(self, i):
+        """Dernier résultat de scan du i-ème appareil découvert"""
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return self._results[i]
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self._results[i]
+
+    def add(self, result, addr=None, rssi=None):
+        """
+        Fusionne un résultat de scan
+
+        Args:
+            result: Résultat aioble (ou tout objet à garder pour l'appareil)
+            addr: Adresse de l'appareil (result.device.addr par défaut)
+            rssi: RSSI reçu (result.rssi par défaut)
+
+        Returns:
+            True si l'appareil est nouveau
+        """
+        if addr is None:
+            addr = result.device.addr
+        if rssi is None:
+            rssi = result.rssi
+        i = self._index.get(addr, -1)
+        if i >= 0:
+            self._results[i] = result
+            self._count[i] += 1
+            self._rssi_sum[i] += rssi
+            if rssi < self._rssi_min[i]:
+                self._rssi_min[i] = rssi
+            elif rssi > self._rssi_max[i]:
+                self._rssi_max[i] = rssi
+            return False
+
+        if self._len >= self.capacity:
+            self.dropped += 1
+            return False
+        i = self._len
+        self._len += 1
+        self._index[addr] = i
+        self._results[i] = result
+        self._count[i] = 1
+        self._rssi_sum[i] = rssi
+        self._rssi_min[i] = rssi
+        self._rssi_max[i] = rssi
+        return True
+
+    def index(self, addr):
+        """Rang de l'appareil d'adresse addr, -1 s'il n'a pas été vu"""
+        return self._index.get(addr, -1)
+
+    def count(self, i):
+        """Nombre de résultats reçus du i-ème appareil"""
+        return self._count[i]
+
+    def rssi_min(self, i):
+        return self._rssi_min[i]
+
+    def rssi_max(self, i):
+        return self._rssi_max[i]
+
+    def rssi_avg(self, i):
+        """RSSI moyen du i-ème appareil, arrondi à l'entier"""
+        n = self._count[i]
+        return (self._rssi_sum[i] + n // 2) // n if n else 0
+
+    def clear(self):
+        """Oublie tous les appareils (les tableaux sont réutilisés)"""
+        self._index.clear()
+        for i in range(self._len):
+            self._results[i] = None
+        self._len = 0
+        self.dropped = 0
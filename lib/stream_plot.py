@@ -0,0 +1,201 @@
+"""
+Courbe défilante pour écran framebuf
+
+La courbe est dessinée dans un framebuffer de la taille de la zone de
+tracé. À chaque nouvelle mesure, la zone défile de quelques pixels et seul
+le dernier segment est tracé ; le minimum et le maximum de la fenêtre
+affichée sont tenus à jour en O(1) amorti par deux files monotones. La
+courbe n'est entièrement redessinée que si l'échelle verticale change.
+"""
+
+import framebuf
+from array import array
+
+
+class _MonotonicQueue:
+    """File (numéro, valeur) dont les valeurs restent croissantes (ou décroissantes)"""
+
+    def __init__(self, size, keep_max):
+        self._seq = array("L", [0] * size)
+        self._value = array("l", [0] * size)
+        self._size = size
+        self._keep_max = keep_max
+        self._head = 0
+        self._count = 0
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def push(self, seq, value):
+        # Les valeurs dominées par la nouvelle ne seront plus jamais l'extremum
+        size = self._size
+        while self._count:
+            back = (self._head + self._count - 1) % size
+            v = self._value[back]
+            if (v > value) if self._keep_max else (v < value):
+                break
+            self._count -= 1
+        k = (self._head + self._count) % size
+        self._seq[k] = seq
+        self._value[k] = value
+        self._count += 1
+
+    def expire(self, oldest_seq):
+        """Retire les valeurs sorties de la fenêtre"""
+        while self._count and self._seq[self._head] < oldest_seq:
+            self._head = (self._head + 1) % self._size
+            self._count -= 1
+
+    def front(self):
+        return self._value[self._head]
+
+
+class RunningMinMax:
+    """
+    Minimum et maximum des window dernières valeurs
+
+    Exemple :
+        extremes = RunningMinMax(64)
+        extremes.push(value)
+        low, high = extremes.min(), extremes.max()
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._min = _MonotonicQueue(window, False)
+        self._max = _MonotonicQueue(window, True)
+        self._seq = 0
+
+    def clear(self):
+        self._min.clear()
+        self._max.clear()
+        self._seq = 0
+
+    def push(self, value):
+        """Ajoute une valeur ; la plus ancienne sort de la fenêtre si elle est pleine"""
+        # Expiration d'abord : chaque file garde au plus window valeurs
+        oldest = self._seq + 1 - self.window
+        self._min.expire(oldest)
+        self._max.expire(oldest)
+        self._min.push(self._seq, value)
+        self._max.push(self._seq, value)
+        self._seq += 1
+
+    def min(self):
+        return self._min.front()
+
+    def max(self):
+        return self._max.front()
+
+
+class StreamPlot:
+    """
+    Zone de tracé défilante
+
+    Exemple :
+        plot = StreamPlot(128, 45)
+        plot.push(value)              # à chaque nouvelle mesure (entier)
+        plot.blit(display.framebuf, 0, 35)
+    """
+
+    def __init__(self, width=128, height=45, step=2, color=15):
+        """
+        Initialise la zone de tracé
+
+        Args:
+            width: Largeur en pixels
+            height: Hauteur en pixels
+            step: Écart horizontal entre deux mesures en pixels
+            color: Couleur du tracé (niveau de gris 4 bits)
+        """
+        self.width = width
+        self.height = height
+        self.step = step
+        self.color = color
+        self.points = (width - 1) // step + 1  # mesures visibles
+        self.fb = framebuf.FrameBuffer(bytearray((width + 1) // 2 * height), width, height,
+                                       framebuf.GS4_HMSB)
+        self.extremes = RunningMinMax(self.points)
+        self._values = array("l", [0] * self.points)  # mesures visibles, en anneau
+        self._head = 0
+        self._count = 0
+        self._low = 0
+        self._high = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self.fb.fill(0)
+        self.extremes.clear()
+        self._head = 0
+        self._count = 0
+
+    def min(self):
+        return self.extremes.min()
+
+    def max(self):
+        return self.extremes.max()
+
+    def _y(self, value):
+        if self._high == self._low:
+            return self.height // 2
+        return self.height - 1 - (value - self._low) * (self.height - 1) // (self._high - self._low)
+
+    def _value(self, i):
+        """i-ème mesure visible (0 = la plus à gauche)"""
+        return self._values[(self._head - self._count + i) % self.points]
+
+    def _append(self, value):
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.points
+        if self._count < self.points:
+            self._count += 1
+        self.extremes.push(value)
+
+    def redraw(self):
+        """Redessine toute la courbe (changement d'échelle)"""
+        self._low = self.extremes.min()
+        self._high = self.extremes.max()
+        fb = self.fb
+        fb.fill(0)
+        step = self.step
+        y0 = self._y(self._value(0))
+        for i in range(1, self._count):
+            y1 = self._y(self._value(i))
+            fb.line((i - 1) * step, y0, i * step, y1, self.color)
+            y0 = y1
+
+    def load(self, values):
+        """Remplace la courbe par les dernières mesures de values (itérable)"""
+        self.clear()
+        for value in values:
+            self._append(value)
+        if self._count:
+            self.redraw()
+
+    def push(self, value):
+        """Ajoute une mesure et met à jour la zone de tracé"""
+        full = self._count == self.points
+        self._append(value)
+        if self._count < 2 or self.extremes.min() != self._low or self.extremes.max() != self._high:
+            self.redraw()
+            return
+        step = self.step
+        if full:
+            # Défilement d'une mesure vers la gauche. Les colonnes 0 à step - 1
+            # gardent l'extrémité du segment sorti de l'écran (plusieurs
+            # pixels pour un segment raide) : le premier segment est redessiné
+            fb = self.fb
+            fb.scroll(-step, 0)
+            fb.fill_rect(self.width - step, 0, step, self.height, 0)
+            fb.fill_rect(0, 0, step, self.height, 0)
+            fb.line(0, self._y(self._value(0)), step, self._y(self._value(1)), self.color)
+        x = (self._count - 1) * step
+        self.fb.line(x - step, self._y(self._value(self._count - 2)),
+                     x, self._y(value), self.color)
+
+    def blit(self, target, x, y):
+        """Copie la zone de tracé dans le framebuffer de l'écran"""
+        target.blit(self.fb, x, y)
@@ -0,0 +1,99 @@
+"""
+Séries temporelles de taille fixe
+
+Chaque série garde les N dernières mesures d'un capteur dans des tableaux
+circulaires (array) : une voie par grandeur mesurée, en entiers mis à
+l'échelle (par exemple des centièmes de degré), et une date ticks_ms()
+commune. La mémoire est allouée une fois pour toutes et ajouter une
+mesure est en O(1), quelle que soit la durée de fonctionnement.
+"""
+
+from array import array
+from time import ticks_ms
+
+
+class TimeSeries:
+    """
+    Tampon circulaire multi-voies horodaté
+
+    Les indices vont de 0 (mesure la plus ancienne) à len() - 1 (la plus
+    récente) ; les indices négatifs partent de la plus récente.
+
+    Exemple :
+        history = TimeSeries(1000, channels=2)
+        history.append((temperature_centi, humidity_centi))
+        last_temperature = history.get(0, -1) / 100
+    """
+
+    def __init__(self, capacity, channels=1, typecode="h"):
+        """
+        Initialise la série
+
+        Args:
+            capacity: Nombre de mesures gardées
+            channels: Nombre de grandeurs par mesure
+            typecode: Type array des valeurs ("h" : entiers 16 bits signés)
+        """
+        self.capacity = capacity
+        self.channels = channels
+        self._values = [array(typecode, [0] * capacity) for _ in range(channels)]
+        self._stamps = array("L", [0] * capacity)
+        self._head = 0    # emplacement de la prochaine mesure
+        self._count = 0
+        self.total = 0    # mesures ajoutées depuis la création
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def append(self, values, now=None):
+        """
+        Ajoute une mesure ; la plus ancienne est écrasée si la série est pleine
+
+        Args:
+            values: Valeurs entières, une par voie
+            now: Date en ms (ticks_ms() par défaut)
+        """
+        if now is None:
+            now = ticks_ms()
+        k = self._head
+        for channel in range(self.channels):
+            self._values[channel][k] = values[channel]
+        self._stamps[k] = now
+        k += 1
+        self._head = 0 if k == self.capacity else k
+        if self._count < self.capacity:
+            self._count += 1
+        self.total += 1
+
+    def _slot(self, i):
+        """Emplacement de la i-ème mesure"""
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        k = self._head - self._count + i
+        return k + self.capacity if k < 0 else k
+
+    def get(self, channel, i):
+        """Valeur de la voie channel pour la i-ème mesure"""
+        return self._values[channel][self._slot(i)]
+
+    def stamp(self, i):
+        """Date (ticks_ms) de la i-ème mesure"""
+        return self._stamps[self._slot(i)]
+
+    def values(self, channel):
+        """Parcourt les valeurs d'une voie, de la plus ancienne à la plus récente"""
+        data = self._values[channel]
+        k = self._head - self._count
+        if k < 0:
+            k += self.capacity
+        for _ in range(self._count):
+            yield data[k]
+            k += 1
+            if k == self.capacity:
+                k = 0